@@ -79,6 +79,22 @@ def create_app(config_name='default'):
     from .routes.donations import donations as donations_blueprint
     app.register_blueprint(donations_blueprint)
 
+    from .routes.webhooks import webhooks as webhooks_blueprint
+    app.register_blueprint(webhooks_blueprint)
+
+    from .routes.reports import reports as reports_blueprint
+    app.register_blueprint(reports_blueprint, url_prefix='/admin/reports')
+
+    from .services.tasks import init_background_tasks
+    init_background_tasks(app)
+
+    from .services.instrumentation import init_query_counter
+    init_query_counter(app)
+
+    # Register CLI command groups (flask search ...)
+    from .cli import register_cli
+    register_cli(app)
+
     # 🔑 FIX: Context Processor to make 'now' (datetime object) globally available 🔑
     @app.context_processor
     def inject_global_variables():
@@ -93,4 +109,6 @@ def create_app(config_name='default'):
 
 
 from backend.models import users, temp_ngos, verified_ngos, rejected_ngos
-from backend.models import payments, successful_payments, failed_payments
\ No newline at end of file
+from backend.models import payments, successful_payments, failed_payments, donation_counters, job_checkpoints
+from backend.models import donation_rollups, recurring_donations, email_outbox, documents
+from backend.services import fulltext
@@ -0,0 +1,273 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+
+search_cli = AppGroup('search', help='Search index maintenance.')
+
+
+@search_cli.command('reindex')
+def reindex():
+    """Create (if needed) and repopulate the full-text and trigram indexes for verified NGOs."""
+    from backend import db
+    from .services.fulltext import rebuild_fulltext_index
+    from .services import trigram
+
+    rebuild_fulltext_index()
+
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.begin() as conn:
+            for statement in trigram.POSTGRES_DDL:
+                conn.execute(db.text(statement))
+        trigram._pg_trgm_available.clear()
+
+    click.echo('Search indexes rebuilt.')
+
+
+@search_cli.command('geocode')
+def geocode():
+    """Resolve coordinates for verified NGOs whose location hasn't been geocoded yet."""
+    from backend import db
+    from .models.verified_ngos import VerifiedNGO
+    from .services.geo import geocode_ngo
+
+    pending = VerifiedNGO.query.filter(VerifiedNGO.location.isnot(None), VerifiedNGO.latitude.is_(None))
+    resolved = unresolved = 0
+    for ngo in pending:
+        if geocode_ngo(ngo):
+            resolved += 1
+        else:
+            unresolved += 1
+    db.session.commit()
+    click.echo(f'Geocoded {resolved} NGOs ({unresolved} locations not found in the gazetteer).')
+
+
+donations_cli = AppGroup('donations', help='Donation totals maintenance.')
+
+
+@donations_cli.command('fold')
+def fold():
+    """Fold sharded donation counters into NGO totals (run periodically, e.g. from cron)."""
+    from .services.donation_totals import fold_counter_shards
+
+    folded = fold_counter_shards()
+    click.echo(f'Folded ${sum(folded.values()) / 100:.2f} into {len(folded)} NGO totals.')
+
+
+@donations_cli.command('shard')
+@click.argument('ngo_id', type=int)
+@click.option('--shards', default=16, show_default=True, help='Counter shards for this NGO; 0 turns sharding off.')
+def shard(ngo_id, shards):
+    """Spread donation credits for a hot NGO over several counter rows."""
+    from backend import db
+    from .models.verified_ngos import VerifiedNGO
+    from .services.donation_totals import set_counter_shards
+
+    ngo = db.session.get(VerifiedNGO, ngo_id)
+    if ngo is None:
+        raise click.ClickException(f'No verified NGO with id {ngo_id}.')
+    click.echo(f'{ngo.name}: {set_counter_shards(ngo, shards)} counter shards.')
+
+
+@donations_cli.command('backfill-rollups')
+@click.option('--chunk-size', default=1000, show_default=True, help='Payments per transaction.')
+@click.option('--rebuild', is_flag=True, help='Empty the rollups and recount every successful payment.')
+def backfill_rollups(chunk_size, rebuild):
+    """Add successful payments missing from the donation rollup tables (resumable)."""
+    from .services.rollups import backfill_rollups as run_backfill
+
+    total = run_backfill(chunk_size=chunk_size, rebuild=rebuild,
+                         progress=lambda done: click.echo(f'  {done} payments rolled up'))
+    click.echo(f'Rolled up {total} payments.')
+
+
+@donations_cli.command('run-recurring')
+@click.option('--batch-size', type=int, default=None, help='Subscriptions claimed per batch [RECURRING_BATCH_SIZE].')
+@click.option('--workers', type=int, default=None, help='Concurrent Stripe charges [RECURRING_WORKERS], capped at STRIPE_MAX_CONCURRENCY.')
+@click.option('--limit', type=int, default=None, help='Stop after this many subscriptions.')
+def run_recurring(batch_size, workers, limit):
+    """Charge due recurring donations (safe to run on several nodes at once)."""
+    from .services.recurring import run_recurring_donations
+
+    def progress(report):
+        click.echo(f"  batch {report['batches']}: {report['claimed']} claimed")
+
+    report = run_recurring_donations(batch_size=batch_size, workers=workers, limit=limit, progress=progress)
+    seconds = report['elapsed_ms'] / 1000
+    click.echo(
+        f"Charged {report['claimed']} recurring donations in {seconds:.1f}s: {report['succeeded']} succeeded, "
+        f"{report['failed']} declined ({report['past_due']} now past due), {report['retry_later']} to retry, "
+        f"{report['errors']} errors."
+    )
+
+
+payments_cli = AppGroup('payments', help='Payment maintenance.')
+
+
+@payments_cli.command('reconcile')
+@click.option('--older-than', type=int, default=None, help='Minutes a payment must have been pending [RECONCILE_STALE_MINUTES].')
+@click.option('--chunk-size', type=int, default=None, help='Payments per batch transaction [RECONCILE_CHUNK_SIZE].')
+@click.option('--workers', type=int, default=None, help='Concurrent Stripe requests [RECONCILE_WORKERS], capped at STRIPE_MAX_CONCURRENCY.')
+@click.option('--rate', type=float, default=None, help='Max Stripe requests per second [RECONCILE_RATE_LIMIT].')
+@click.option('--limit', type=int, default=None, help='Stop after this many payments (resume on the next run).')
+@click.option('--restart', is_flag=True, help='Ignore the saved checkpoint and start from the oldest payment.')
+def reconcile(older_than, chunk_size, workers, rate, limit, restart):
+    """Finalize stale PENDING payments from their Stripe Checkout Sessions."""
+    from .services.reconcile import reconcile_pending_payments
+
+    def progress(report):
+        click.echo(f"  chunk {report['chunks']}: {report['scanned']} scanned")
+
+    report = reconcile_pending_payments(
+        older_than_minutes=older_than, chunk_size=chunk_size, workers=workers, rate_limit=rate,
+        limit=limit, restart=restart, progress=progress
+    )
+    seconds = report['elapsed_ms'] / 1000
+    click.echo(
+        f"Reconciled {report['scanned']} payments in {seconds:.1f}s "
+        f"({report['scanned'] / seconds if seconds else 0:.0f}/s): {report['succeeded']} succeeded, "
+        f"{report['failed']} failed, {report['still_open']} still open, {report['skipped']} skipped, "
+        f"{report['errors']} errors; {report['abandoned']} abandoned before checkout deleted."
+    )
+
+
+email_cli = AppGroup('email', help='Email outbox delivery.')
+
+
+@email_cli.command('drain')
+@click.option('--batch-size', type=int, default=None, help='Emails claimed per batch [EMAIL_OUTBOX_BATCH_SIZE].')
+@click.option('--connections', type=int, default=None, help='SMTP connections kept open [EMAIL_OUTBOX_CONNECTIONS].')
+@click.option('--limit', type=int, default=None, help='Stop after this many emails.')
+@click.option('--follow', is_flag=True, help='Keep running and poll for new mail until SIGTERM/SIGINT.')
+def drain(batch_size, connections, limit, follow):
+    """Send due outbox emails (safe to run on several nodes at once)."""
+    import signal
+    import threading
+    from .services.outbox import drain_outbox
+
+    stop = threading.Event()
+    if follow:
+        # Finish the batch in flight, then exit
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+
+    def progress(report):
+        mail = report['mail']
+        click.echo(f"  batch {report['batches']}: {report['sent']} sent, {report['retry_later']} to retry "
+                   f"(queue {mail['queue_depth']}, send p95 {mail['send_p95_ms']} ms)")
+
+    report = drain_outbox(batch_size=batch_size, connections=connections, limit=limit, follow=follow, stop=stop,
+                          progress=progress)
+    click.echo(
+        f"Sent {report['sent']} of {report['claimed']} emails in {report['elapsed_ms'] / 1000:.1f}s: "
+        f"{report['retry_later']} to retry, {report['dead']} dropped."
+    )
+    mail = report['mail']
+    click.echo(
+        f"SMTP: {mail['connects']} connections, send p50/p95 {mail['send_p50_ms']}/{mail['send_p95_ms']} ms, "
+        f"queue wait p50/p95 {mail['wait_p50_ms']}/{mail['wait_p95_ms']} ms."
+    )
+
+
+@email_cli.command('purge')
+@click.option('--older-than', type=int, default=None, help='Days since sending [EMAIL_OUTBOX_KEEP_DAYS].')
+def purge(older_than):
+    """Delete sent emails from the outbox."""
+    from .services.outbox import purge_sent
+
+    click.echo(f'Deleted {purge_sent(older_than)} sent emails.')
+
+
+@email_cli.command('digest')
+@click.option('--month', default=None, help='Month to report, e.g. 2026-09 (default: last month).')
+@click.option('--batch-size', type=int, default=None, help='Donors per checkpointed batch [DIGEST_BATCH_SIZE].')
+@click.option('--connections', type=int, default=None, help='SMTP connections kept open [DIGEST_CONNECTIONS].')
+@click.option('--rate', type=float, default=None, help='Max messages per second [DIGEST_RATE_LIMIT].')
+@click.option('--limit', type=int, default=None, help='Stop after this many donors (resume on the next run).')
+@click.option('--active-only', is_flag=True, help='Only donors who gave during the month.')
+@click.option('--restart', is_flag=True, help="Ignore the saved checkpoint and send the month's digest again.")
+def digest(month, batch_size, connections, rate, limit, active_only, restart):
+    """Send the monthly impact digest to every donor."""
+    from datetime import date, timedelta
+    from .services.digest import send_donor_digest
+
+    try:
+        month = date.fromisoformat(f'{month}-01') if month else date.today().replace(day=1) - timedelta(days=1)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    def progress(report):
+        click.echo(f"  batch {report['batches']}: {report['recipients']} donors, {report['sent']} sent")
+
+    report = send_donor_digest(month, batch_size=batch_size, connections=connections, rate_limit=rate, limit=limit,
+                               active_only=active_only, restart=restart, progress=progress)
+    if report['already_sent']:
+        click.echo(f'The {month:%Y-%m} digest was already sent; use --restart to send it again.')
+        return
+    click.echo(
+        f"Sent the {month:%Y-%m} digest to {report['sent']} of {report['recipients']} donors in "
+        f"{report['elapsed_ms'] / 1000:.1f}s: {report['deferred']} deferred to the outbox, "
+        f"{report['refused']} refused."
+    )
+
+
+documents_cli = AppGroup('documents', help='Uploaded document storage.')
+
+
+@documents_cli.command('gc')
+@click.option('--grace-hours', type=float, default=None, help='Keep unreferenced files this long [DOCUMENT_GC_GRACE_HOURS].')
+def documents_gc(grace_hours):
+    """Delete unreferenced documents and files left by failed uploads."""
+    from .services.documents import collect_garbage
+
+    report = collect_garbage(grace_hours)
+    click.echo(
+        f"Deleted {report['deleted']} unreferenced documents ({report['bytes_freed'] / 1e6:.1f} MB), "
+        f"{report['orphans']} orphaned files and {report['temp_files']} stale temp files."
+    )
+
+
+@click.command('export')
+@click.argument('dataset')
+@click.option('--format', 'fmt', default='csv', show_default=True, help='csv, jsonl or parquet (needs pyarrow).')
+@click.option('--month', default=None, help='Only this month, e.g. 2026-09.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows fetched and written per batch.')
+@click.option('-o', '--output', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='File to write (default: stdout).')
+@with_appcontext
+def export(dataset, fmt, month, batch_size, output):
+    """Stream DATASET (payments or ngos) to a file without loading it into memory."""
+    import sys
+    import time
+    from datetime import date
+    from .services.exports import stream_export, check_export
+
+    start = end = None
+    try:
+        check_export(dataset, fmt)
+        if month:
+            start = date.fromisoformat(f'{month}-01')
+            end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    started = time.perf_counter()
+    written = 0
+    stream = open(output, 'wb') if output else sys.stdout.buffer
+    try:
+        for chunk in stream_export(dataset, fmt, start, end, batch_size=batch_size):
+            stream.write(chunk)
+            written += len(chunk)
+    finally:
+        if output:
+            stream.close()
+
+    if output:
+        click.echo(f'Wrote {written / 1e6:.1f} MB to {output} in {time.perf_counter() - started:.1f}s.')
+
+
+def register_cli(app):
+    app.cli.add_command(search_cli)
+    app.cli.add_command(donations_cli)
+    app.cli.add_command(payments_cli)
+    app.cli.add_command(email_cli)
+    app.cli.add_command(documents_cli)
+    app.cli.add_command(export)
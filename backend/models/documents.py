@@ -0,0 +1,26 @@
+from datetime import datetime
+from backend import db
+
+
+class Document(db.Model):
+    """
+    One uploaded file, stored once under UPLOAD_FOLDER at a path derived from its SHA-256
+    (services/documents.py). ``ref_count`` is the number of application fields pointing at
+    it; `flask documents gc` deletes the file some time after it drops to zero.
+    """
+    __tablename__ = 'documents'
+    __table_args__ = (
+        db.Index('ix_documents_unreferenced', 'ref_count', 'updated_at'),
+    )
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    # Extension of the first upload (kept so the file is served with the right content type)
+    extension = db.Column(db.String(10), nullable=False, default='', server_default='')
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"Document(SHA-256: {self.sha256[:12]}, Size: {self.size}, Refs: {self.ref_count})"
@@ -0,0 +1,17 @@
+from backend import db
+
+
+class DonationCounterShard(db.Model):
+    """
+    One slice of a hot NGO's running donation total. Credits land on a random shard so
+    concurrent donations don't queue on the verified_ngos row; the shards are folded into
+    VerifiedNGO.total_donations_cents periodically (flask donations fold).
+    """
+    __tablename__ = 'donation_counter_shards'
+
+    ngo_id = db.Column(db.Integer, db.ForeignKey('verified_ngos.id'), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    cents = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f"DonationCounterShard(NGO: {self.ngo_id}, Shard: {self.shard}, Cents: {self.cents})"
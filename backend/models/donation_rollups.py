@@ -0,0 +1,43 @@
+from backend import db
+
+# Incrementally maintained donation aggregates (see services/rollups.py). Reports read these
+# instead of scanning payments, so their cost grows with days covered, not with donations.
+
+
+class NGODailyDonations(db.Model):
+    __tablename__ = 'donation_rollup_ngo_daily'
+
+    ngo_id = db.Column(db.Integer, db.ForeignKey('verified_ngos.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    donation_count = db.Column(db.Integer, nullable=False, default=0)
+    amount_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    unique_donors = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CategoryDailyDonations(db.Model):
+    __tablename__ = 'donation_rollup_category_daily'
+
+    ngo_type = db.Column(db.String(50), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    donation_count = db.Column(db.Integer, nullable=False, default=0)
+    amount_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    unique_donors = db.Column(db.Integer, nullable=False, default=0)
+
+
+class PlatformDailyDonations(db.Model):
+    __tablename__ = 'donation_rollup_platform_daily'
+
+    day = db.Column(db.Date, primary_key=True)
+    donation_count = db.Column(db.Integer, nullable=False, default=0)
+    amount_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    unique_donors = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RollupDonor(db.Model):
+    """Donors already counted in a rollup row's unique_donors (hashed email, never read by reports)."""
+    __tablename__ = 'donation_rollup_donors'
+
+    scope = db.Column(db.String(10), primary_key=True)        # 'ngo' | 'category' | 'platform'
+    scope_key = db.Column(db.String(50), primary_key=True)    # ngo id / ngo_type / ''
+    day = db.Column(db.Date, primary_key=True)
+    donor_hash = db.Column(db.String(32), primary_key=True)
@@ -0,0 +1,40 @@
+from datetime import datetime
+from backend import db
+
+
+class EmailOutbox(db.Model):
+    """
+    A rendered email waiting to be sent, written in the same transaction as the change it
+    reports (registration link, donation receipt) and delivered by `flask email drain`.
+
+    ``lease_owner``/``lease_expires_at`` mark a row a drain worker is currently sending;
+    a failed send is retried at ``next_attempt_at`` with exponential backoff.
+    """
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        # Drain worker: pending rows in next_attempt_at order
+        db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    recipient = db.Column(db.String(120), nullable=False)
+    sender = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body_text = db.Column(db.Text, nullable=False)
+    body_html = db.Column(db.Text, nullable=True)
+
+    # pending | sent | dead (gave up: refused by the server, or out of attempts)
+    status = db.Column(db.String(10), nullable=False, default='pending', server_default='pending')
+    attempts = db.Column(db.SmallInteger, nullable=False, default=0, server_default='0')
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(255), nullable=True)
+
+    lease_owner = db.Column(db.String(64), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"EmailOutbox(ID: {self.id}, To: {self.recipient}, Status: {self.status})"
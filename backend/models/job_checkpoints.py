@@ -0,0 +1,14 @@
+from datetime import datetime
+from backend import db
+
+
+class JobCheckpoint(db.Model):
+    """Last position reached by a resumable batch job (reconcile, backfills, digests)."""
+    __tablename__ = 'job_checkpoints'
+
+    name = db.Column(db.String(100), primary_key=True)
+    position = db.Column(db.String(255), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"JobCheckpoint(Job: {self.name}, Position: {self.position})"
@@ -3,11 +3,19 @@ from backend import db
 
 class Payment(db.Model):
     __tablename__ = 'payments'
+    __table_args__ = (
+        # Reconcile job: walk pending payments in id order
+        db.Index('ix_payments_status_id', 'transaction_status', 'id'),
+        # Per-NGO donation history keyset (created_at DESC, id DESC)
+        db.Index('ix_payments_ngo_created', 'ngo_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
     donor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     ngo_id = db.Column(db.Integer, db.ForeignKey('verified_ngos.id'), nullable=False)
+    # Set for charges made by the recurring-donation scheduler
+    recurring_donation_id = db.Column(db.Integer, db.ForeignKey('recurring_donations.id'), nullable=True)
 
     donor_name = db.Column(db.String(100), nullable=True)
     donor_email = db.Column(db.String(120), nullable=False)
@@ -16,9 +24,14 @@ class Payment(db.Model):
     currency = db.Column(db.String(3), default='USD', nullable=False)
 
     stripe_session_id = db.Column(db.String(255), unique=True, nullable=True)
+    # Hash of the donation intent; a retried checkout request finds its payment (and URL) by it
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=True)
+    checkout_url = db.Column(db.String(500), nullable=True)
     transaction_status = db.Column(db.String(50), default='PENDING', nullable=False)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set when a successful payment has been added to the donation rollup tables
+    rolled_up = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     type = db.Column(db.String(50), nullable=False)
     __mapper_args__ = {
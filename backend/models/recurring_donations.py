@@ -0,0 +1,47 @@
+from datetime import datetime
+from backend import db
+
+
+class RecurringDonation(db.Model):
+    """
+    A donor's standing monthly (or every ``interval_months``) donation to one NGO, charged
+    off-session against a saved Stripe payment method by `flask donations run-recurring`.
+
+    ``lease_owner``/``lease_expires_at`` mark a row a scheduler node is currently charging,
+    so several nodes can run at once without charging anyone twice.
+    """
+    __tablename__ = 'recurring_donations'
+    __table_args__ = (
+        # Scheduler: due active subscriptions in next_run_at order
+        db.Index('ix_recurring_donations_due', 'status', 'next_run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    ngo_id = db.Column(db.Integer, db.ForeignKey('verified_ngos.id'), nullable=False, index=True)
+    donor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    donor_name = db.Column(db.String(100), nullable=True)
+    donor_email = db.Column(db.String(120), nullable=False)
+
+    amount_cents = db.Column(db.Integer, nullable=False)
+    currency = db.Column(db.String(3), default='USD', nullable=False)
+    interval_months = db.Column(db.SmallInteger, nullable=False, default=1, server_default='1')
+
+    stripe_customer_id = db.Column(db.String(255), nullable=False)
+    stripe_payment_method_id = db.Column(db.String(255), nullable=False)
+
+    # active | past_due (gave up after repeated failures) | cancelled
+    status = db.Column(db.String(20), nullable=False, default='active', server_default='active')
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    # Consecutive failed charges for the current cycle
+    failure_count = db.Column(db.SmallInteger, nullable=False, default=0, server_default='0')
+
+    lease_owner = db.Column(db.String(64), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return (f"RecurringDonation(ID: {self.id}, NGO: {self.ngo_id}, "
+                f"Amount: ${self.amount_cents / 100:.2f}, Status: {self.status})")
@@ -10,6 +10,7 @@ class RejectedNGO(db.Model):
     ngo_type = db.Column(db.String(64), nullable=False)
     mission = db.Column(db.Text, nullable=False)
     contact_email = db.Column(db.String(120), index=True, nullable=False)
+    location = db.Column(db.String(100))
 
     reg_document_path = db.Column(db.String(256), nullable=False)
     financial_report_path = db.Column(db.String(256))
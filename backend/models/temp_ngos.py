@@ -10,6 +10,7 @@ class TempNGO(db.Model):
     ngo_type = db.Column(db.String(64), nullable=False)
     mission = db.Column(db.Text, nullable=False)
     website = db.Column(db.String(256))
+    location = db.Column(db.String(100))
 
     # FIX: Removed unique=True to allow duplicate email submissions, resolving the IntegrityError.
     contact_email = db.Column(db.String(120), index=True, nullable=False)
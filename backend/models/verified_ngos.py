@@ -3,6 +3,14 @@ from backend import db
 
 class VerifiedNGO(db.Model):
     __tablename__ = 'verified_ngos'
+    __table_args__ = (
+        # Serves the home-page leaderboard keyset (total_donations_cents DESC, id DESC). Deliberately
+        # doesn't lead with is_active: nearly every row is active, and a leading is_active
+        # column lures SQLite's planner away from more selective indexes.
+        db.Index('ix_verified_ngos_leaderboard', 'total_donations_cents', 'id'),
+        # Radius search prefilter: grid cells + latitude band
+        db.Index('ix_verified_ngos_geo', 'geo_cell', 'latitude', 'longitude'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False, index=True)
@@ -14,8 +22,16 @@ class VerifiedNGO(db.Model):
     contact_phone = db.Column(db.String(20), nullable=True)
     location = db.Column(db.String(100), nullable=True, index=True)
 
+    # Resolved from `location` via the bundled gazetteer (see services/geo.py)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geo_cell = db.Column(db.Integer, nullable=True)
+
     is_active = db.Column(db.Boolean, default=True)
-    total_donations = db.Column(db.Float, default=0.00)
+    # Whole cents; only ever changed by atomic increments (see services/donation_totals.py)
+    total_donations_cents = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    # > 0 spreads credits for a hot NGO over this many donation_counter_shards rows
+    counter_shards = db.Column(db.SmallInteger, nullable=False, default=0, server_default='0')
 
     date_approved = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -26,5 +42,10 @@ class VerifiedNGO(db.Model):
         foreign_keys='Payment.ngo_id'
     )
 
+    @property
+    def total_donations(self):
+        """Folded total in dollars (credits still sitting in counter shards aren't included)."""
+        return (self.total_donations_cents or 0) / 100
+
     def __repr__(self):
         return f"VerifiedNGO(Name: {self.name}, Type: {self.ngo_type}, Active: {self.is_active})"
\ No newline at end of file
@@ -1,5 +1,6 @@
-from datetime import datetime
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from datetime import datetime, date, timedelta
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify, abort, \
+    Response, stream_with_context, send_from_directory
 from flask_login import login_user, logout_user, login_required, current_user
 from urllib.parse import urlparse as url_parse
 from ..services.forms import AdminLoginForm
@@ -7,6 +8,13 @@ from ..models.users import User
 from ..models.temp_ngos import TempNGO
 from ..models.verified_ngos import VerifiedNGO
 from ..models.rejected_ngos import RejectedNGO
+from ..services.signals import ngo_approved, ngo_deactivated, ngo_reactivated
+from ..services.geo import geocode_ngo
+from ..services.stripe_gateway import get_stripe
+from ..services.outbox import outbox_metrics
+from ..services.exports import stream_export, check_export, FORMATS
+from ..services.documents import document_key, document_url
+from ..services.storage import get_storage
 from backend import db
 
 admin = Blueprint('admin', __name__)
@@ -84,7 +92,7 @@ def approve_ngo(ngo_id):
 
     try:
         # 🔥 FINAL FIX: Only include fields that EXIST in the VerifiedNGO model.
-        # Removed 'approved_by_admin_id' and fields not in TempNGO (contact_phone, location).
+        # Removed 'approved_by_admin_id' and fields not in TempNGO (contact_phone).
         verified_ngo = VerifiedNGO(
             name=temp_ngo.name,
             ngo_type=temp_ngo.ngo_type,
@@ -93,14 +101,21 @@ def approve_ngo(ngo_id):
 
             # Nullable fields from VerifiedNGO set to None (or defaulted)
             contact_phone=None,
-            location=None
+            location=temp_ngo.location
             # date_approved uses the default=datetime.utcnow set in the model
         )
+        # Resolve lat/lon for radius search (left empty if the city isn't in the gazetteer)
+        geocode_ngo(verified_ngo)
+
+        # The application's documents keep their references (they are the charity's legal
+        # records), so `flask documents gc` never deletes them
 
         db.session.add(verified_ngo)
         db.session.delete(temp_ngo)
         db.session.commit()
 
+        ngo_approved.send(current_app._get_current_object(), ngo=verified_ngo)
+
         flash(f'Successfully approved and verified: {temp_ngo.name}', 'success')
 
     except Exception as e:
@@ -135,6 +150,7 @@ def reject_ngo(ngo_id):
             ngo_type=temp_ngo.ngo_type,
             mission=temp_ngo.mission,
             contact_email=temp_ngo.contact_email,
+            location=temp_ngo.location,
             reg_document_path=temp_ngo.reg_document_path,
             financial_report_path=temp_ngo.financial_report_path,
             rejected_by_admin_id=current_user.id,
@@ -173,6 +189,119 @@ def list_verified_ngos():
     )
 
 
+@admin.route('/deactivate/<int:ngo_id>', methods=['POST'])
+@login_required
+def deactivate_ngo(ngo_id):
+    if not current_user.is_admin():
+        flash('Access denied.', 'danger')
+        return redirect(url_for('home.index'))
+
+    ngo = VerifiedNGO.query.get_or_404(ngo_id)
+
+    try:
+        ngo.is_active = False
+        db.session.commit()
+
+        ngo_deactivated.send(current_app._get_current_object(), ngo=ngo)
+
+        flash(f'{ngo.name} has been deactivated and hidden from the directory.', 'info')
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error deactivating NGO {ngo_id}: {e}")
+        flash('Deactivation failed due to a database error.', 'danger')
+
+    return redirect(url_for('admin.list_verified_ngos'))
+
+
+@admin.route('/reactivate/<int:ngo_id>', methods=['POST'])
+@login_required
+def reactivate_ngo(ngo_id):
+    if not current_user.is_admin():
+        flash('Access denied.', 'danger')
+        return redirect(url_for('home.index'))
+
+    ngo = VerifiedNGO.query.get_or_404(ngo_id)
+
+    try:
+        ngo.is_active = True
+        db.session.commit()
+
+        ngo_reactivated.send(current_app._get_current_object(), ngo=ngo)
+
+        flash(f'{ngo.name} has been reactivated and is listed in the directory again.', 'info')
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error reactivating NGO {ngo_id}: {e}")
+        flash('Reactivation failed due to a database error.', 'danger')
+
+    return redirect(url_for('admin.list_verified_ngos'))
+
+
+@admin.route('/metrics/stripe')
+@login_required
+def stripe_metrics():
+    if not current_user.is_admin():
+        abort(403)
+
+    # Per worker process: circuit state plus call counts/latency percentiles per Stripe operation
+    return jsonify(get_stripe().metrics())
+
+
+@admin.route('/metrics/mail')
+@login_required
+def mail_metrics():
+    if not current_user.is_admin():
+        abort(403)
+
+    # Outbox backlog across all drains; `flask email drain` prints its own send and queue-wait latencies
+    return jsonify(outbox_metrics())
+
+
+@admin.route('/documents/<path:path>')
+@login_required
+def document(path):
+    """Sends an admin to an uploaded document (a static or pre-signed S3 URL; the bytes don't pass through here)."""
+    if not current_user.is_admin():
+        abort(403)
+
+    if document_key(path) is None:
+        # Saved under a random name before content addressing, in the static folder
+        return redirect(url_for('static', filename=path))
+
+    url = document_url(path)
+    if url is None:
+        # Local storage outside the static folder
+        return send_from_directory(get_storage().root, document_key(path))
+    return redirect(url)
+
+
+@admin.route('/export/<dataset>')
+@login_required
+def export(dataset):
+    """Streams payments or NGOs as csv/jsonl/parquet: ?format=csv&from=2026-09-01&to=2026-09-30 (inclusive)."""
+    if not current_user.is_admin():
+        abort(403)
+
+    fmt = request.args.get('format', 'csv')
+    try:
+        check_export(dataset, fmt)
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        end = date.fromisoformat(request.args['to']) + timedelta(days=1) if request.args.get('to') else None
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    mimetype, extension = FORMATS[fmt]
+    filename = '-'.join(filter(None, [dataset, request.args.get('from'), request.args.get('to')]))
+    # No Content-Length: the body goes out chunked as the rows are read
+    return Response(
+        stream_with_context(stream_export(dataset, fmt, start, end)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{extension}"'}
+    )
+
+
 @admin.route('/manage_verified/<int:ngo_id>')
 @login_required
 def manage_verified_ngo(ngo_id):
@@ -212,6 +341,7 @@ def restore_ngo(ngo_id):
             ngo_type=rejected_ngo.ngo_type,
             mission=rejected_ngo.mission,
             contact_email=rejected_ngo.contact_email,
+            location=rejected_ngo.location,
             reg_document_path=rejected_ngo.reg_document_path,
             financial_report_path=rejected_ngo.financial_report_path,
             date_submitted=datetime.utcnow()
@@ -1,100 +1,29 @@
+import uuid
 import stripe
-from flask import Blueprint, render_template, abort, url_for, flash, current_app, redirect, session, request
-from datetime import datetime
+from flask import Blueprint, render_template, abort, url_for, flash, current_app, redirect, session, request, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
 from ..models.verified_ngos import VerifiedNGO
 from ..models.payments import Payment
-from ..models.successful_payments import SuccessfulPayment
-from ..models.failed_payments import FailedPayment
 from ..services.forms import DonationForm
-from ..services.email import send_email
+from ..services.payments import finalize_payment, donation_idempotency_key, PENDING_STATUSES
+from ..services.tasks import submit_task
+from ..services.stripe_gateway import get_stripe
+from ..services.ngo_cache import get_ngo_info
+from ..services.donation_history import get_donation_history, decode_cursor
+from ..services.cache import TTLCache
 from backend import db
 
 donations = Blueprint('donations', __name__)
 
-
-def finalize_payment(session_id, is_success):
-    # NOTE: stripe.api_key should ideally be set once in the app config
-    # but setting it here for safety in case it was missed elsewhere.
-    stripe.api_key = current_app.config.get('STRIPE_SECRET_KEY')
-    payment = None
-
-    try:
-        session_stripe = stripe.checkout.Session.retrieve(session_id)
-
-        payment = Payment.query.filter_by(stripe_session_id=session_id).first()
-
-        if not payment:
-            current_app.logger.warning(f"Payment record not found for session: {session_id}")
-            return None
-
-        if payment.transaction_status in ('SUCCESS', 'FAILED'):
-            return payment
-
-        if is_success:
-            SuccessfulPayment_record = SuccessfulPayment(
-                stripe_charge_id=session_stripe.payment_intent,
-                # amount_received=payment.amount, # Removed assuming this field is handled differently
-                receipt_url=session_stripe.url,
-                payment=payment,
-                confirmed_at=datetime.utcnow()
-            )
-            db.session.add(SuccessfulPayment_record)
-
-            payment.transaction_status = 'SUCCESS'
-            payment.type = 'success'
-
-            ngo = VerifiedNGO.query.get(payment.ngo_id)
-            if ngo:
-                # Use total_donations_cents for precise addition if model supports it
-                ngo.total_donations += payment.amount
-
-            db.session.commit()
-
-            ngo_name = ngo.name if ngo else 'NGO Platform'
-            send_email(payment.donor_email, 'Your Donation Receipt', 'donation_success', payment=payment,
-                       ngo_name=ngo_name)
-
-        else:
-            failure_record = FailedPayment(
-                error_message="Payment canceled or rejected by gateway.",
-                stripe_error_code=session_stripe.payment_intent,  # Using payment intent as failure code if available
-                payment=payment,
-                failed_at=datetime.utcnow()
-            )
-            db.session.add(failure_record)
-
-            payment.transaction_status = 'FAILED'
-            payment.type = 'failure'
-            db.session.commit()
-
-            ngo_name = VerifiedNGO.query.get(payment.ngo_id).name if VerifiedNGO.query.get(
-                payment.ngo_id) else 'NGO Platform'
-            send_email(payment.donor_email, 'Your Donation Failed', 'donation_failure', payment=payment,
-                       ngo_name=ngo_name, reason='Payment was cancelled or declined.')
-
-    # 🔑 FIX 1: Corrected Stripe exception path 🔑
-    except stripe.StripeError as e:
-        current_app.logger.error(f"Stripe retrieval failed for session {session_id}: {e}")
-        # Note: Added a check for AuthenticationError which causes the second exception in the trace
-        if isinstance(e, stripe.error.AuthenticationError):
-            current_app.logger.error("CRITICAL: Invalid Stripe API Key. Check configuration.")
-            # Optionally, you might want to raise a more fatal error here in production.
-
-        if payment and payment.transaction_status != 'SUCCESS':
-            db.session.rollback()
-        return None
-    except Exception as e:
-        current_app.logger.error(f"Internal error during payment finalization for session {session_id}: {e}")
-        if payment and payment.transaction_status != 'SUCCESS':
-            db.session.rollback()
-        return None
-
-    return payment
+# Checkout Sessions this process recently queued a finalize (Stripe retrieve) for, so the
+# success page's refresh polls the local status instead of Stripe on every reload
+finalize_requested = TTLCache(maxsize=1024, ttl=15)
 
 
 @donations.route('/donate/<int:ngo_id>', methods=['GET', 'POST'])
 def donate_ngo(ngo_id):
-    ngo = VerifiedNGO.query.get(ngo_id)
+    ngo = get_ngo_info(ngo_id)
 
     if ngo is None or not ngo.is_active:
         abort(404)
@@ -104,7 +33,7 @@ def donate_ngo(ngo_id):
     if form.validate_on_submit():
         amount_cents = int(form.amount.data * 100)
 
-        session['donation_data'] = {
+        donation_data = {
             'amount_cents': amount_cents,
             'donor_name': form.donor_name.data,
             'donor_email': form.donor_email.data,
@@ -112,6 +41,14 @@ def donate_ngo(ngo_id):
             'ngo_name': ngo.name,
         }
 
+        # Re-submitting the same donation keeps its intent id (and so its checkout); a new or
+        # changed donation gets a fresh one. Cleared once the donor is back from Checkout.
+        previous = session.get('donation_data') or {}
+        same_donation = all(previous.get(k) == v for k, v in donation_data.items())
+        donation_data['intent_id'] = previous.get('intent_id') if same_donation and previous.get('intent_id') \
+            else uuid.uuid4().hex
+        session['donation_data'] = donation_data
+
         flash(f'Processing donation of ${form.amount.data} to {ngo.name}. Redirecting to secure payment...', 'info')
         return redirect(url_for('donations.create_checkout_session'))
 
@@ -130,22 +67,40 @@ def create_checkout_session():
         flash('Donation session expired or invalid. Please try again.', 'danger')
         return redirect(url_for('home.index'))
 
-    stripe.api_key = current_app.config.get('STRIPE_SECRET_KEY')
+    key = donation_idempotency_key(donation_data)
+    payment = Payment.query.filter_by(idempotency_key=key).first()
+
+    # Retried request / double click: hand back the checkout that already exists
+    if payment and payment.transaction_status == 'PENDING' and payment.checkout_url:
+        return redirect(payment.checkout_url, code=303)
+    if payment and payment.transaction_status == 'SUCCESS':
+        return redirect(url_for('donations.payment_success', session_id=payment.stripe_session_id))
+    if payment and payment.transaction_status == 'FAILED':
+        session.pop('donation_data', None)
+        flash('That checkout has expired. Please start your donation again.', 'warning')
+        return redirect(url_for('donations.donate_ngo', ngo_id=donation_data['ngo_id']))
 
     try:
-        new_payment = Payment(
-            amount=donation_data['amount_cents'] / 100,
-            donor_name=donation_data['donor_name'],
-            donor_email=donation_data['donor_email'],
-            ngo_id=donation_data['ngo_id'],
-            transaction_status='PENDING_INITIATION',
-            type='payment'
-        )
-        db.session.add(new_payment)
-        db.session.flush()
-        payment_id = new_payment.id
-
-        session_stripe = stripe.checkout.Session.create(
+        if payment is None:
+            payment = Payment(
+                amount=donation_data['amount_cents'] / 100,
+                donor_name=donation_data['donor_name'],
+                donor_email=donation_data['donor_email'],
+                ngo_id=donation_data['ngo_id'],
+                idempotency_key=key,
+                transaction_status='PENDING_INITIATION',
+                type='payment'
+            )
+            db.session.add(payment)
+            try:
+                # Commit before calling Stripe so a concurrent retry finds this row instead of inserting its own
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                payment = Payment.query.filter_by(idempotency_key=key).one()
+
+        # Same key → Stripe replays the original session instead of creating a second one
+        session_stripe = get_stripe().create_checkout_session(dict(
             payment_method_types=['card'],
             line_items=[{
                 'price_data': {
@@ -161,17 +116,17 @@ def create_checkout_session():
             success_url=url_for('donations.payment_success', _external=True) + f'?session_id={{CHECKOUT_SESSION_ID}}',
             cancel_url=url_for('donations.payment_failed', _external=True) + f'?session_id={{CHECKOUT_SESSION_ID}}',
             metadata={
-                'payment_id': payment_id,
+                'payment_id': payment.id,
                 'ngo_id': donation_data['ngo_id']
             },
-        )
+        ), idempotency_key=f'checkout-{key}')
 
-        new_payment.stripe_session_id = session_stripe.id
-        new_payment.transaction_status = 'PENDING'
+        payment.stripe_session_id = session_stripe.id
+        payment.checkout_url = session_stripe.url
+        if payment.transaction_status == 'PENDING_INITIATION':
+            payment.transaction_status = 'PENDING'
         db.session.commit()
 
-        session.pop('donation_data', None)
-
         return redirect(session_stripe.url, code=303)
 
     # 🔑 FIX 2: Corrected Stripe exception path 🔑
@@ -179,9 +134,17 @@ def create_checkout_session():
         db.session.rollback()
         current_app.logger.error(f"Stripe Session Creation Failed: {e}")
         # Log critical API key failure again for clarity
-        if isinstance(e, stripe.error.AuthenticationError):
+        if isinstance(e, stripe.AuthenticationError):
             current_app.logger.error("CRITICAL: Invalid Stripe API Key error occurred.")
 
+        # Stripe replays this error for the same idempotency key (for 24h): drop the payment
+        # that never got a session and the intent, so the donor's retry is a new checkout
+        if payment is not None:
+            Payment.query.filter_by(id=payment.id, transaction_status='PENDING_INITIATION',
+                                    stripe_session_id=None).delete()
+            db.session.commit()
+        session.pop('donation_data', None)
+
         flash('Payment gateway error. Please try again.', 'danger')
         return redirect(url_for('donations.donate_ngo', ngo_id=donation_data['ngo_id']))
 
@@ -192,6 +155,27 @@ def create_checkout_session():
         return redirect(url_for('home.index'))
 
 
+def _local_payment(stripe_session_id, is_success):
+    """
+    Looks up the Payment for a Checkout redirect. The redirect itself is never trusted:
+    the Stripe webhook finalizes the payment. Without a webhook secret (local development)
+    finalization is queued from here instead, at most once per STRIPE_REDIRECT_RETRIEVE_SECONDS
+    per session.
+    """
+    payment = Payment.query.filter_by(stripe_session_id=stripe_session_id).first()
+
+    if payment and payment.transaction_status in PENDING_STATUSES and \
+            not current_app.config.get('STRIPE_WEBHOOK_SECRET') and \
+            finalize_requested.get(stripe_session_id) is None:
+        finalize_requested.set(stripe_session_id, True,
+                               ttl=current_app.config.get('STRIPE_REDIRECT_RETRIEVE_SECONDS', 15))
+        submit_task(finalize_payment, stripe_session_id, is_success)
+        # Eager mode (tests) finalizes inline; re-read the status it wrote
+        db.session.expire(payment)
+
+    return payment
+
+
 @donations.route('/payment_success')
 def payment_success():
     stripe_session_id = request.args.get('session_id')
@@ -200,15 +184,18 @@ def payment_success():
         flash('Payment status is ambiguous. Please contact support.', 'warning')
         return redirect(url_for('home.index'))
 
-    payment = finalize_payment(stripe_session_id, is_success=True)
+    payment = _local_payment(stripe_session_id, is_success=True)
+    # Back from Checkout: the next donation is a new intent
+    session.pop('donation_data', None)
 
-    if payment and payment.transaction_status == 'SUCCESS':
-        ngo = VerifiedNGO.query.get(payment.ngo_id)
-        return render_template('payment_success.html', payment=payment, ngo=ngo)
-    else:
-        flash('Payment confirmation failed. Your donation status is pending. Please check your email.', 'danger')
+    if payment is None:
+        flash('Payment not found. Please contact support.', 'danger')
         return redirect(url_for('home.index'))
 
+    ngo = get_ngo_info(payment.ngo_id)
+    return render_template('payment_success.html', payment=payment, ngo=ngo,
+                           pending=payment.transaction_status in PENDING_STATUSES)
+
 
 @donations.route('/payment_failed')
 def payment_failed():
@@ -218,7 +205,40 @@ def payment_failed():
         flash('Payment status is ambiguous. Please contact support.', 'warning')
         return redirect(url_for('home.index'))
 
-    payment = finalize_payment(stripe_session_id, is_success=False)
+    payment = _local_payment(stripe_session_id, is_success=False)
+    session.pop('donation_data', None)
 
     flash('Your payment could not be processed. Please check your card details and try again.', 'danger')
-    return render_template('payment_failed.html', payment=payment)
\ No newline at end of file
+    return render_template('payment_failed.html', payment=payment)
+
+
+@donations.route('/ngo/<int:ngo_id>/donations')
+@login_required
+def donation_history(ngo_id):
+    """JSON donation history for admins and the NGO's own account (matched on contact email)."""
+    ngo = db.session.get(VerifiedNGO, ngo_id)
+    if ngo is None:
+        abort(404)
+    if not current_user.is_admin() and current_user.email.lower() != ngo.contact_email.lower():
+        abort(403)
+
+    config = current_app.config
+    per_page = min(request.args.get('limit', config.get('DONATION_HISTORY_PAGE_SIZE', 50), type=int),
+                   config.get('DONATION_HISTORY_MAX_PAGE_SIZE', 200))
+    # ?status=all includes pending and failed attempts; the default is completed donations only
+    statuses = None if request.args.get('status') == 'all' else ('SUCCESS',)
+
+    page = get_donation_history(ngo_id, decode_cursor(request.args.get('after')), max(per_page, 1), statuses)
+
+    return jsonify(
+        ngo_id=ngo_id,
+        donations=[{
+            'id': entry.id,
+            'created_at': entry.created_at.isoformat(),
+            'amount': entry.amount,
+            'currency': entry.currency,
+            'donor_name': entry.donor_name,
+            'status': entry.transaction_status,
+        } for entry in page.entries],
+        next_cursor=page.next_cursor
+    )
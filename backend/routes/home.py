@@ -1,22 +1,24 @@
 # backend/routes/home.py
 
-from flask import Blueprint, render_template
-from ..models.verified_ngos import VerifiedNGO
+from flask import Blueprint, render_template, request
+from ..services.leaderboard import get_leaderboard_page, decode_cursor
 from datetime import datetime # ADD THIS IMPORT
 
 home = Blueprint('home', __name__)
 
 @home.route('/')
 def index():
+    cursor = decode_cursor(request.args.get('after'))
+
     try:
-        verified_ngos = VerifiedNGO.query.filter_by(is_active=True).order_by(
-            VerifiedNGO.total_donations.desc()
-        ).all()
+        # Keyset-paginated and cached, so cost per hit doesn't grow with the directory size
+        page = get_leaderboard_page(cursor)
 
         # FIX 1: Pass 'now' object for successful rendering
-        return render_template('home.html', title='Home', ngos=verified_ngos, now=datetime.now())
+        return render_template('home.html', title='Home', ngos=page.entries, next_cursor=page.next_cursor,
+                               now=datetime.now())
 
     except Exception as e:
         print(f"Database query error on home page: {e}")
         # FIX 2: Also pass 'now' object when rendering the error state
-        return render_template('home.html', title='Home', ngos=[], error="Failed to load NGOs.", now=datetime.now())
\ No newline at end of file
+        return render_template('home.html', title='Home', ngos=[], error="Failed to load NGOs.", now=datetime.now())
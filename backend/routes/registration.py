@@ -2,9 +2,11 @@ import os
 # 🔥 FIX: Added 'request' and 'CombinedMultiDict' to imports
 from flask import Blueprint, render_template, flash, redirect, url_for, current_app, request
 from werkzeug.datastructures import CombinedMultiDict  # <-- NEEDED FOR FILE UPLOAD FIX
+from werkzeug.exceptions import RequestEntityTooLarge
 from ..services.forms import EmailForm, NGOForm
-from ..services.utils import generate_registration_token, confirm_registration_token, save_document
-from ..services.email import send_email
+from ..services.utils import generate_registration_token, confirm_registration_token
+from ..services.documents import save_document
+from ..services.outbox import queue_email
 from ..models.temp_ngos import TempNGO
 from backend import db
 from datetime import datetime
@@ -12,6 +14,14 @@ from datetime import datetime
 registration = Blueprint('registration', __name__)
 
 
+@registration.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    # Raised while parsing a form whose body exceeds MAX_CONTENT_LENGTH
+    limit = current_app.config.get('MAX_CONTENT_LENGTH') or 0
+    flash(f'Your documents are too large to upload (at most {limit // (1024 * 1024)} MB in total).', 'danger')
+    return redirect(request.url)
+
+
 @registration.route('/register', methods=['GET', 'POST'])
 def register():
     form = EmailForm()
@@ -27,15 +37,18 @@ def register():
         registration_url = url_for('registration.ngo_form', token=token, _external=True)
 
         try:
-            send_email(
+            # Delivered by `flask email drain`; once committed the link is never lost
+            queue_email(
                 to=ngo_email,
                 subject='Complete Your NGO Registration',
                 template='reg_link',
                 url=registration_url
             )
+            db.session.commit()
             flash(f'A secure registration link has been sent to {ngo_email}. Please check your inbox.', 'success')
         except Exception as e:
-            current_app.logger.error(f"Failed to send registration email to {ngo_email}: {e}")
+            db.session.rollback()
+            current_app.logger.error(f"Failed to queue registration email to {ngo_email}: {e}")
             flash('Error: Could not send the registration link. Please check email configuration or try again later.',
                   'danger')
 
@@ -90,6 +103,7 @@ def ngo_form(token):
                 ngo_type=form.ngo_type.data,
                 mission=form.mission.data,
                 website=final_website,  # Use the corrected data (None if empty)
+                location=form.location.data or None,
                 contact_email=email,
                 reg_document_path=final_reg_doc_path,
                 financial_report_path=financial_doc_path
@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+from flask import Blueprint, jsonify, request, abort
+from flask_login import login_required, current_user
+from sqlalchemy import func
+from ..models.donation_rollups import NGODailyDonations, CategoryDailyDonations, PlatformDailyDonations
+from ..models.verified_ngos import VerifiedNGO
+from backend import db
+
+# Donation dashboards. Everything here reads the rollup tables only (services/rollups.py),
+# so a request costs O(days in range), however many payments there are.
+
+reports = Blueprint('reports', __name__)
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+
+
+@reports.before_request
+@login_required
+def require_admin():
+    if not current_user.is_admin():
+        abort(403)
+
+
+def _date_range():
+    """?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive); defaults to the last 30 days."""
+    try:
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') \
+            else end - timedelta(days=DEFAULT_DAYS - 1)
+    except ValueError:
+        abort(400, description='Dates must be YYYY-MM-DD.')
+    if start > end or (end - start).days >= MAX_DAYS:
+        abort(400, description=f'Range must be 1-{MAX_DAYS} days.')
+    return start, end
+
+
+def _day_rows(model, *filters):
+    start, end = _date_range()
+    rows = db.session.query(
+        model.day, model.donation_count, model.amount_cents, model.unique_donors
+    ).filter(model.day.between(start, end), *filters).order_by(model.day).all()
+
+    days = [{
+        'day': row.day.isoformat(),
+        'donations': row.donation_count,
+        'amount_cents': row.amount_cents,
+        'unique_donors': row.unique_donors,
+    } for row in rows]
+    # Unique donors don't add up across days, so totals only carry count and amount
+    totals = {
+        'donations': sum(d['donations'] for d in days),
+        'amount_cents': sum(d['amount_cents'] for d in days),
+    }
+    return {'from': start.isoformat(), 'to': end.isoformat(), 'days': days, 'totals': totals}
+
+
+@reports.route('/platform')
+def platform():
+    return jsonify(_day_rows(PlatformDailyDonations))
+
+
+@reports.route('/ngo/<int:ngo_id>')
+def ngo(ngo_id):
+    name = db.session.query(VerifiedNGO.name).filter_by(id=ngo_id).scalar()
+    if name is None:
+        abort(404)
+    return jsonify(ngo_id=ngo_id, name=name, **_day_rows(NGODailyDonations, NGODailyDonations.ngo_id == ngo_id))
+
+
+@reports.route('/categories')
+def categories():
+    start, end = _date_range()
+    rows = db.session.query(
+        CategoryDailyDonations.ngo_type,
+        func.sum(CategoryDailyDonations.donation_count),
+        func.sum(CategoryDailyDonations.amount_cents)
+    ).filter(CategoryDailyDonations.day.between(start, end)).group_by(
+        CategoryDailyDonations.ngo_type
+    ).order_by(func.sum(CategoryDailyDonations.amount_cents).desc()).all()
+
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'categories': [{'ngo_type': t, 'donations': int(c), 'amount_cents': int(a)} for t, c, a in rows],
+    })
+
+
+@reports.route('/categories/<path:ngo_type>')
+def category(ngo_type):
+    return jsonify(ngo_type=ngo_type, **_day_rows(CategoryDailyDonations, CategoryDailyDonations.ngo_type == ngo_type))
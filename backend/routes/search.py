@@ -1,59 +1,72 @@
-from flask import Blueprint, render_template, request, url_for
-from sqlalchemy import or_
-from ..services.forms import SearchForm
-from ..models.verified_ngos import VerifiedNGO
+from flask import Blueprint, render_template, request, url_for, current_app, jsonify, redirect
+from ..services.forms import SearchForm, SearchQueryForm
+from ..services.directory import search_directory, category_facets, default_listing
+from ..services.suggest import get_name_suggester
 from datetime import datetime
 
 search = Blueprint('search', __name__)
 
 @search.route('/', methods=['GET', 'POST'])
 def index():
-    form = SearchForm(request.form if request.method == 'POST' else None)
+    # Legacy POST form → redirect to the equivalent cacheable GET URL
+    if request.method == 'POST':
+        post_form = SearchForm(request.form)
+        if post_form.validate():
+            return redirect(url_for(
+                'search.index',
+                q=(post_form.search_term.data or '').strip() or None,
+                category=post_form.category.data or None,
+                location=(post_form.location.data or '').strip() or None
+            ), code=303)
+        return redirect(url_for('search.index'), code=303)
+
+    form = SearchQueryForm(request.args)
     results = []
     query_executed = False
+    page = None
 
-    # Default list
-    default_results = VerifiedNGO.query.filter_by(is_active=True).order_by(
-        VerifiedNGO.date_approved.desc()
-    ).limit(12).all()
+    search_term = (form.q.data or '').strip()
+    category = form.category.data or ''
+    location = (form.location.data or '').strip()
 
-    # Run search only on POST
-    if request.method == 'POST' and form.validate():
+    if (search_term or category or location) and form.validate():
         query_executed = True
-
-        query = VerifiedNGO.query.filter_by(is_active=True)
-        filters_applied = False
-
-        # Keyword Search
-        search_term = form.search_term.data
-        if search_term and search_term.strip():
-            search_pattern = f'%{search_term}%'
-            query = query.filter(or_(
-                VerifiedNGO.name.ilike(search_pattern),
-                VerifiedNGO.mission.ilike(search_pattern)
-            ))
-            filters_applied = True
-
-        # Category Filter
-        category = form.category.data
-        if category and category.strip() != '' and category != 'All Categories':
-            search_pattern = f'%{category}%'
-            query = query.filter(VerifiedNGO.ngo_type.ilike(search_pattern))
-            filters_applied = True
-
-        results = query.order_by(VerifiedNGO.name).all()
-
-        # If nothing applied → default
-        if not filters_applied:
-            results = default_results
+        page = search_directory(search_term, category, location=location, radius_km=form.radius.data or 25,
+                                page=form.page.data or 1)
+        results = page.hits
     else:
-        # First load → default
-        results = default_results
+        # First load → default list (only evaluated when no search ran)
+        results = default_listing()
 
-    return render_template(
+    # Category dropdown shows directory-wide counts, plus keyword matches when searching
+    totals, _ = category_facets()
+    matching, matching_capped = category_facets(search_term) if query_executed and search_term else (None, False)
+    form.set_category_counts(totals, matching, matching_capped)
+
+    response = current_app.make_response(render_template(
         'search.html',
         form=form,
         results=results,
+        page=page,
         query_executed=query_executed,
         now=datetime.now()
-    )
+    ))
+
+    # Page carries no per-user state, so browsers and the CDN may share it briefly
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('SEARCH_CACHE_MAX_AGE', 30)
+    return response
+
+
+@search.route('/suggest')
+def suggest():
+    prefix = request.args.get('q', '')[:100]
+    limit = current_app.config.get('SUGGEST_LIMIT', 8)
+
+    suggestions = get_name_suggester().suggest(prefix, limit=limit) if prefix.strip() else []
+
+    response = jsonify(query=prefix, suggestions=suggestions)
+    # Short-lived so the browser/CDN absorbs repeated keystrokes without serving stale names for long
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('SUGGEST_CACHE_MAX_AGE', 60)
+    return response
@@ -0,0 +1,41 @@
+import stripe
+from flask import Blueprint, request, current_app, jsonify, abort
+from ..services.payments import finalize_payment
+
+webhooks = Blueprint('webhooks', __name__)
+
+# Checkout Session events → whether the donation succeeded
+CHECKOUT_EVENTS = {
+    'checkout.session.completed': True,
+    'checkout.session.async_payment_succeeded': True,
+    'checkout.session.async_payment_failed': False,
+    'checkout.session.expired': False,
+}
+
+
+@webhooks.route('/stripe/webhook', methods=['POST'])
+def stripe_webhook():
+    secret = current_app.config.get('STRIPE_WEBHOOK_SECRET')
+    if not secret:
+        abort(404)
+
+    try:
+        event = stripe.Webhook.construct_event(
+            request.get_data(), request.headers.get('Stripe-Signature', ''), secret
+        )
+    except ValueError:
+        return jsonify(error='Invalid payload'), 400
+    except stripe.SignatureVerificationError:
+        return jsonify(error='Invalid signature'), 400
+
+    is_success = CHECKOUT_EVENTS.get(event['type'])
+    if is_success is not None:
+        checkout_session = event['data']['object']
+        # Finalized before acknowledging: the payload carries the session, so this is only
+        # database work. A 500 makes Stripe redeliver the event (finalize_payment is idempotent)
+        try:
+            finalize_payment(checkout_session['id'], is_success, checkout_session, raise_errors=True)
+        except Exception:
+            return jsonify(error='Finalization failed'), 500
+
+    return jsonify(received=True)
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+from .tasks import submit_task
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries also expire after a TTL (seconds)."""
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory, ttl=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl=ttl)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Drops the entries for which ``predicate(key, value)`` is true; returns how many."""
+        with self._lock:
+            doomed = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+            for key in doomed:
+                del self._data[key]
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class VersionCounter:
+    """Monotonic counter; bumping it makes every cache key built from the old value unreachable."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self):
+        return self._value
+
+    def bump(self):
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class PeriodicRebuild:
+    """
+    Holds a structure built from the database (``build()``) and rebuilds it once it is older
+    than ``ttl`` seconds, so changes made through other worker processes show up here too.
+
+    The rebuild runs as a background task while readers keep the current structure. Changes
+    made meanwhile with ``apply(fn)`` are replayed on the rebuilt one, so ``fn`` must be
+    idempotent (add/remove of one NGO).
+    """
+
+    def __init__(self, build, ttl):
+        self._build = build
+        self.ttl = ttl
+        self.value = build()
+        self._built_at = time.monotonic()
+        self._pending = None  # changes applied while a rebuild runs
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.ttl and time.monotonic() - self._built_at > self.ttl:
+            with self._lock:
+                start = self._pending is None and time.monotonic() - self._built_at > self.ttl
+                if start:
+                    self._pending = []
+            if start:
+                submit_task(self._rebuild)
+        return self.value
+
+    def _rebuild(self):
+        try:
+            value = self._build()
+        except Exception:
+            with self._lock:
+                # Keep serving the current structure and try again after another ttl
+                self._pending = None
+                self._built_at = time.monotonic()
+            raise
+
+        with self._lock:
+            for fn in self._pending:
+                fn(value)
+            self.value = value
+            self._pending = None
+            self._built_at = time.monotonic()
+
+    def apply(self, fn):
+        with self._lock:
+            fn(self.value)
+            if self._pending is not None:
+                self._pending.append(fn)
@@ -0,0 +1,20 @@
+from ..models.job_checkpoints import JobCheckpoint
+from backend import db
+
+
+def load_checkpoint(name, default=None):
+    checkpoint = db.session.get(JobCheckpoint, name)
+    return checkpoint.position if checkpoint else default
+
+
+def save_checkpoint(name, position):
+    """Records progress in the caller's transaction, so it commits together with the batch it covers."""
+    checkpoint = db.session.get(JobCheckpoint, name)
+    if checkpoint is None:
+        db.session.add(JobCheckpoint(name=name, position=str(position)))
+    else:
+        checkpoint.position = str(position)
+
+
+def clear_checkpoint(name):
+    db.session.query(JobCheckpoint).filter_by(name=name).delete()
@@ -0,0 +1,246 @@
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from types import SimpleNamespace
+from flask import current_app
+from flask_mail import Message
+from markupsafe import Markup, escape
+from sqlalchemy import and_, case, distinct, func, insert, select
+from .checkpoints import load_checkpoint, save_checkpoint, clear_checkpoint
+from .email import SMTPSender, is_permanent, mail_sender
+from .ratelimit import RateLimiter
+from ..models.donation_rollups import NGODailyDonations, PlatformDailyDonations
+from ..models.email_outbox import EmailOutbox
+from ..models.payments import Payment
+from backend import db
+
+# Monthly impact digest to every donor (distinct payments.donor_email with a successful
+# payment), built for hundreds of thousands of recipients:
+#   * recipients and their per-donor figures come from one aggregate query per window of
+#     DIGEST_READ_SIZE donors, keyset-paged on the normalized email (no cursor held open)
+#   * email/donor_digest.txt/.html are rendered once per run; per-donor fields are filled
+#     into the pre-rendered text by MergeTemplate, without Jinja
+#   * each DIGEST_BATCH_SIZE donors are sent over DIGEST_CONNECTIONS long-lived SMTP
+#     connections, throttled to DIGEST_RATE_LIMIT messages/second overall
+#   * the last donor sent is checkpointed with every batch; an interrupted run resumes
+#     after it, and a finished month is not sent again (unless restarted)
+#   * a message the server didn't take for a transient reason goes to the email outbox,
+#     so `flask email drain` retries it with backoff
+
+SUBJECT = 'Your impact on the NGO Platform in {month}'
+
+FIELDS = ('name', 'summary', 'lifetime_amount')
+
+DONE = '*done*'
+
+_MARKER = '\x1f{}\x1f'
+_MARKER_RE = re.compile('\x1f(\\w+)\x1f')
+
+
+class MergeTemplate:
+    """
+    A template rendered once with its shared context, leaving a marker wherever it prints a
+    per-recipient field ``{{ r.<field> }}``. render() then just joins the literal text with
+    each recipient's values (HTML-escaped for .html templates).
+
+    Per-recipient fields can only be printed, not used in template logic or filters.
+    """
+
+    def __init__(self, name, fields, **context):
+        markers = SimpleNamespace(**{field: Markup(_MARKER.format(field)) for field in fields})
+        rendered = current_app.jinja_env.get_template(name).render(r=markers, **context)
+
+        parts = _MARKER_RE.split(rendered)  # literal, field, literal, field, ..., literal
+        unknown = set(parts[1::2]) - set(fields)
+        if unknown:
+            raise ValueError(f'{name} uses unknown per-recipient fields: {", ".join(sorted(unknown))}')
+        self.head = parts[0]
+        self.parts = list(zip(parts[1::2], parts[2::2]))
+        self.autoescape = name.endswith('.html')
+
+    def render(self, values):
+        out = [self.head]
+        for field, literal in self.parts:
+            value = values[field]
+            out.append(str(escape(value)) if self.autoescape else str(value))
+            out.append(literal)
+        return ''.join(out)
+
+
+def month_range(month):
+    """First day of ``month`` (a date anywhere in it) and of the month after."""
+    start = month.replace(day=1)
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+
+def _money(amount):
+    return f'{amount or 0:,.2f}'
+
+
+def _platform_context(start, end):
+    """The month's platform-wide figures, from the donation rollups."""
+    count, cents = db.session.query(
+        func.coalesce(func.sum(PlatformDailyDonations.donation_count), 0),
+        func.coalesce(func.sum(PlatformDailyDonations.amount_cents), 0),
+    ).filter(PlatformDailyDonations.day >= start, PlatformDailyDonations.day < end).one()
+    ngos = db.session.query(func.count(distinct(NGODailyDonations.ngo_id))).filter(
+        NGODailyDonations.day >= start, NGODailyDonations.day < end
+    ).scalar()
+    return {
+        'month': f'{start:%B %Y}',
+        'platform_amount': _money(cents / 100),
+        'platform_donations': f'{count:,}',
+        'platform_ngos': f'{ngos:,}',
+    }
+
+
+def _recipients(after, start, end, size, active_only):
+    """The next ``size`` donors (by normalized email) after ``after``, with their figures for the digest."""
+    payments = Payment.__table__
+    email = func.lower(func.trim(payments.c.donor_email))
+    in_month = and_(payments.c.created_at >= start, payments.c.created_at < end)
+
+    query = select(
+        email.label('email'),
+        func.max(payments.c.donor_name).label('name'),
+        func.count(case((in_month, payments.c.id))).label('month_donations'),
+        func.sum(case((in_month, payments.c.amount), else_=0)).label('month_amount'),
+        func.count(distinct(case((in_month, payments.c.ngo_id)))).label('month_ngos'),
+        func.sum(payments.c.amount).label('lifetime_amount'),
+    ).where(
+        payments.c.transaction_status == 'SUCCESS',
+        payments.c.created_at < end,
+        email > after,
+    ).group_by(email).order_by(email).limit(size)
+
+    if active_only:
+        query = query.having(func.count(case((in_month, payments.c.id))) > 0)
+    return db.session.execute(query).all()
+
+
+def _values(row, month):
+    if row.month_donations:
+        summary = (f'In {month} you gave ${_money(row.month_amount)} in {row.month_donations} '
+                   f'donation{"s" if row.month_donations != 1 else ""} to {row.month_ngos} '
+                   f'NGO{"s" if row.month_ngos != 1 else ""}. Thank you!')
+    else:
+        summary = f'We missed you in {month}. Every donation helps, whenever you are ready to give again.'
+    return {'name': row.name or 'Donor', 'summary': summary, 'lifetime_amount': _money(row.lifetime_amount)}
+
+
+def _send_all(app, sender, limiter, messages):
+    """Sends messages over one connection at the shared rate; returns [(message, error or None)]."""
+    results = []
+    with app.app_context():
+        for msg in messages:
+            limiter.acquire()
+            try:
+                sender.send(msg)
+                results.append((msg, None))
+            except Exception as e:
+                results.append((msg, e))
+    return results
+
+
+def send_donor_digest(month, batch_size=None, connections=None, rate_limit=None, limit=None, active_only=False,
+                      restart=False, progress=None):
+    """
+    Sends the impact digest for ``month`` (a date anywhere in it) to every donor, resuming
+    after the last checkpointed batch.
+
+    Returns a Counter report (recipients, sent, deferred to the outbox, refused, batches)
+    plus 'elapsed_ms', or 'already_sent' if this month's digest already went out.
+    ``progress`` is called with the report after each batch.
+    """
+    app = current_app._get_current_object()
+    config = app.config
+    read_size = config.get('DIGEST_READ_SIZE', 10000)
+    batch_size = batch_size or config.get('DIGEST_BATCH_SIZE', 500)
+    connections = connections or config.get('DIGEST_CONNECTIONS', 4)
+    limiter = RateLimiter(rate_limit if rate_limit is not None else config.get('DIGEST_RATE_LIMIT', 20))
+
+    start, end = month_range(month)
+    checkpoint = f'donors.digest.{start:%Y-%m}'
+    report = Counter()
+
+    if restart:
+        clear_checkpoint(checkpoint)
+        db.session.commit()
+    after = load_checkpoint(checkpoint, '')
+    if after == DONE:
+        report['already_sent'] = 1
+        return report
+
+    context = _platform_context(start, end)
+    subject = SUBJECT.format(month=context['month'])
+    sender_address = mail_sender()
+    text = MergeTemplate('email/donor_digest.txt', FIELDS, **context)
+    html = MergeTemplate('email/donor_digest.html', FIELDS, **context)
+
+    senders = [SMTPSender() for _ in range(connections)]
+    started = time.perf_counter()
+    finished = False
+
+    try:
+        with ThreadPoolExecutor(max_workers=connections, thread_name_prefix='digest') as pool:
+            while limit is None or report['recipients'] < limit:
+                size = read_size if limit is None else min(read_size, limit - report['recipients'])
+                window = _recipients(after, start, end, size, active_only)
+                db.session.rollback()  # no transaction held open while sending
+                if not window:
+                    finished = True
+                    break
+
+                for i in range(0, len(window), batch_size):
+                    rows = window[i:i + batch_size]
+                    messages = []
+                    for row in rows:
+                        values = _values(row, context['month'])
+                        messages.append(Message(subject, sender=sender_address, recipients=[row.email],
+                                                body=text.render(values), html=html.render(values)))
+
+                    # Round-robin the batch over the connections, one thread each
+                    shares = [messages[k::connections] for k in range(connections)]
+                    deferred = []
+                    for results in pool.map(lambda pair: _send_all(app, pair[0], limiter, pair[1]),
+                                            zip(senders, shares)):
+                        for msg, error in results:
+                            if error is None:
+                                report['sent'] += 1
+                            elif is_permanent(error):
+                                report['refused'] += 1
+                            else:
+                                deferred.append({'recipient': msg.recipients[0], 'sender': msg.sender,
+                                                 'subject': msg.subject, 'body_text': msg.body,
+                                                 'body_html': msg.html, 'last_error': str(error)[:255]})
+
+                    if deferred:
+                        current_app.logger.warning(f"Digest: {len(deferred)} emails deferred to the outbox: "
+                                                   f"{deferred[0]['last_error']}")
+                        db.session.execute(insert(EmailOutbox), deferred)
+                        report['deferred'] += len(deferred)
+                    after = rows[-1].email
+                    save_checkpoint(checkpoint, after)
+                    db.session.commit()
+
+                    report['recipients'] += len(rows)
+                    report['batches'] += 1
+                    if progress:
+                        progress(report)
+
+                if len(window) < size:
+                    finished = True
+                    break
+    finally:
+        for sender in senders:
+            sender.close()
+
+    if finished:
+        save_checkpoint(checkpoint, DONE)
+        db.session.commit()
+
+    report['elapsed_ms'] = int((time.perf_counter() - started) * 1000)
+    return report
@@ -0,0 +1,185 @@
+from collections import namedtuple, Counter
+from flask import current_app
+from sqlalchemy import func
+from .cache import TTLCache, VersionCounter
+from .fulltext import apply_keyword_search
+from .geo import resolve_location, apply_bounding_box, within_radius
+from .inverted_index import apply_inmemory_search
+from .trigram import apply_fuzzy_search
+from .signals import ngo_approved, ngo_deactivated, ngo_reactivated
+from ..models.verified_ngos import VerifiedNGO
+from backend import db
+
+SearchHit = namedtuple('SearchHit', 'id name ngo_type distance_km', defaults=(None,))
+
+# capped: total is a lower bound, because there were more than SEARCH_MAX_RESULTS matches or
+# the in-memory index had more than it hands to SQL. Only the first total hits can be paged to.
+SearchPage = namedtuple('SearchPage', 'hits total page pages fuzzy capped')
+
+# Bumped whenever the set of listed NGOs changes; part of every search cache key.
+# Both are per process: the signals that bump the version only fire in the worker that
+# handled the admin action, so other workers can list a deactivated NGO (or miss a newly
+# approved one) until their entries expire after SEARCH_CACHE_TTL.
+directory_version = VersionCounter()
+
+search_cache = TTLCache(maxsize=512, ttl=300)
+
+
+def normalize_query(text):
+    return ' '.join((text or '').lower().split())
+
+
+def _apply_keyword(query, term):
+    """Returns (query, rank, capped); see inverted_index.apply_inmemory_search."""
+    # Keyword Search (in-process BM25 index if enabled, else the database full-text
+    # index when it has one; both ranked by relevance)
+    if current_app.config.get('INMEMORY_SEARCH_ENABLED'):
+        searched = apply_inmemory_search(query, term)
+        if searched:
+            return searched
+    return (*apply_keyword_search(query, term), False)
+
+
+def _run_search(term, category, location=None, radius_km=None, fuzzy=False):
+    """
+    Returns (ordered hits, total, capped). Hits stop at SEARCH_MAX_RESULTS; ``total`` is the
+    number of hits and ``capped`` says there were more matches.
+    """
+    query = db.session.query(VerifiedNGO.id, VerifiedNGO.name, VerifiedNGO.ngo_type).filter(
+        VerifiedNGO.is_active.is_(True)
+    )
+    ordering = [VerifiedNGO.name, VerifiedNGO.id]
+    capped = False
+
+    if term:
+        if fuzzy:
+            query, rank = apply_fuzzy_search(query, term)
+        else:
+            query, rank, capped = _apply_keyword(query, term)
+        if rank is not None:
+            ordering.insert(0, rank)
+
+    # Category Filter
+    if category:
+        query = query.filter(VerifiedNGO.ngo_type.ilike(f'%{category}%'))
+
+    max_results = current_app.config.get('SEARCH_MAX_RESULTS', 1000)
+
+    # Location Filter: known cities get a radius search, anything else a plain prefix match
+    point = resolve_location(location) if location else None
+    if point:
+        hits, matched = _run_radius_search(query, ordering, point, radius_km, ranked=bool(term),
+                                           max_results=max_results)
+        return hits, len(hits), capped or matched > len(hits)
+    if location:
+        query = query.filter(VerifiedNGO.location.ilike(f'{location}%'))
+
+    # One extra row tells whether there are more matches than can be paged to, without a COUNT
+    rows = query.order_by(*ordering).limit(max_results + 1).all()
+    hits = tuple(SearchHit(*row) for row in rows[:max_results])
+    return hits, len(hits), capped or len(rows) > max_results
+
+
+def _run_radius_search(query, ordering, point, radius_km, ranked, max_results):
+    # The grid cells + lat/lon box are answered from indexes in SQL; only the (small)
+    # box is pulled back to compute exact great-circle distances.
+    query = apply_bounding_box(query, point[0], point[1], radius_km)
+    rows = query.add_columns(VerifiedNGO.latitude, VerifiedNGO.longitude).order_by(*ordering).all()
+
+    inside = within_radius(point[0], point[1], radius_km, [r[3] for r in rows], [r[4] for r in rows])
+    if not ranked:
+        # Without a keyword, nearest first
+        inside.sort(key=lambda item: item[1])
+
+    hits = tuple(SearchHit(*rows[i][:3], distance_km=round(d, 1)) for i, d in inside[:max_results])
+    return hits, len(inside)
+
+
+def _search_with_fallback(term, category, location, radius_km):
+    """Returns (hits, total, fuzzy, capped); retries with typo-tolerant name matching when nothing matched."""
+    hits, total, capped = _run_search(term, category, location, radius_km)
+    if term and not total and current_app.config.get('FUZZY_SEARCH_ENABLED', True):
+        hits, total, capped = _run_search(term, category, location, radius_km, fuzzy=True)
+        return hits, total, True, capped
+    return hits, total, False, capped
+
+
+def search_directory(term, category, location=None, radius_km=25, page=1, per_page=None):
+    """
+    Runs a directory search and returns one page of it.
+
+    The ordered result list for a normalized (term, category, location, radius) is computed
+    once and shared through this process's search_cache, so paging and repeated queries don't
+    go back to the database until the directory changes or the entry expires.
+    """
+    term = normalize_query(term)
+    category = (category or '').strip()
+    location = normalize_query(location)
+    per_page = per_page or current_app.config.get('SEARCH_PAGE_SIZE', 12)
+
+    key = (directory_version.value, term, category, location, radius_km if location else None)
+    hits, total, fuzzy, capped = search_cache.get_or_set(
+        key,
+        lambda: _search_with_fallback(term, category, location, radius_km),
+        ttl=current_app.config.get('SEARCH_CACHE_TTL', 300)
+    )
+
+    # A complete keyword-only result list already holds the keyword facets, and a fuzzy one
+    # means the keyword matched nothing; either way their GROUP BY is saved
+    facet_key = ('facets', directory_version.value, term)
+    if term and not (category or location or capped) and search_cache.get(facet_key) is None:
+        facets = {} if fuzzy else dict(Counter(hit.ngo_type for hit in hits))
+        search_cache.set(facet_key, (facets, False), ttl=current_app.config.get('SEARCH_CACHE_TTL', 300))
+
+    pages = max(1, -(-total // per_page))
+    page = min(max(1, page), pages)
+    start = (page - 1) * per_page
+    return SearchPage(hits[start:start + per_page], total, page, pages, fuzzy, capped)
+
+
+def _count_by_type(term):
+    query = db.session.query(VerifiedNGO.ngo_type, func.count(VerifiedNGO.id)).filter(
+        VerifiedNGO.is_active.is_(True)
+    )
+    capped = False
+    if term:
+        query, _, capped = _apply_keyword(query, term)
+    return dict(query.group_by(VerifiedNGO.ngo_type).all()), capped
+
+
+def category_facets(term=None):
+    """
+    Returns ({ngo_type: count}, capped) for active NGOs, optionally restricted to a keyword;
+    ``capped`` means the keyword counts are lower bounds (see apply_inmemory_search).
+
+    One GROUP BY per distinct keyword; the unfiltered counts (term=None) are what every
+    page load needs and are cached until the directory version changes.
+    """
+    term = normalize_query(term)
+    return search_cache.get_or_set(
+        ('facets', directory_version.value, term),
+        lambda: _count_by_type(term),
+        ttl=current_app.config.get('SEARCH_CACHE_TTL', 300)
+    )
+
+
+def default_listing(limit=12):
+    """Most recently approved NGOs, shown before any search; cached until the directory changes."""
+    def load():
+        rows = db.session.query(VerifiedNGO.id, VerifiedNGO.name, VerifiedNGO.ngo_type).filter(
+            VerifiedNGO.is_active.is_(True)
+        ).order_by(VerifiedNGO.date_approved.desc()).limit(limit).all()
+        return tuple(SearchHit(*row) for row in rows)
+
+    return search_cache.get_or_set(
+        ('default', directory_version.value, limit),
+        load,
+        ttl=current_app.config.get('SEARCH_CACHE_TTL', 300)
+    )
+
+
+@ngo_approved.connect
+@ngo_deactivated.connect
+@ngo_reactivated.connect
+def _bump_directory_version(sender, **kwargs):
+    directory_version.bump()
@@ -0,0 +1,201 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.utils import secure_filename
+from ..models.documents import Document
+from .storage import get_storage
+from backend import db
+
+logger = logging.getLogger(__name__)
+
+# Uploaded documents are stored once per content, under the key ab/cd/<sha256><ext> of the
+# document storage (services/storage.py: UPLOAD_FOLDER or an S3 bucket):
+#   * the upload is streamed in CHUNK_SIZE pieces into a local temp file, hashed while it is
+#     written, and refused past MAX_CONTENT_LENGTH
+#   * the documents row is upserted with ref_count + 1 in the caller's transaction; the
+#     temp file is then put in storage, or dropped if that content is already stored
+#   * release_document() decrements ref_count; `flask documents gc` deletes unreferenced
+#     files after DOCUMENT_GC_GRACE_HOURS, plus files left behind by rolled-back uploads
+#
+# gc deletes a row (DELETE ... WHERE ref_count = 0, which locks it) before deleting its
+# file and commits after, so an upload of the same content racing with it either bumps
+# the old row first (and gc leaves it alone) or creates a new row afterwards and, seeing
+# ref_count 1, writes the file again.
+
+CHUNK_SIZE = 64 * 1024
+
+_STORED_RE = re.compile(r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})(\.\w{1,9})?$')
+
+
+class DocumentTooLarge(ValueError):
+    """Raised when an upload stream is longer than MAX_CONTENT_LENGTH."""
+
+
+def _insert(table):
+    dialect = db.session.get_bind().dialect.name
+    return (postgresql if dialect == 'postgresql' else sqlite).insert(table)
+
+
+def stored_name(sha256, extension):
+    """Storage key of a document."""
+    return f'{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def document_key(path):
+    """Storage key of a stored document path, or None for files saved before content addressing."""
+    match = _STORED_RE.search(path or '')
+    return match.group(0).lstrip('/') if match else None
+
+
+def _stream_to_temp(stream, max_size, directory=None):
+    """Copies ``stream`` into a temp file; returns (temp path, sha256 hex, size)."""
+    fd, temp_path = tempfile.mkstemp(dir=directory)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise DocumentTooLarge(f'Upload is larger than {max_size} bytes.')
+                digest.update(chunk)
+                out.write(chunk)
+        os.chmod(temp_path, 0o644)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+
+def store_document(stream, filename=''):
+    """
+    Streams a file into content-addressed storage and adds a reference to it in the caller's
+    transaction (no commit). Returns its storage key (see document_url).
+    Raises DocumentTooLarge past MAX_CONTENT_LENGTH.
+    """
+    _, extension = os.path.splitext(secure_filename(filename or ''))
+    extension = extension.lower()[:10]
+    storage = get_storage()
+    temp_path, sha256, size = _stream_to_temp(stream, current_app.config.get('MAX_CONTENT_LENGTH'),
+                                              storage.temp_dir())
+
+    try:
+        table = Document.__table__
+        now = datetime.utcnow()
+        stmt = _insert(table).values(sha256=sha256, size=size, extension=extension, ref_count=1,
+                                     created_at=now, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.sha256],
+            set_={'ref_count': table.c.ref_count + 1, 'updated_at': now}
+        ).returning(table.c.ref_count, table.c.extension)
+        ref_count, extension = db.session.execute(stmt).one()
+
+        key = stored_name(sha256, extension)
+        if ref_count == 1 or not storage.exists(key):
+            try:
+                storage.put(temp_path, key, mimetypes.guess_type(key)[0])
+            except Exception:
+                # Take the reference back in case the caller commits anyway (save_document returns None)
+                release_document(key)
+                raise
+        else:
+            logger.info(f"Document {sha256[:12]} already stored ({ref_count} references)")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return key
+
+
+def save_document(file_data):
+    """
+    Stores an uploaded FileStorage (see store_document) and returns its storage key, or None
+    if there was no file or it could not be stored.
+    """
+    if not file_data or not getattr(file_data, 'filename', None):
+        logger.warning("save_document received no valid file data.")
+        return None
+
+    try:
+        return store_document(file_data.stream, file_data.filename)
+    except Exception as e:
+        logger.error(f"FILE SAVE FAILED: Could not store {file_data.filename}. Error: {e}")
+        return None
+
+
+def release_document(path):
+    """Drops one reference to a stored document in the caller's transaction; ignores other paths."""
+    match = _STORED_RE.search(path or '')
+    if not match:
+        return
+    table = Document.__table__
+    db.session.execute(
+        update(table).where(table.c.sha256 == match.group(3), table.c.ref_count > 0)
+        .values(ref_count=table.c.ref_count - 1, updated_at=datetime.utcnow())
+    )
+
+
+def document_url(path):
+    """
+    Where an admin downloads a stored document: a static URL or a pre-signed S3 URL, so the
+    file bytes never pass through an app worker. None when local storage is outside the
+    static folder (the caller then sends the file itself).
+    """
+    key = document_key(path)
+    if key is None:
+        return None
+    return get_storage().url(key)
+
+
+def collect_garbage(grace_hours=None, batch_size=500):
+    """
+    Deletes documents unreferenced for ``grace_hours`` (DOCUMENT_GC_GRACE_HOURS), then stored
+    files with no documents row (uploads whose transaction rolled back) and uploads abandoned
+    halfway (temp files, incomplete S3 multipart uploads) older than that. Returns a Counter report.
+    """
+    grace_hours = grace_hours if grace_hours is not None else current_app.config.get('DOCUMENT_GC_GRACE_HOURS', 24)
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    storage = get_storage()
+    table = Document.__table__
+    report = Counter()
+
+    while True:
+        doomed = select(table.c.sha256).where(table.c.ref_count == 0, table.c.updated_at < cutoff).limit(batch_size)
+        rows = db.session.execute(
+            delete(table).where(table.c.sha256.in_(doomed.scalar_subquery()), table.c.ref_count == 0)
+            .returning(table.c.sha256, table.c.extension, table.c.size)
+        ).all()
+        storage.delete(stored_name(row.sha256, row.extension) for row in rows)
+        report['bytes_freed'] += sum(row.size for row in rows)
+        db.session.commit()
+        report['deleted'] += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    # Files nobody references: their upload's transaction rolled back after the file was stored
+    candidates = {}
+    for key in storage.list(cutoff):
+        match = _STORED_RE.fullmatch(key)
+        if match:
+            candidates[match.group(3)] = key
+
+    shas = list(candidates)
+    for i in range(0, len(shas), batch_size):
+        chunk = shas[i:i + batch_size]
+        known = set(db.session.execute(select(table.c.sha256).where(table.c.sha256.in_(chunk))).scalars())
+        report['orphans'] += storage.delete(candidates[sha256] for sha256 in chunk if sha256 not in known)
+    db.session.rollback()
+
+    report['temp_files'] += storage.purge_incomplete(cutoff)
+    return report
@@ -0,0 +1,51 @@
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import tuple_
+from ..models.payments import Payment
+from backend import db
+
+# Plain columns of the base `payments` table only: no ORM instances, so no polymorphic
+# load of the successful_payments / failed_payments subtables.
+DonationRecord = namedtuple('DonationRecord', 'id created_at amount currency donor_name transaction_status')
+
+DonationHistoryPage = namedtuple('DonationHistoryPage', 'entries next_cursor')
+
+
+def encode_cursor(entry):
+    return f"{entry.created_at.isoformat()}|{entry.id}"
+
+
+def decode_cursor(raw):
+    """Returns (created_at, id) from an 'after' query arg, or None if missing/malformed."""
+    if not raw:
+        return None
+    try:
+        created_at, payment_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(payment_id)
+    except ValueError:
+        return None
+
+
+def get_donation_history(ngo_id, cursor=None, per_page=50, statuses=('SUCCESS',)):
+    """Newest-first page of an NGO's payments, keyset-paginated on (created_at, id)."""
+    query = db.session.query(
+        Payment.id,
+        Payment.created_at,
+        Payment.amount,
+        Payment.currency,
+        Payment.donor_name,
+        Payment.transaction_status
+    ).filter(Payment.ngo_id == ngo_id, Payment.created_at.isnot(None))
+
+    if statuses:
+        query = query.filter(Payment.transaction_status.in_(statuses))
+
+    if cursor:
+        # Seeks into ix_payments_ngo_created instead of skipping OFFSET rows
+        query = query.filter(tuple_(Payment.created_at, Payment.id) < tuple_(*cursor))
+
+    rows = query.order_by(Payment.created_at.desc(), Payment.id.desc()).limit(per_page + 1).all()
+
+    entries = [DonationRecord(*row) for row in rows[:per_page]]
+    next_cursor = encode_cursor(entries[-1]) if len(rows) > per_page else None
+    return DonationHistoryPage(entries, next_cursor)
@@ -0,0 +1,112 @@
+import random
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from flask import current_app
+from sqlalchemy import bindparam, func, select, update
+from ..models.verified_ngos import VerifiedNGO
+from ..models.donation_counters import DonationCounterShard
+from .ngo_cache import invalidate_ngo
+from .signals import donation_totals_folded
+from backend import db
+
+# NGO donation totals are kept in whole cents and only ever changed with
+# `UPDATE ... SET total = total + :cents`, never read-modify-write in Python, so concurrent
+# donations can't overwrite each other. Hot NGOs can additionally spread credits over
+# several counter rows (sharded counters) that are folded into the total periodically.
+
+MAX_COUNTER_SHARDS = 64
+
+
+def to_cents(amount):
+    return int(Decimal(str(amount)).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def credit_donation(ngo_id, cents, shards=0):
+    """
+    Adds ``cents`` to an NGO's total inside the caller's transaction and returns the new
+    total, or None if there is no such NGO.
+
+    With ``shards`` > 0 the credit goes to one random counter shard instead of the NGO row
+    (and None is returned: the total only changes when the shards are folded).
+    """
+    if shards:
+        counters = DonationCounterShard.__table__
+        result = db.session.execute(
+            update(counters)
+            .where(counters.c.ngo_id == ngo_id, counters.c.shard == random.randrange(shards))
+            .values(cents=counters.c.cents + cents)
+        )
+        if result.rowcount:
+            return None
+        # Shard rows missing (sharding switched on without `flask donations shard`): credit directly
+
+    ngos = VerifiedNGO.__table__
+    return db.session.execute(
+        update(ngos)
+        .where(ngos.c.id == ngo_id)
+        .values(total_donations_cents=ngos.c.total_donations_cents + cents)
+        .returning(ngos.c.total_donations_cents)
+    ).scalar()
+
+
+def fold_counter_shards(ngo_id=None):
+    """
+    Moves the cents accumulated in counter shards into total_donations_cents, in one
+    transaction. Returns {ngo_id: folded cents}.
+    """
+    counters = DonationCounterShard.__table__
+    query = select(counters.c.ngo_id, counters.c.shard, counters.c.cents).where(counters.c.cents != 0)
+    if ngo_id is not None:
+        query = query.where(counters.c.ngo_id == ngo_id)
+
+    rows = db.session.execute(query).all()
+    if not rows:
+        return {}
+
+    folded = defaultdict(int)
+    for row_ngo_id, _, cents in rows:
+        folded[row_ngo_id] += cents
+
+    # Subtract what was read rather than zeroing, so credits landing meanwhile survive the fold
+    db.session.execute(
+        update(counters)
+        .where(counters.c.ngo_id == bindparam('b_ngo_id'), counters.c.shard == bindparam('b_shard'))
+        .values(cents=counters.c.cents - bindparam('b_cents')),
+        [{'b_ngo_id': n, 'b_shard': s, 'b_cents': c} for n, s, c in rows]
+    )
+
+    ngos = VerifiedNGO.__table__
+    db.session.execute(
+        update(ngos)
+        .where(ngos.c.id == bindparam('b_ngo_id'))
+        .values(total_donations_cents=ngos.c.total_donations_cents + bindparam('b_cents')),
+        [{'b_ngo_id': n, 'b_cents': c} for n, c in folded.items()]
+    )
+    db.session.commit()
+    donation_totals_folded.send(current_app._get_current_object(), folded=dict(folded))
+    return dict(folded)
+
+
+def set_counter_shards(ngo, shards):
+    """Turns sharded counting on (shards > 0) or off (0) for an NGO. Commits."""
+    shards = max(0, min(int(shards), MAX_COUNTER_SHARDS))
+
+    existing = {s for (s,) in db.session.query(DonationCounterShard.shard).filter_by(ngo_id=ngo.id)}
+    db.session.add_all(
+        DonationCounterShard(ngo_id=ngo.id, shard=s, cents=0) for s in range(shards) if s not in existing
+    )
+    ngo.counter_shards = shards
+    db.session.commit()
+    invalidate_ngo(ngo.id)
+
+    if not shards:
+        fold_counter_shards(ngo.id)
+    return shards
+
+
+def current_total_cents(ngo_id):
+    """Exact total including credits not folded yet (one extra indexed query)."""
+    folded = db.session.query(VerifiedNGO.total_donations_cents).filter_by(id=ngo_id).scalar() or 0
+    pending = db.session.query(func.coalesce(func.sum(DonationCounterShard.cents), 0)) \
+        .filter_by(ngo_id=ngo_id).scalar()
+    return folded + pending
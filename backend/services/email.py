@@ -1,26 +1,235 @@
-from threading import Thread
+import queue
+import smtplib
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
 from flask import current_app, render_template
 from flask_mail import Message
 from backend import mail
 
-def send_async_email(app, msg):
-    with app.app_context():
-        mail.send(msg)
+# Outgoing mail goes through a bounded queue drained by a few long-lived worker threads
+# (instead of one thread and one SMTP connection per message). `flask email drain`
+# (services/outbox.py) runs one per drain process and feeds it the outbox rows it claims:
+#   * each worker keeps one SMTP connection (SMTPSender) open and sends whatever is
+#     queued in batches over it; the connection is closed after MAIL_IDLE_SECONDS without
+#     mail and reopened (once per message) when the server drops it
+#   * backpressure: when MAIL_QUEUE_SIZE messages are waiting, submit() blocks (for up to
+#     put_timeout, then raises MailQueueFull), so the drain claims no faster than it sends
+#   * on shutdown the queue is drained (up to MAIL_SHUTDOWN_TIMEOUT) before the workers exit
+#   * metrics: queue depth, sent/failed/rejected counts, SMTP send and queue-wait latencies
+# submit() returns a Future that resolves once the message is sent, or fails with its error.
 
-def send_email(to, subject, template, **kwargs):
-    app = current_app._get_current_object()
+_STOP = object()
+_REJECTED = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
 
-    sender = app.config.get('MAIL_USERNAME') or 'noreply@ngoplatform.com'
 
+class MailQueueFull(Exception):
+    """Raised by MailQueue.submit when the queue stayed full for its put_timeout."""
+
+
+def _smtp_codes(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return [code for code, _ in error.recipients.values()]
+    return [getattr(error, 'smtp_code', None)]
+
+
+def is_refused(error):
+    """True if the server refused this one message (bad recipient, ...) rather than the connection failing."""
+    return isinstance(error, _REJECTED) and 421 not in _smtp_codes(error)
+
+
+def is_permanent(error):
+    """True if the server refused the message for good (5xx); a 4xx refusal (mailbox busy, ...) is worth retrying."""
+    codes = _smtp_codes(error)
+    return is_refused(error) and bool(codes) and all(isinstance(code, int) and 500 <= code < 600 for code in codes)
+
+
+class SMTPSender:
+    """One SMTP connection (mail.connect()), opened on first send and reopened once when it goes bad."""
+
+    def __init__(self):
+        self.connection = None
+        self.connects = 0
+
+    def send(self, msg):
+        """Sends msg; raises the SMTP/socket error if it could not be sent (even after reconnecting)."""
+        for attempt in (1, 2):
+            try:
+                if self.connection is None:
+                    connection = mail.connect()
+                    connection.__enter__()
+                    self.connection = connection
+                    self.connects += 1
+                self.connection.send(msg)
+                return
+            except OSError as e:  # SMTPException is an OSError too
+                if is_refused(e):
+                    raise
+                # Dropped connection, refused connect, timeout or 421 (server closing the connection)
+                self.close()
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.__exit__(None, None, None)
+            except OSError:
+                pass  # already dropped by the server
+            self.connection = None
+
+
+class MailQueue:
+    def __init__(self, app, workers=2, maxsize=1000, batch_size=50, put_timeout=None, idle_timeout=30.0,
+                 window=1024):
+        self.app = app
+        self.workers = workers
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue(maxsize)
+        self._threads = []
+        self._senders = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.sent = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.send_ms = deque(maxlen=window)
+        self.wait_ms = deque(maxlen=window)
+
+    def _start(self):
+        with self._lock:
+            if self._threads or self._closed:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'ngo-mail-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, msg):
+        """Queues msg; returns a Future resolved when it is sent (or failed with the SMTP/socket error)."""
+        if self._closed:
+            raise MailQueueFull('Mail queue is shut down.')
+        self._start()
+        future = Future()
+        try:
+            self._queue.put((time.perf_counter(), msg, future), timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise MailQueueFull(f'Mail queue full ({self._queue.maxsize} messages waiting).') from None
+        return future
+
+    def shutdown(self, timeout=30.0):
+        """Stops accepting mail, sends everything already queued, then stops the workers."""
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+        deadline = time.monotonic() + timeout
+        for _ in threads:
+            try:
+                self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        return self._queue.qsize()
+
+    def _next_batch(self, connected):
+        # Block for the first message (closing an idle connection), then take what's already queued
+        try:
+            first = self._queue.get(timeout=self.idle_timeout if connected else None)
+        except queue.Empty:
+            return None
+        batch = [first]
+        while first is not _STOP and len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _send(self, sender, enqueued_at, msg, future):
+        started = time.perf_counter()
+        try:
+            sender.send(msg)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            future.set_exception(e)
+            return
+        finished = time.perf_counter()
+        with self._lock:
+            self.sent += 1
+            self.send_ms.append((finished - started) * 1000)
+            self.wait_ms.append((finished - enqueued_at) * 1000)
+        future.set_result(None)
+
+    def _work(self):
+        sender = SMTPSender()
+        with self._lock:
+            self._senders.append(sender)
+        with self.app.app_context():
+            while True:
+                batch = self._next_batch(sender.connection is not None)
+                if batch is None:
+                    sender.close()
+                    continue
+
+                stop = batch[-1] is _STOP
+                messages = batch[:-1] if stop else batch
+                for enqueued_at, msg, future in messages:
+                    self._send(sender, enqueued_at, msg, future)
+                for _ in batch:
+                    self._queue.task_done()
+                if messages:
+                    with self._lock:
+                        self.batches += 1
+
+                if stop:
+                    sender.close()
+                    return
+
+    def metrics(self):
+        with self._lock:
+            send_ms, wait_ms = sorted(self.send_ms), sorted(self.wait_ms)
+            counts = {'sent': self.sent, 'failed': self.failed, 'rejected': self.rejected,
+                      'batches': self.batches, 'connects': sum(sender.connects for sender in self._senders)}
+
+        def percentile(ordered, p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 1) if ordered else None
+
+        return {
+            'queue_depth': self._queue.qsize(),
+            'queue_size': self._queue.maxsize,
+            'workers': sum(thread.is_alive() for thread in self._threads),
+            **counts,
+            'send_p50_ms': percentile(send_ms, 50),
+            'send_p95_ms': percentile(send_ms, 95),
+            'wait_p50_ms': percentile(wait_ms, 50),
+            'wait_p95_ms': percentile(wait_ms, 95),
+        }
+
+
+def mail_sender():
+    return current_app.config.get('MAIL_USERNAME') or 'noreply@ngoplatform.com'
+
+
+def render_email(to, subject, template, **kwargs):
+    """A Message with email/<template>.txt and .html rendered as its bodies."""
     msg = Message(
         subject,
-        sender=sender,
+        sender=mail_sender(),
         recipients=[to]
     )
 
     msg.body = render_template(f'email/{template}.txt', **kwargs)
     msg.html = render_template(f'email/{template}.html', **kwargs)
-
-    thr = Thread(target=send_async_email, args=[app, msg])
-    thr.start()
-    return thr
\ No newline at end of file
+    return msg
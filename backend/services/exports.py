@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import select, types
+from ..models.payments import Payment
+from ..models.successful_payments import SuccessfulPayment
+from ..models.failed_payments import FailedPayment
+from ..models.verified_ngos import VerifiedNGO
+from backend import db
+
+# pyarrow is optional (it's large, and only the Parquet format needs it)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pq = None
+
+# Bulk exports for finance. Rows come off a server-side cursor (yield_per) one partition
+# at a time and each partition is encoded and handed out before the next is fetched, so
+# memory stays flat however many rows there are. No ORM instances are built.
+
+EXPORT_BATCH_SIZE = 5000
+
+
+def _payments_select():
+    payments = Payment.__table__
+    successful = SuccessfulPayment.__table__
+    failed = FailedPayment.__table__
+    return select(
+        payments.c.id, payments.c.created_at, payments.c.ngo_id, payments.c.donor_name,
+        payments.c.donor_email, payments.c.amount, payments.c.currency, payments.c.transaction_status,
+        payments.c.stripe_session_id, successful.c.stripe_charge_id, failed.c.stripe_error_code
+    ).select_from(
+        payments.outerjoin(successful, successful.c.id == payments.c.id)
+                .outerjoin(failed, failed.c.id == payments.c.id)
+    ), payments.c.created_at, payments.c.id
+
+
+def _ngos_select():
+    ngos = VerifiedNGO.__table__
+    return select(
+        ngos.c.id, ngos.c.name, ngos.c.ngo_type, ngos.c.contact_email, ngos.c.contact_phone,
+        ngos.c.location, ngos.c.is_active, ngos.c.total_donations_cents, ngos.c.date_approved
+    ), ngos.c.date_approved, ngos.c.id
+
+
+# name -> builder returning (select, column the date range filters on, order column)
+DATASETS = {
+    'payments': _payments_select,
+    'ngos': _ngos_select,
+}
+
+
+def _jsonable(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+# Spreadsheets run a cell starting with one of these as a formula (donor names and NGO
+# fields are user input); a leading ' makes them show it as text
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_safe(value):
+    return "'" + value if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+
+
+def _encode_csv(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows([_csv_safe(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _encode_jsonl(columns, partitions):
+    for rows in partitions:
+        yield ''.join(
+            json.dumps(dict(zip(columns, map(_jsonable, row))), separators=(',', ':')) + '\n' for row in rows
+        ).encode()
+
+
+class _ChunkSink:
+    """Write-only file object ParquetWriter writes into; drained after every row group."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_type(column):
+    if isinstance(column.type, types.Boolean):
+        return pa.bool_()
+    if isinstance(column.type, types.Integer):
+        return pa.int64()
+    if isinstance(column.type, types.Float):
+        return pa.float64()
+    if isinstance(column.type, types.DateTime):
+        return pa.timestamp('us')
+    if isinstance(column.type, types.Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _encode_parquet(columns, partitions, selected):
+    schema = pa.schema([(name, _arrow_type(column)) for name, column in zip(columns, selected)])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in partitions:
+            # One row group per partition
+            writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+# name -> (mimetype, file extension)
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def check_export(dataset, fmt):
+    """Raises ValueError with a user-facing message for an unknown or unavailable export."""
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}' (choose from {', '.join(DATASETS)}).")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}' (choose from {', '.join(FORMATS)}).")
+    if fmt == 'parquet' and pa is None:
+        raise ValueError('Parquet export needs pyarrow (pip install pyarrow).')
+
+
+def stream_export(dataset, fmt, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yields the export as byte chunks, one per batch of rows. ``start``/``end`` bound the
+    dataset's date column (start inclusive, end exclusive).
+    """
+    check_export(dataset, fmt)
+    query, date_column, order_column = DATASETS[dataset]()
+    if start is not None:
+        query = query.where(date_column >= start)
+    if end is not None:
+        query = query.where(date_column < end)
+    query = query.order_by(order_column)
+
+    selected = list(query.selected_columns)
+    columns = [column.name for column in selected]
+
+    # yield_per streams from a server-side cursor on PostgreSQL (stream_results) instead of
+    # buffering the whole result in the driver
+    result = db.session.execute(query.execution_options(yield_per=batch_size))
+    partitions = (list(rows) for rows in result.partitions())
+    try:
+        if fmt == 'csv':
+            yield from _encode_csv(columns, partitions)
+        elif fmt == 'jsonl':
+            yield from _encode_jsonl(columns, partitions)
+        else:
+            yield from _encode_parquet(columns, partitions, selected)
+    finally:
+        result.close()
@@ -1,7 +1,7 @@
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
-from wtforms import StringField, TextAreaField, SelectField, SubmitField, PasswordField, BooleanField, DecimalField, \
-    HiddenField
+from wtforms import Form, StringField, TextAreaField, SelectField, SubmitField, PasswordField, BooleanField, \
+    DecimalField, HiddenField, IntegerField
 from wtforms.validators import DataRequired, Email, Length, URL, Optional, NumberRange, InputRequired
 
 NGO_TYPES = [
@@ -36,6 +36,8 @@ class NGOForm(FlaskForm):
         Length(min=50, max=1000)
     ])
 
+    location = StringField('City / Location', validators=[Optional(), Length(max=100)])
+
     # Final fix (No validators) remains here
     contact_email = StringField('Contact Email', validators=[], render_kw={'readonly': True})
 
@@ -69,6 +71,33 @@ class SearchForm(FlaskForm):
     submit = SubmitField('Search')
 
 
+class SearchQueryForm(Form):
+    # Plain (non-CSRF) form parsed from the GET query string so search pages stay bookmarkable/CDN-cacheable
+    q = StringField('Keyword Search', validators=[Optional(), Length(max=100)])
+    category = SelectField('Category', choices=[('', 'All Categories')] + NGO_TYPES, validators=[Optional()])
+    location = StringField('Location/City', validators=[Optional(), Length(max=50)])
+    radius = SelectField('Within', choices=[(10, '10 km'), (25, '25 km'), (50, '50 km'), (100, '100 km'), (250, '250 km')],
+                         coerce=int, default=25, validators=[Optional()])
+    page = IntegerField('Page', default=1, validators=[Optional(), NumberRange(min=1)])
+
+    def set_category_counts(self, totals, matching=None, matching_capped=False):
+        """
+        Appends NGO counts to the category labels, e.g. 'Health & Wellness (3 of 120)', or
+        '(3+ of 120)' when the keyword counts are lower bounds.
+        """
+        plus = '+' if matching_capped else ''
+
+        def label(text, total, matched):
+            return f'{text} ({total})' if matched is None else f'{text} ({matched}{plus} of {total})'
+
+        choices = [('', label('All Categories', sum(totals.values()),
+                              None if matching is None else sum(matching.values())))]
+        for value, text in NGO_TYPES:
+            choices.append((value, label(text, totals.get(value, 0),
+                                         None if matching is None else matching.get(value, 0))))
+        self.category.choices = choices
+
+
 class DonationForm(FlaskForm):
     donor_name = StringField('Your Name (Optional)', validators=[Length(max=100), Optional()])
 
@@ -0,0 +1,130 @@
+import re
+from sqlalchemy import DDL, event, func, inspect, literal_column, table, column, text
+from ..models.verified_ngos import VerifiedNGO
+from backend import db
+
+# Full-text search over the verified NGO directory.
+#   SQLite (dev/testing): an FTS5 table kept in sync with verified_ngos by triggers.
+#   PostgreSQL (production): a generated tsvector column with a GIN index.
+# Both only ever index what the directory shows, so deactivated NGOs drop out automatically.
+
+FTS_TABLE = 'verified_ngos_fts'
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(name, mission, ngo_type)",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON verified_ngos WHEN new.is_active BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, mission, ngo_type) VALUES (new.id, new.name, new.mission, new.ngo_type);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON verified_ngos BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, mission, ngo_type, is_active ON verified_ngos BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, name, mission, ngo_type)
+            SELECT new.id, new.name, new.mission, new.ngo_type WHERE new.is_active;
+    END""",
+]
+
+POSTGRES_DDL = [
+    """ALTER TABLE verified_ngos ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(ngo_type, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(mission, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_verified_ngos_search_vector ON verified_ngos USING GIN (search_vector)",
+]
+
+# bm25() column weights for (name, mission, ngo_type): a hit in the name matters most
+SQLITE_BM25_WEIGHTS = (10.0, 1.0, 2.0)
+
+_fts_table = table(FTS_TABLE, column('rowid'))
+_availability = {}
+
+
+def _register_ddl():
+    # Hooked to the table so db.create_all() (seed.py, tests) builds the index as well
+    for statement in SQLITE_DDL:
+        event.listen(VerifiedNGO.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    for statement in POSTGRES_DDL:
+        event.listen(VerifiedNGO.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+
+_register_ddl()
+
+
+def fulltext_available(engine=None):
+    """True if the current database has the full-text structures (checked once per engine)."""
+    engine = engine or db.engine
+    key = str(engine.url)
+
+    if key not in _availability:
+        inspector = inspect(engine)
+        if engine.dialect.name == 'sqlite':
+            _availability[key] = inspector.has_table(FTS_TABLE)
+        elif engine.dialect.name == 'postgresql':
+            columns = inspector.get_columns('verified_ngos')
+            _availability[key] = any(c['name'] == 'search_vector' for c in columns)
+        else:
+            _availability[key] = False
+
+    return _availability[key]
+
+
+def build_fts5_query(term):
+    """Turns free text into a safe FTS5 MATCH expression: every word must match, as a prefix."""
+    words = re.findall(r'\w+', term.lower())
+    return ' AND '.join(f'"{word}"*' for word in words)
+
+
+def apply_keyword_search(query, term):
+    """
+    Restricts a VerifiedNGO query to rows matching ``term``.
+
+    Returns (query, rank) where ``rank`` is an ORDER BY expression for relevance, or None
+    when the database has no full-text index and the ilike scan was used instead.
+    """
+    engine = db.engine
+
+    if fulltext_available(engine):
+        if engine.dialect.name == 'sqlite':
+            match = build_fts5_query(term)
+            if match:
+                rank = func.bm25(literal_column(FTS_TABLE), *SQLITE_BM25_WEIGHTS)
+                query = query.join(_fts_table, _fts_table.c.rowid == VerifiedNGO.id).filter(
+                    literal_column(FTS_TABLE).op('MATCH')(match)
+                )
+                return query, rank.asc()
+
+        elif engine.dialect.name == 'postgresql':
+            ts_query = func.websearch_to_tsquery('english', term)
+            search_vector = literal_column('verified_ngos.search_vector')
+            query = query.filter(search_vector.op('@@')(ts_query))
+            return query, func.ts_rank_cd(search_vector, ts_query).desc()
+
+    search_pattern = f'%{term}%'
+    query = query.filter(db.or_(
+        VerifiedNGO.name.ilike(search_pattern),
+        VerifiedNGO.mission.ilike(search_pattern)
+    ))
+    return query, None
+
+
+def rebuild_fulltext_index():
+    """(Re)creates the full-text structures and repopulates them from verified_ngos."""
+    engine = db.engine
+
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            for statement in SQLITE_DDL:
+                conn.execute(text(statement))
+            conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+            conn.execute(text(
+                f"INSERT INTO {FTS_TABLE}(rowid, name, mission, ngo_type) "
+                f"SELECT id, name, mission, ngo_type FROM verified_ngos WHERE is_active"
+            ))
+        elif engine.dialect.name == 'postgresql':
+            # The generated column recomputes itself; only the structures need to exist
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+
+    _availability.pop(str(engine.url), None)
@@ -0,0 +1,154 @@
+import csv
+import math
+import os
+from functools import lru_cache
+from ..models.verified_ngos import VerifiedNGO
+
+# NumPy is optional: the Vercel build has a tight lambda size limit, so we fall back to
+# plain Python for the exact distance step when it isn't installed.
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'gazetteer.csv')
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Grid index: the globe is cut into GRID_DEGREES x GRID_DEGREES cells and every NGO stores
+# the integer id of its cell in VerifiedNGO.geo_cell.
+GRID_DEGREES = 0.5
+GRID_COLUMNS = int(360 / GRID_DEGREES)
+
+# Beyond this many cells an IN (...) list stops paying off; the lat/lon range does the work
+MAX_GRID_CELLS = 400
+
+
+def _normalize_place(text):
+    return ' '.join((text or '').lower().replace('.', '').split())
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer():
+    """Maps normalized 'city' and 'city, country' names to (latitude, longitude)."""
+    places = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            coords = (float(row['latitude']), float(row['longitude']))
+            name = _normalize_place(row['name'])
+            places.setdefault(name, coords)
+            places[f"{name}, {row['country'].lower()}"] = coords
+    return places
+
+
+def resolve_location(text):
+    """Returns (latitude, longitude) for a city name from the bundled gazetteer, or None."""
+    place = _normalize_place(text)
+    if not place:
+        return None
+
+    places = load_gazetteer()
+    if place in places:
+        return places[place]
+
+    # "Pune, Maharashtra, India" → try the leading city name on its own
+    city = place.split(',')[0].strip()
+    return places.get(city)
+
+
+def grid_cell(latitude, longitude):
+    row = int((min(latitude, 89.999999) + 90) // GRID_DEGREES)
+    col = int((longitude + 180) % 360 // GRID_DEGREES)
+    return row * GRID_COLUMNS + col
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon); longitude bounds are None if the box wraps a pole or the antimeridian."""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+
+    delta_lon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(latitude))))
+    min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+
+    if min_lon < -180 or max_lon > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def cells_for_box(min_lat, max_lat, min_lon, max_lon):
+    """Grid cell ids covering the box, or None if there are too many to be a useful filter."""
+    if min_lon is None:
+        return None
+
+    first_row = int((min_lat + 90) // GRID_DEGREES)
+    last_row = int((min(max_lat, 89.999999) + 90) // GRID_DEGREES)
+    first_col = int((min_lon + 180) // GRID_DEGREES)
+    last_col = int((min(max_lon, 179.999999) + 180) // GRID_DEGREES)
+
+    if (last_row - first_row + 1) * (last_col - first_col + 1) > MAX_GRID_CELLS:
+        return None
+
+    return [row * GRID_COLUMNS + col
+            for row in range(first_row, last_row + 1)
+            for col in range(first_col, last_col + 1)]
+
+
+def apply_bounding_box(query, latitude, longitude, radius_km):
+    """SQL prefilter: restricts a VerifiedNGO query to the grid cells and lat/lon box around a point."""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+
+    cells = cells_for_box(min_lat, max_lat, min_lon, max_lon)
+    if cells is not None:
+        query = query.filter(VerifiedNGO.geo_cell.in_(cells))
+
+    query = query.filter(VerifiedNGO.latitude.between(min_lat, max_lat))
+    if min_lon is not None:
+        query = query.filter(VerifiedNGO.longitude.between(min_lon, max_lon))
+    return query
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distances (km) from one point to many; vectorized when NumPy is available."""
+    if np is not None:
+        lat1 = np.radians(latitude)
+        lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+        dlat = lat2 - lat1
+        dlon = np.radians(np.asarray(longitudes, dtype=np.float64) - longitude)
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    lat1 = math.radians(latitude)
+    distances = []
+    for lat, lon in zip(latitudes, longitudes):
+        lat2 = math.radians(lat)
+        a = math.sin((lat2 - lat1) / 2) ** 2 + \
+            math.cos(lat1) * math.cos(lat2) * math.sin(math.radians(lon - longitude) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0))))
+    return distances
+
+
+def within_radius(latitude, longitude, radius_km, latitudes, longitudes):
+    """Returns a list of (position, distance_km) for the points inside the radius."""
+    if not latitudes:
+        return []
+
+    distances = haversine_km(latitude, longitude, latitudes, longitudes)
+    if np is not None:
+        positions = np.flatnonzero(distances <= radius_km)
+        return [(int(i), float(distances[i])) for i in positions]
+    return [(i, d) for i, d in enumerate(distances) if d <= radius_km]
+
+
+def geocode_ngo(ngo):
+    """Fills latitude/longitude/geo_cell on a VerifiedNGO from its location text (if resolvable)."""
+    coords = resolve_location(ngo.location)
+    if coords is None:
+        ngo.latitude = ngo.longitude = ngo.geo_cell = None
+        return False
+
+    ngo.latitude, ngo.longitude = coords
+    ngo.geo_cell = grid_cell(*coords)
+    return True
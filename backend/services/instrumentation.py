@@ -0,0 +1,34 @@
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request SQL statement counter. Every statement executed while handling a request
+# bumps g.query_count; with QUERY_COUNT_HEADER on, responses report it as X-Query-Count
+# so tests and load tests can assert on the number of round trips.
+#
+# What /search/ costs (tests/test_search_queries.py): a keyword search is one statement, a
+# search the keyword matches nothing in is two (keyword pass, then the fuzzy pass), and a
+# repeated search none. On top of that, once per process: the full-text availability probe
+# and the trigram index build (first fuzzy search; later rebuilds run as background tasks);
+# once per directory version: the directory-wide facet GROUP BY; and, for searches filtered
+# by category or location or with more than SEARCH_MAX_RESULTS matches, one keyword facet
+# GROUP BY per keyword.
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def query_count():
+    """Statements executed so far in the current request."""
+    return g.get('query_count', 0) if has_request_context() else 0
+
+
+def init_query_counter(app):
+    @app.after_request
+    def add_query_count_header(response):
+        if app.config.get('QUERY_COUNT_HEADER'):
+            response.headers['X-Query-Count'] = str(query_count())
+        return response
@@ -0,0 +1,235 @@
+import math
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from flask import current_app
+from .cache import PeriodicRebuild
+from sqlalchemy import case, false
+from .signals import ngo_approved, ngo_deactivated, ngo_reactivated
+from ..models.verified_ngos import VerifiedNGO
+from backend import db
+
+# Optional in-process search index for deployments (e.g. Vercel) where database-side
+# full-text search isn't available. Enabled with INMEMORY_SEARCH_ENABLED; built lazily
+# on the first search and kept per app in app.extensions. Admin changes update it at once
+# in the process that made them (signals below); every process also rebuilds it from the
+# database every INMEMORY_SEARCH_REFRESH_SECONDS to pick up changes made in the others.
+
+EXTENSION_KEY = 'ngo_inverted_index'
+
+TOKEN_RE = re.compile(r'\w+')
+
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from in is it of on or that the this to we with our'.split()
+)
+
+# Field boosts are applied as term-frequency multipliers
+FIELD_WEIGHTS = (('name', 3), ('ngo_type', 2), ('mission', 1))
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if t not in STOP_WORDS]
+
+
+class InvertedIndex:
+    """
+    Compact BM25 inverted index.
+
+    Terms are interned to integer ids; each term's postings are two parallel arrays
+    (internal doc numbers, weighted term frequency) kept sorted by doc number, so
+    incremental adds append and removals are a bisect + delete.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._term_ids = {}
+        self._postings = []     # term id -> array('I') of doc numbers
+        self._frequencies = []  # term id -> array('H') of weighted tf
+
+        self._ngo_ids = array('I')      # doc number -> VerifiedNGO.id (0 once removed)
+        self._doc_lengths = array('I')  # doc number -> weighted token count
+        self._doc_terms = []            # doc number -> array('I') of term ids (for removal)
+        self._doc_numbers = {}          # VerifiedNGO.id -> doc number
+
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_numbers)
+
+    def _intern(self, term):
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self._postings)
+            self._term_ids[term] = term_id
+            self._postings.append(array('I'))
+            self._frequencies.append(array('H'))
+        return term_id
+
+    def add(self, ngo_id, name, ngo_type, mission):
+        fields = {'name': name, 'ngo_type': ngo_type, 'mission': mission}
+        counts = {}
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(fields[field]):
+                counts[token] = counts.get(token, 0) + weight
+
+        with self._lock:
+            if ngo_id in self._doc_numbers:
+                self.remove(ngo_id)
+
+            doc = len(self._ngo_ids)
+            self._ngo_ids.append(ngo_id)
+            self._doc_numbers[ngo_id] = doc
+
+            term_ids = array('I')
+            length = 0
+            for token, tf in counts.items():
+                term_id = self._intern(token)
+                self._postings[term_id].append(doc)
+                self._frequencies[term_id].append(min(tf, 0xFFFF))
+                term_ids.append(term_id)
+                length += tf
+
+            self._doc_terms.append(term_ids)
+            self._doc_lengths.append(length)
+            self._total_length += length
+
+    def remove(self, ngo_id):
+        with self._lock:
+            doc = self._doc_numbers.pop(ngo_id, None)
+            if doc is None:
+                return
+
+            for term_id in self._doc_terms[doc]:
+                postings = self._postings[term_id]
+                pos = bisect_left(postings, doc)
+                if pos < len(postings) and postings[pos] == doc:
+                    del postings[pos]
+                    del self._frequencies[term_id][pos]
+
+            self._total_length -= self._doc_lengths[doc]
+            self._doc_lengths[doc] = 0
+            self._doc_terms[doc] = array('I')
+            self._ngo_ids[doc] = 0
+
+    def search(self, text, limit=100):
+        """
+        Returns (ids, matched): up to ``limit`` NGO ids matching every query term, best BM25
+        score first, and how many NGOs matched in all.
+        """
+        terms = list(dict.fromkeys(tokenize(text)))
+        if not terms:
+            return [], 0
+
+        with self._lock:
+            doc_count = len(self._doc_numbers)
+            if not doc_count:
+                return [], 0
+
+            term_ids = [self._term_ids.get(term) for term in terms]
+            if any(t is None or not self._postings[t] for t in term_ids):
+                return [], 0
+
+            avg_length = self._total_length / doc_count
+            # Rarest term first so the candidate set starts small
+            term_ids.sort(key=lambda t: len(self._postings[t]))
+
+            scores = None
+            for term_id in term_ids:
+                postings = self._postings[term_id]
+                frequencies = self._frequencies[term_id]
+                df = len(postings)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+                term_scores = {}
+                for doc, tf in zip(postings, frequencies):
+                    if scores is not None and doc not in scores:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc] / avg_length)
+                    term_scores[doc] = idf * tf * (self.k1 + 1) / (tf + norm)
+
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {doc: scores[doc] + s for doc, s in term_scores.items()}
+
+                if not scores:
+                    return [], 0
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [self._ngo_ids[doc] for doc, _ in best], len(scores)
+
+    @classmethod
+    def from_database(cls):
+        index = cls()
+        rows = db.session.query(
+            VerifiedNGO.id, VerifiedNGO.name, VerifiedNGO.ngo_type, VerifiedNGO.mission
+        ).filter(VerifiedNGO.is_active.is_(True)).execution_options(yield_per=2000)
+
+        for ngo_id, name, ngo_type, mission in rows:
+            index.add(ngo_id, name, ngo_type, mission)
+        return index
+
+
+_build_lock = threading.Lock()
+
+
+def _holder(app):
+    holder = app.extensions.get(EXTENSION_KEY)
+    if holder is None:
+        with _build_lock:
+            holder = app.extensions.get(EXTENSION_KEY)
+            if holder is None:
+                holder = PeriodicRebuild(InvertedIndex.from_database,
+                                         ttl=app.config.get('INMEMORY_SEARCH_REFRESH_SECONDS', 60))
+                app.extensions[EXTENSION_KEY] = holder
+                app.logger.info(f"Built in-memory search index with {len(holder.value)} NGOs")
+    return holder
+
+
+def get_inverted_index(app=None):
+    """Returns the app's index, building it from the database on first use."""
+    return _holder(app or current_app._get_current_object()).get()
+
+
+def apply_inmemory_search(query, term):
+    """
+    Like fulltext.apply_keyword_search, but ranked by the in-process BM25 index, and returns
+    (query, rank, capped): the index hands at most INMEMORY_SEARCH_LIMIT of its best matches
+    to SQL, and ``capped`` says it had more, so counts over the query are lower bounds.
+    Returns None if the index can't be used so the caller falls back to SQL.
+    """
+    try:
+        index = get_inverted_index()
+    except Exception as e:
+        current_app.logger.error(f"In-memory search index unavailable, falling back to SQL: {e}")
+        return None
+
+    ngo_ids, matched = index.search(term, limit=current_app.config.get('INMEMORY_SEARCH_LIMIT', 200))
+    if not ngo_ids:
+        return query.filter(false()), None, False
+
+    rank = case({ngo_id: position for position, ngo_id in enumerate(ngo_ids)}, value=VerifiedNGO.id)
+    return query.filter(VerifiedNGO.id.in_(ngo_ids)), rank.asc(), matched > len(ngo_ids)
+
+
+# Incremental maintenance: only touch an index that has already been built
+@ngo_approved.connect
+@ngo_reactivated.connect
+def _index_ngo(sender, ngo, **kwargs):
+    holder = sender.extensions.get(EXTENSION_KEY)
+    if holder is not None:
+        ngo_id, name, ngo_type, mission = ngo.id, ngo.name, ngo.ngo_type, ngo.mission
+        holder.apply(lambda index: index.add(ngo_id, name, ngo_type, mission))
+
+
+@ngo_deactivated.connect
+def _unindex_ngo(sender, ngo, **kwargs):
+    holder = sender.extensions.get(EXTENSION_KEY)
+    if holder is not None:
+        ngo_id = ngo.id
+        holder.apply(lambda index: index.remove(ngo_id))
@@ -0,0 +1,99 @@
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import tuple_
+from .cache import TTLCache
+from .signals import ngo_approved, ngo_deactivated, ngo_reactivated, donation_credited, donation_totals_folded
+from ..models.verified_ngos import VerifiedNGO
+from backend import db
+
+# Plain tuples (not ORM instances) are cached so entries are safe to share across requests.
+LeaderboardEntry = namedtuple('LeaderboardEntry', 'id name ngo_type mission total_donations_cents')
+
+LeaderboardPage = namedtuple('LeaderboardPage', 'entries next_cursor')
+
+leaderboard_cache = TTLCache(maxsize=256, ttl=60)
+
+
+def encode_cursor(entry):
+    return f"{entry.total_donations_cents}:{entry.id}"
+
+
+def decode_cursor(raw):
+    """Returns (total_donations_cents, id) from an 'after' query arg, or None if missing/malformed."""
+    if not raw:
+        return None
+    try:
+        total, ngo_id = raw.rsplit(':', 1)
+        return int(total), int(ngo_id)
+    except ValueError:
+        return None
+
+
+def _load_page(cursor, per_page):
+    query = db.session.query(
+        VerifiedNGO.id,
+        VerifiedNGO.name,
+        VerifiedNGO.ngo_type,
+        VerifiedNGO.mission,
+        VerifiedNGO.total_donations_cents
+    ).filter(VerifiedNGO.is_active.is_(True))
+
+    if cursor:
+        last_total, last_id = cursor
+        # Row-value comparison so the database can seek straight into the index
+        query = query.filter(tuple_(VerifiedNGO.total_donations_cents, VerifiedNGO.id) < tuple_(last_total, last_id))
+
+    # Fetch one extra row to know whether a next page exists without a COUNT(*)
+    rows = query.order_by(
+        VerifiedNGO.total_donations_cents.desc(),
+        VerifiedNGO.id.desc()
+    ).limit(per_page + 1).all()
+
+    entries = [LeaderboardEntry(*row) for row in rows[:per_page]]
+    next_cursor = encode_cursor(entries[-1]) if len(rows) > per_page else None
+    return LeaderboardPage(entries, next_cursor)
+
+
+def get_leaderboard_page(cursor=None, per_page=None):
+    per_page = per_page or current_app.config.get('LEADERBOARD_PAGE_SIZE', 24)
+    ttl = current_app.config.get('LEADERBOARD_CACHE_TTL', 60)
+
+    return leaderboard_cache.get_or_set(
+        (cursor, per_page),
+        lambda: _load_page(cursor, per_page),
+        ttl=ttl
+    )
+
+
+def _page_covers(key, page, low, high):
+    """
+    True if the cached page ``key`` -> ``page`` spans any ranking position between ``low`` and
+    ``high`` ((total_donations_cents, id) keys). A page holds the entries below its cursor
+    down to its last entry, or down to the bottom when it is the last page.
+    """
+    cursor, _ = key
+    if cursor is not None and low >= cursor:
+        return False
+    if page.next_cursor is not None:
+        last = page.entries[-1]
+        if high < (last.total_donations_cents, last.id):
+            return False
+    return True
+
+
+@ngo_approved.connect
+@ngo_deactivated.connect
+@ngo_reactivated.connect
+@donation_totals_folded.connect
+def _invalidate_leaderboard(sender, **kwargs):
+    leaderboard_cache.clear()
+
+
+@donation_credited.connect
+def _invalidate_credited(sender, ngo_id, cents=0, total_cents=None, **kwargs):
+    # A credit moves one NGO up from (total - cents) to total: only the pages spanning that
+    # stretch of the ranking change. Credits to counter shards don't move it until the fold.
+    if total_cents is None:
+        return
+    low, high = (total_cents - cents, ngo_id), (total_cents, ngo_id)
+    leaderboard_cache.delete_where(lambda key, page: _page_covers(key, page, low, high))
@@ -0,0 +1,61 @@
+from collections import namedtuple
+from flask import current_app, g, has_app_context
+from .cache import TTLCache
+from .signals import ngo_approved, ngo_deactivated, ngo_reactivated
+from ..models.verified_ngos import VerifiedNGO
+from backend import db
+
+# Read-through cache for the NGO fields the donation path needs, by id. Two tiers:
+#   * per request (flask.g): the donate/finalize/success steps of one request share one lookup
+#   * per process (TTLCache): short TTL, cleared for an NGO when admins change it (signals below)
+# Totals are deliberately left out: they change on every donation (services/donation_totals.py).
+# Other worker processes only see an admin change once their entry expires.
+NGOInfo = namedtuple('NGOInfo', 'id name ngo_type mission is_active counter_shards')
+
+ngo_cache = TTLCache(maxsize=2048, ttl=30)
+
+
+def _load(ngo_id):
+    row = db.session.query(
+        VerifiedNGO.id,
+        VerifiedNGO.name,
+        VerifiedNGO.ngo_type,
+        VerifiedNGO.mission,
+        VerifiedNGO.is_active,
+        VerifiedNGO.counter_shards
+    ).filter(VerifiedNGO.id == ngo_id).first()
+    return NGOInfo(*row) if row else None
+
+
+def get_ngo_info(ngo_id):
+    """Cached NGOInfo for a verified NGO, or None if there is none with that id."""
+    if ngo_id is None:
+        return None
+
+    per_request = g.setdefault('ngo_info', {}) if has_app_context() else {}
+    if ngo_id in per_request:
+        return per_request[ngo_id]
+
+    info = ngo_cache.get(ngo_id)
+    if info is None:
+        info = _load(ngo_id)
+        # Misses aren't cached: an NGO approved a moment ago must be found straight away
+        if info is not None:
+            ngo_cache.set(ngo_id, info, ttl=current_app.config.get('NGO_CACHE_TTL', 30))
+
+    per_request[ngo_id] = info
+    return info
+
+
+def invalidate_ngo(ngo_id):
+    ngo_cache.delete(ngo_id)
+    if has_app_context():
+        g.get('ngo_info', {}).pop(ngo_id, None)
+
+
+@ngo_approved.connect
+@ngo_deactivated.connect
+@ngo_reactivated.connect
+def _invalidate_changed_ngo(sender, ngo=None, **kwargs):
+    if ngo is not None:
+        invalidate_ngo(ngo.id)
@@ -0,0 +1,206 @@
+import os
+import random
+import socket
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import bindparam, delete, func, or_, select, update
+from .email import render_email, MailQueue, is_permanent
+from ..models.email_outbox import EmailOutbox
+from backend import db
+
+# Durable email: queue_email renders the message into an email_outbox row in the caller's
+# transaction, so the email exists if and only if the change it reports was committed, and
+# the request returns without touching SMTP. `flask email drain` delivers the rows:
+#   1. claim a batch of due rows by leasing them to this drain (short transaction)
+#   2. send them through a MailQueue (services/email.py): a bounded queue drained by one
+#      thread per long-lived SMTP connection; claiming waits while the queue is full
+#   3. mark them sent, or schedule a retry with exponential backoff, in one transaction
+#
+# Claiming works like the recurring-donation scheduler (services/recurring.py): several
+# drains can run at once, and rows leased by a drain that died are picked up again once
+# the lease expires. Delivery is at-least-once: a drain killed between sending and
+# committing resends that batch.
+
+
+def queue_email(to, subject, template, **kwargs):
+    """Renders email/<template>.txt/.html into the outbox inside the caller's transaction (no commit)."""
+    msg = render_email(to, subject, template, **kwargs)
+    db.session.add(EmailOutbox(
+        recipient=to,
+        sender=msg.sender,
+        subject=subject,
+        body_text=msg.body,
+        body_html=msg.html,
+    ))
+
+
+def retry_delay(attempts, base, cap):
+    """Seconds before retry number ``attempts``: doubling from ``base`` up to ``cap``, jittered down by up to half."""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return random.uniform(delay / 2, delay)
+
+
+def claim_batch(lease_owner, batch_size, lease_seconds):
+    """Leases up to ``batch_size`` due outbox rows to ``lease_owner`` and commits. Returns their rows."""
+    table = EmailOutbox.__table__
+    now = datetime.utcnow()
+    due = select(table.c.id).where(
+        table.c.status == 'pending',
+        table.c.next_attempt_at <= now,
+        or_(table.c.lease_expires_at.is_(None), table.c.lease_expires_at < now)
+    ).order_by(table.c.next_attempt_at).limit(batch_size)
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Rows another drain is claiming right now are skipped, not waited for
+        ids = db.session.execute(due.with_for_update(skip_locked=True)).scalars().all()
+        if not ids:
+            db.session.commit()
+            return []
+        target = table.c.id.in_(ids)
+    else:
+        target = table.c.id.in_(due.scalar_subquery())
+
+    rows = db.session.execute(
+        update(table).where(target)
+        .values(lease_owner=lease_owner, lease_expires_at=now + timedelta(seconds=lease_seconds))
+        .returning(table.c.id, table.c.recipient, table.c.sender, table.c.subject, table.c.body_text,
+                   table.c.body_html, table.c.attempts)
+    ).all()
+    db.session.commit()
+    return rows
+
+
+def _message(row):
+    return Message(row.subject, sender=row.sender, recipients=[row.recipient], body=row.body_text, html=row.body_html)
+
+
+def _record(lease_owner, results, report):
+    """Marks each row sent, retried later or dead, in one statement; the caller commits."""
+    config = current_app.config
+    base = config.get('EMAIL_OUTBOX_RETRY_BASE_SECONDS', 60)
+    cap = config.get('EMAIL_OUTBOX_RETRY_MAX_SECONDS', 6 * 3600)
+    max_attempts = config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 10)
+    now = datetime.utcnow()
+
+    updates = []
+    for row, error in results:
+        attempts = row.attempts + 1
+        values = {'id': row.id, 'attempts': attempts, 'status': 'sent', 'sent_at': now,
+                  'next_attempt_at': now, 'last_error': None}
+        if error is None:
+            report['sent'] += 1
+        else:
+            values.update(sent_at=None, last_error=str(error)[:255])
+            # A 4xx refusal (mailbox full or busy, greylisting) is retried like a dropped connection
+            if is_permanent(error) or attempts >= max_attempts:
+                values['status'] = 'dead'
+                report['dead'] += 1
+                current_app.logger.error(f"Email {row.id} to {row.recipient} dropped after {attempts} attempts: {error}")
+            else:
+                values.update(status='pending', next_attempt_at=now + timedelta(seconds=retry_delay(attempts, base, cap)))
+                report['retry_later'] += 1
+        updates.append(values)
+
+    table = EmailOutbox.__table__
+    # Only rows still leased to this drain: if the lease expired, another drain owns them now
+    db.session.execute(
+        update(table)
+        .where(table.c.id == bindparam('b_id'), table.c.lease_owner == lease_owner)
+        .values(status=bindparam('b_status'), attempts=bindparam('b_attempts'), sent_at=bindparam('b_sent_at'),
+                next_attempt_at=bindparam('b_next_attempt_at'), last_error=bindparam('b_last_error'),
+                lease_owner=None, lease_expires_at=None),
+        [{f'b_{name}': value for name, value in values.items()} for values in updates]
+    )
+
+
+def drain_outbox(batch_size=None, connections=None, limit=None, follow=False, stop=None, progress=None):
+    """
+    Sends due outbox emails until none are left (or, with ``follow``, until ``stop`` is set,
+    polling every EMAIL_OUTBOX_POLL_SECONDS).
+
+    Returns a Counter report (claimed, sent, retry_later, dead, batches) plus 'elapsed_ms' and
+    'mail' (the mail queue's metrics). ``progress`` is called with the report after each batch.
+    """
+    app = current_app._get_current_object()
+    config = app.config
+    batch_size = batch_size or config.get('EMAIL_OUTBOX_BATCH_SIZE', 100)
+    connections = connections or config.get('EMAIL_OUTBOX_CONNECTIONS', 4)
+    lease_seconds = config.get('EMAIL_OUTBOX_LEASE_SECONDS', 300)
+    poll_seconds = config.get('EMAIL_OUTBOX_POLL_SECONDS', 5)
+    lease_owner = f'{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    mail_queue = MailQueue(
+        app,
+        workers=connections,
+        maxsize=config.get('MAIL_QUEUE_SIZE', 1000),
+        batch_size=config.get('MAIL_BATCH_SIZE', 50),
+        idle_timeout=config.get('MAIL_IDLE_SECONDS', 30.0),
+    )
+    report = Counter()
+    started = time.perf_counter()
+
+    try:
+        while (limit is None or report['claimed'] < limit) and not (stop and stop.is_set()):
+            size = batch_size if limit is None else min(batch_size, limit - report['claimed'])
+            rows = claim_batch(lease_owner, size, lease_seconds)
+            if not rows:
+                if not follow:
+                    break
+                # Nothing due (idle workers close their SMTP connections after MAIL_IDLE_SECONDS)
+                if stop:
+                    stop.wait(poll_seconds)
+                else:
+                    time.sleep(poll_seconds)
+                continue
+
+            # Blocks while the queue is full; the batch is recorded once every message is done
+            futures = [(row, mail_queue.submit(_message(row))) for row in rows]
+            results = [(row, future.exception()) for row, future in futures]
+
+            _record(lease_owner, results, report)
+            db.session.commit()
+
+            report['claimed'] += len(rows)
+            report['batches'] += 1
+            report['mail'] = mail_queue.metrics()
+            if progress:
+                progress(report)
+    finally:
+        mail_queue.shutdown(config.get('MAIL_SHUTDOWN_TIMEOUT', 30.0))
+
+    report['elapsed_ms'] = int((time.perf_counter() - started) * 1000)
+    report['mail'] = mail_queue.metrics()
+    return report
+
+
+def outbox_metrics():
+    """Outbox depth (rows per status), how many pending rows are due now and how late the oldest one is."""
+    table = EmailOutbox.__table__
+    now = datetime.utcnow()
+    counts = dict(db.session.execute(select(table.c.status, func.count()).group_by(table.c.status)).all())
+    due, oldest = db.session.execute(
+        select(func.count(), func.min(table.c.next_attempt_at))
+        .where(table.c.status == 'pending', table.c.next_attempt_at <= now)
+    ).one()
+    return {
+        'pending': counts.get('pending', 0),
+        'sent': counts.get('sent', 0),
+        'dead': counts.get('dead', 0),
+        'due': due,
+        'oldest_due_seconds': round((now - oldest).total_seconds()) if oldest else None,
+    }
+
+
+def purge_sent(older_than_days=None):
+    """Deletes outbox rows sent more than ``older_than_days`` (EMAIL_OUTBOX_KEEP_DAYS) ago; returns the count."""
+    days = older_than_days if older_than_days is not None else current_app.config.get('EMAIL_OUTBOX_KEEP_DAYS', 30)
+    table = EmailOutbox.__table__
+    result = db.session.execute(
+        delete(table).where(table.c.status == 'sent', table.c.sent_at < datetime.utcnow() - timedelta(days=days))
+    )
+    db.session.commit()
+    return result.rowcount
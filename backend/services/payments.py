@@ -0,0 +1,195 @@
+import hashlib
+import json
+import stripe
+from flask import current_app
+from sqlalchemy import insert, update
+from ..models.payments import Payment
+from ..models.successful_payments import SuccessfulPayment
+from ..models.failed_payments import FailedPayment
+from .outbox import queue_email
+from .ngo_cache import get_ngo_info
+from .donation_totals import credit_donation, to_cents
+from .rollups import record_donation, accumulate
+from .signals import donation_credited
+from .stripe_gateway import get_stripe
+from backend import db
+
+PENDING_STATUSES = ('PENDING_INITIATION', 'PENDING')
+
+# Checkout Session payment_status values that mean the donation went through
+PAID_STATUSES = ('paid', 'no_payment_required')
+
+
+def donation_idempotency_key(donation_data):
+    """Stable key for one donation intent (the session's donation_data, including its intent_id)."""
+    canonical = json.dumps(donation_data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _claim(payment, status, payment_type, **values):
+    """
+    Atomically moves a payment out of PENDING. Returns False if another worker (webhook,
+    redirect, retry) already finalized it, so each payment is credited exactly once.
+    """
+    payments = Payment.__table__
+    result = db.session.execute(
+        update(payments)
+        .where(payments.c.id == payment.id, payments.c.transaction_status.in_(PENDING_STATUSES))
+        .values(transaction_status=status, type=payment_type, **values)
+    )
+    return result.rowcount == 1
+
+
+def _nothing_to_notify():
+    pass
+
+
+def is_paid(checkout_session):
+    return checkout_session.payment_status in PAID_STATUSES
+
+
+def checkout_outcome(checkout_session):
+    """True if the session was paid, False if it expired unpaid, None while it is still open."""
+    if checkout_session.status == 'complete' and is_paid(checkout_session):
+        return True
+    if checkout_session.status == 'expired':
+        return False
+    return None
+
+
+def record_payment_success(payment, charge_id, receipt_url=None, rollup_batch=None):
+    """
+    Marks a pending payment SUCCESS, credits its NGO and queues the donor's receipt, inside
+    the caller's transaction. Returns the post-commit notify callable, or None if another
+    worker got there first.
+
+    Batch callers pass ``rollup_batch`` (a dict) and write it with rollups.apply_aggregates
+    once for the whole batch, instead of one rollup write per payment.
+    """
+    # rolled_up: this transaction adds the payment to the donation rollups (below)
+    if not _claim(payment, 'SUCCESS', 'success', rolled_up=True):
+        return None
+
+    # Joined-table inheritance: the payment becomes a SuccessfulPayment by adding its subtable row
+    db.session.execute(insert(SuccessfulPayment.__table__).values(
+        id=payment.id,
+        stripe_charge_id=charge_id,
+        receipt_url=receipt_url
+    ))
+
+    cents = to_cents(payment.amount)
+    total_cents = None
+    ngo = get_ngo_info(payment.ngo_id)
+    if ngo:
+        # Atomic `total = total + :cents` in SQL; concurrent donations can't lose updates
+        total_cents = credit_donation(ngo.id, cents, ngo.counter_shards)
+    if rollup_batch is None:
+        record_donation(payment, ngo, cents)
+    else:
+        accumulate(rollup_batch, payment.created_at.date(), ngo.id if ngo else None, ngo.ngo_type if ngo else None,
+                   payment.donor_email, cents)
+    ngo_id, ngo_name = (ngo.id, ngo.name) if ngo else (None, 'NGO Platform')
+    queue_email(payment.donor_email, 'Your Donation Receipt', 'donation_success', payment=payment, ngo_name=ngo_name)
+
+    def notify():
+        if ngo_id:
+            donation_credited.send(current_app._get_current_object(), ngo_id=ngo_id, amount=payment.amount,
+                                   cents=cents, total_cents=total_cents)
+    return notify
+
+
+def record_payment_failure(payment, error_message, error_code=None, reason='Payment was cancelled or declined.'):
+    """
+    Marks a pending payment FAILED and queues the donor's email inside the caller's
+    transaction. Returns the (no-op) notify callable, or None if another worker got there first.
+    """
+    if not _claim(payment, 'FAILED', 'failure'):
+        return None
+
+    db.session.execute(insert(FailedPayment.__table__).values(
+        id=payment.id,
+        error_message=error_message,
+        stripe_error_code=(error_code or '')[:100]
+    ))
+
+    ngo = get_ngo_info(payment.ngo_id)
+    queue_email(payment.donor_email, 'Your Donation Failed', 'donation_failure', payment=payment,
+                ngo_name=ngo.name if ngo else 'NGO Platform', reason=reason)
+    return _nothing_to_notify
+
+
+def apply_payment_outcome(payment, is_success, checkout_session):
+    """
+    Finalizes one pending payment from its Checkout Session inside the caller's transaction
+    (no commit).
+
+    Returns a callable that sends the donation signal once the caller has committed (the
+    donor's email is queued in the outbox with the payment), or None if there was nothing
+    to do: already final elsewhere, or not paid yet.
+    """
+    if is_success:
+        # Don't trust the redirect alone: only a paid session counts
+        if not is_paid(checkout_session):
+            current_app.logger.info(f"Session {checkout_session.id} not paid yet ({checkout_session.payment_status})")
+            return None
+        return record_payment_success(payment, checkout_session.payment_intent or checkout_session.id,
+                                      checkout_session.url)
+
+    return record_payment_failure(payment, "Payment canceled or rejected by gateway.",
+                                  checkout_session.payment_intent or checkout_session.status)
+
+
+def finalize_payment(session_id, is_success, checkout_session=None, raise_errors=False):
+    """
+    Records the outcome of a Stripe Checkout Session on its Payment and emails the donor.
+
+    ``checkout_session`` is the session object when the caller already has it (webhook
+    payloads carry it); otherwise it is retrieved from Stripe. Safe to call repeatedly.
+
+    Errors are logged and give None, leaving the payment pending for the next webhook
+    delivery or `flask payments reconcile`; ``raise_errors`` re-raises them instead (the
+    webhook does, so Stripe redelivers the event).
+    """
+    payment = None
+
+    try:
+        if checkout_session is None:
+            checkout_session = get_stripe().retrieve_checkout_session(session_id)
+
+        payment = Payment.query.filter_by(stripe_session_id=session_id).first()
+
+        if not payment:
+            current_app.logger.warning(f"Payment record not found for session: {session_id}")
+            return None
+
+        if payment.transaction_status in ('SUCCESS', 'FAILED'):
+            return payment
+
+        notify = apply_payment_outcome(payment, is_success, checkout_session)
+        if notify is None:
+            # Not paid yet, or another worker finalized it first: report what is stored now
+            db.session.rollback()
+            return Payment.query.filter_by(stripe_session_id=session_id).first()
+
+        db.session.commit()
+        notify()
+
+    # 🔑 FIX 1: Corrected Stripe exception path 🔑
+    except stripe.StripeError as e:
+        current_app.logger.error(f"Stripe retrieval failed for session {session_id}: {e}")
+        # Note: Added a check for AuthenticationError which causes the second exception in the trace
+        if isinstance(e, stripe.AuthenticationError):
+            current_app.logger.error("CRITICAL: Invalid Stripe API Key. Check configuration.")
+
+        db.session.rollback()
+        if raise_errors:
+            raise
+        return None
+    except Exception as e:
+        current_app.logger.error(f"Internal error during payment finalization for session {session_id}: {e}")
+        db.session.rollback()
+        if raise_errors:
+            raise
+        return None
+
+    return payment
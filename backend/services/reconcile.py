@@ -0,0 +1,143 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import stripe
+from flask import current_app
+from .checkpoints import load_checkpoint, save_checkpoint, clear_checkpoint
+from .payments import PENDING_STATUSES, apply_payment_outcome, checkout_outcome
+from .ratelimit import RateLimiter
+from .stripe_gateway import get_stripe
+from ..models.payments import Payment
+from backend import db
+
+# Finalizes payments whose donor never came back from Stripe Checkout (closed tab, lost
+# webhook). Pending rows are walked in id order, one chunk at a time:
+#   1. read a chunk of stale ids (short read, no transaction held while talking to Stripe)
+#   2. retrieve their sessions on a bounded thread pool, throttled by a shared rate limiter
+#   3. apply every outcome in one transaction, together with the checkpoint
+# An interrupted run resumes after the last committed chunk. Stale payments that never got a
+# Checkout Session (the process died before Stripe answered) are deleted first.
+
+CHECKPOINT_NAME = 'payments.reconcile'
+
+
+def _stale_chunk(after_id, cutoff, chunk_size):
+    return db.session.query(Payment.id, Payment.stripe_session_id).filter(
+        Payment.transaction_status.in_(PENDING_STATUSES),
+        Payment.stripe_session_id.isnot(None),
+        Payment.created_at < cutoff,
+        Payment.id > after_id
+    ).order_by(Payment.id).limit(chunk_size).all()
+
+
+def _discard_abandoned(cutoff):
+    return Payment.query.filter(
+        Payment.transaction_status == 'PENDING_INITIATION',
+        Payment.stripe_session_id.is_(None),
+        Payment.created_at < cutoff
+    ).delete(synchronize_session=False)
+
+
+def _retrieve(gateway, session_id, limiter):
+    limiter.acquire()
+    try:
+        return session_id, gateway.retrieve_checkout_session(session_id), None
+    except stripe.StripeError as e:
+        return session_id, None, e
+
+
+def _apply_chunk(rows, sessions, report):
+    """Applies outcomes for one chunk; returns the notify callbacks to run after commit."""
+    notifications = []
+    payments = {p.id: p for p in Payment.query.filter(Payment.id.in_([row.id for row in rows]))}
+
+    for row in rows:
+        checkout_session, error = sessions[row.stripe_session_id]
+        if error is not None:
+            current_app.logger.warning(f"Reconcile: could not retrieve session {row.stripe_session_id}: {error}")
+            report['errors'] += 1
+            continue
+
+        outcome = checkout_outcome(checkout_session)
+        payment = payments.get(row.id)
+        if outcome is None or payment is None or payment.transaction_status not in PENDING_STATUSES:
+            report['still_open' if outcome is None else 'skipped'] += 1
+            continue
+
+        try:
+            # Savepoint per payment: one bad row doesn't roll back the rest of the batch
+            with db.session.begin_nested():
+                notify = apply_payment_outcome(payment, outcome, checkout_session)
+        except Exception as e:
+            current_app.logger.error(f"Reconcile: finalizing payment {row.id} failed: {e}")
+            report['errors'] += 1
+            continue
+
+        if notify is None:
+            report['skipped'] += 1
+        else:
+            report['succeeded' if outcome else 'failed'] += 1
+            notifications.append(notify)
+
+    return notifications
+
+
+def reconcile_pending_payments(older_than_minutes=None, chunk_size=None, workers=None, rate_limit=None,
+                               limit=None, restart=False, progress=None):
+    """
+    Finalizes stale PENDING payments from their Stripe Checkout Sessions.
+
+    Returns a Counter report (scanned, succeeded, failed, still_open, skipped, errors, chunks,
+    abandoned) plus 'elapsed_ms' (wall time in milliseconds). ``progress`` is called with the
+    report after each chunk.
+    """
+    config = current_app.config
+    older_than_minutes = older_than_minutes or config.get('RECONCILE_STALE_MINUTES', 60)
+    chunk_size = chunk_size or config.get('RECONCILE_CHUNK_SIZE', 200)
+    # More threads than the Stripe bulkhead admits would only be rejected
+    workers = min(workers or config.get('RECONCILE_WORKERS', 8), config.get('STRIPE_MAX_CONCURRENCY', 8))
+    limiter = RateLimiter(rate_limit or config.get('RECONCILE_RATE_LIMIT', 20))
+
+    gateway = get_stripe()
+
+    if restart:
+        clear_checkpoint(CHECKPOINT_NAME)
+        db.session.commit()
+
+    after_id = int(load_checkpoint(CHECKPOINT_NAME, 0))
+    cutoff = datetime.utcnow() - timedelta(minutes=older_than_minutes)
+    report = Counter()
+    started = time.perf_counter()
+
+    report['abandoned'] = _discard_abandoned(cutoff)
+    db.session.commit()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reconcile') as pool:
+        while limit is None or report['scanned'] < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - report['scanned'])
+            rows = _stale_chunk(after_id, cutoff, size)
+            db.session.rollback()  # don't hold the read transaction open while Stripe is called
+            if not rows:
+                clear_checkpoint(CHECKPOINT_NAME)
+                db.session.commit()
+                break
+
+            fetched = pool.map(lambda row: _retrieve(gateway, row.stripe_session_id, limiter), rows)
+            sessions = {session_id: (checkout_session, error) for session_id, checkout_session, error in fetched}
+
+            notifications = _apply_chunk(rows, sessions, report)
+            after_id = rows[-1].id
+            save_checkpoint(CHECKPOINT_NAME, after_id)
+            db.session.commit()
+
+            for notify in notifications:
+                notify()
+
+            report['scanned'] += len(rows)
+            report['chunks'] += 1
+            if progress:
+                progress(report)
+
+    report['elapsed_ms'] = int((time.perf_counter() - started) * 1000)
+    return report
@@ -0,0 +1,259 @@
+import calendar
+import hashlib
+import os
+import socket
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import stripe
+from flask import current_app
+from sqlalchemy import bindparam, insert, or_, select, update
+from .payments import PENDING_STATUSES, record_payment_success, record_payment_failure
+from .rollups import apply_aggregates
+from .stripe_gateway import get_stripe
+from ..models.payments import Payment
+from ..models.recurring_donations import RecurringDonation
+from backend import db
+
+# Charges due recurring donations in batches:
+#   1. claim a batch of due subscriptions by leasing them to this run (short transaction)
+#   2. insert one Payment per subscription in bulk and commit, before any money moves
+#   3. create off-session PaymentIntents on a bounded thread pool
+#   4. record every outcome and advance every schedule in one transaction
+#
+# Claiming is safe with several scheduler nodes: PostgreSQL picks rows with
+# FOR UPDATE SKIP LOCKED, SQLite (one writer at a time) claims with a single UPDATE.
+# The lease (lease_owner/lease_expires_at) keeps the rows out of other nodes' claims while
+# Stripe is called, and a node that dies mid-batch just lets it expire. Each charge attempt
+# has a deterministic idempotency key, so a retried batch finds the Payment it already
+# inserted and Stripe replays the charge it already made instead of charging again.
+
+
+def add_months(moment, months):
+    """Same day ``months`` later, clamped to the end of shorter months (Jan 31 + 1 → Feb 28)."""
+    month = moment.month - 1 + months
+    year = moment.year + month // 12
+    month = month % 12 + 1
+    return moment.replace(year=year, month=month, day=min(moment.day, calendar.monthrange(year, month)[1]))
+
+
+def _attempt_key(row):
+    """One key per subscription, cycle and attempt: a retry after a decline is a new charge."""
+    raw = f'recurring:{row.id}:{row.next_run_at.isoformat()}:{row.failure_count}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def claim_due(lease_owner, batch_size, due_by, lease_seconds):
+    """Leases up to ``batch_size`` subscriptions due by ``due_by`` to ``lease_owner`` and commits. Returns their rows."""
+    table = RecurringDonation.__table__
+    now = datetime.utcnow()
+    due = select(table.c.id).where(
+        table.c.status == 'active',
+        table.c.next_run_at <= due_by,
+        or_(table.c.lease_expires_at.is_(None), table.c.lease_expires_at < now)
+    ).order_by(table.c.next_run_at).limit(batch_size)
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Rows another node is claiming right now are skipped, not waited for
+        ids = db.session.execute(due.with_for_update(skip_locked=True)).scalars().all()
+        if not ids:
+            db.session.commit()
+            return []
+        target = table.c.id.in_(ids)
+    else:
+        target = table.c.id.in_(due.scalar_subquery())
+
+    rows = db.session.execute(
+        update(table).where(target)
+        .values(lease_owner=lease_owner, lease_expires_at=now + timedelta(seconds=lease_seconds))
+        .returning(table.c.id, table.c.ngo_id, table.c.donor_id, table.c.donor_name, table.c.donor_email,
+                   table.c.amount_cents, table.c.currency, table.c.interval_months, table.c.stripe_customer_id,
+                   table.c.stripe_payment_method_id, table.c.next_run_at, table.c.last_run_at,
+                   table.c.failure_count)
+    ).all()
+    db.session.commit()
+    return sorted(rows, key=lambda row: row.next_run_at)
+
+
+def _ensure_payments(rows):
+    """
+    Bulk-inserts the Payment for each claimed attempt that doesn't have one yet and commits.
+    Returns {attempt key: (payment id, status)}.
+    """
+    keys = {_attempt_key(row): row for row in rows}
+
+    def existing():
+        return {key: (payment_id, status) for key, payment_id, status in db.session.query(
+            Payment.idempotency_key, Payment.id, Payment.transaction_status
+        ).filter(Payment.idempotency_key.in_(list(keys)))}
+
+    have = existing()
+    missing = [{
+        'ngo_id': row.ngo_id, 'donor_id': row.donor_id, 'donor_name': row.donor_name,
+        'donor_email': row.donor_email, 'amount': row.amount_cents / 100, 'currency': row.currency,
+        'idempotency_key': key, 'recurring_donation_id': row.id, 'transaction_status': 'PENDING',
+        'type': 'payment',
+    } for key, row in keys.items() if key not in have]
+
+    if missing:
+        db.session.execute(insert(Payment), missing)
+        db.session.commit()
+        have = existing()
+    return have
+
+
+def _charge(gateway, row, payment_id, key):
+    try:
+        intent = gateway.create_payment_intent(dict(
+            amount=row.amount_cents,
+            currency=row.currency.lower(),
+            customer=row.stripe_customer_id,
+            payment_method=row.stripe_payment_method_id,
+            off_session=True,
+            confirm=True,
+            metadata={'payment_id': payment_id, 'recurring_donation_id': row.id, 'ngo_id': row.ngo_id},
+        ), idempotency_key=f'recurring-{key}')
+        return row, intent, None
+    except stripe.StripeError as e:
+        return row, None, e
+
+
+def _apply_batch(lease_owner, charged, payment_ids, report):
+    """Records every charge outcome and advances the schedules in one transaction; returns notify callables."""
+    config = current_app.config
+    max_failures = config.get('RECURRING_MAX_FAILURES', 3)
+    now = datetime.utcnow()
+    retry_at = now + timedelta(hours=config.get('RECURRING_RETRY_HOURS', 24))
+    # Left out of claims for a while (this run included), then retried with the same key
+    backoff_until = now + timedelta(seconds=config.get('RECURRING_RETRY_BACKOFF_SECONDS', 300))
+
+    ids = [payment_id for payment_id, _ in payment_ids.values()]
+    payments = {p.id: p for p in Payment.query.filter(Payment.id.in_(ids))}
+    notifications = []
+    schedules = []
+    rollups = {}
+
+    for row, intent, error in charged:
+        payment = payments[payment_ids[_attempt_key(row)][0]]
+        schedule = {'id': row.id, 'next_run_at': row.next_run_at, 'failure_count': row.failure_count,
+                    'status': 'active', 'last_run_at': now, 'lease_expires_at': None}
+
+        if payment.transaction_status == 'SUCCESS' or (intent is not None and intent.status == 'succeeded'):
+            succeeded = True
+        elif payment.transaction_status == 'FAILED' or isinstance(error, stripe.CardError) or \
+                (intent is not None and intent.status in ('requires_payment_method', 'requires_action')):
+            succeeded = False
+        else:
+            # Stripe unreachable, or the charge is still processing: backed off for a few minutes,
+            # then retried as the same attempt (same key, so Stripe can't charge twice)
+            if error is not None:
+                current_app.logger.warning(f"Recurring donation {row.id}: charge not completed: {error}")
+            report['retry_later'] += 1
+            schedule.update(last_run_at=row.last_run_at, lease_expires_at=backoff_until)
+            schedules.append(schedule)
+            continue
+
+        notify = None
+        try:
+            # Savepoint per subscription: one bad row doesn't roll back the rest of the batch
+            with db.session.begin_nested():
+                if payment.transaction_status not in PENDING_STATUSES:
+                    pass  # recorded by an earlier run that died before advancing the schedule
+                elif succeeded:
+                    notify = record_payment_success(payment, intent.latest_charge or intent.id,
+                                                    rollup_batch=rollups)
+                else:
+                    notify = record_payment_failure(
+                        payment, getattr(error, 'user_message', None) or 'Recurring charge was declined.',
+                        getattr(error, 'code', None) or (intent.status if intent is not None else None),
+                        reason='Your card was declined for your recurring donation.'
+                    )
+        except Exception as e:
+            current_app.logger.error(f"Recurring donation {row.id}: recording the charge failed: {e}")
+            report['errors'] += 1
+            schedule.update(last_run_at=row.last_run_at, lease_expires_at=backoff_until)
+            schedules.append(schedule)
+            continue
+
+        if notify:
+            notifications.append(notify)
+
+        if succeeded:
+            report['succeeded'] += 1
+            schedule.update(next_run_at=add_months(row.next_run_at, row.interval_months), failure_count=0)
+        else:
+            report['failed'] += 1
+            schedule.update(next_run_at=retry_at, failure_count=row.failure_count + 1)
+            if row.failure_count + 1 >= max_failures:
+                schedule['status'] = 'past_due'
+                report['past_due'] += 1
+        schedules.append(schedule)
+
+    apply_aggregates(rollups)
+
+    table = RecurringDonation.__table__
+    # Only rows still leased to this run: if the lease expired and another node took over, it owns them now
+    if schedules:
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam('b_id'), table.c.lease_owner == lease_owner)
+            .values(next_run_at=bindparam('b_next_run_at'), failure_count=bindparam('b_failure_count'),
+                    status=bindparam('b_status'), last_run_at=bindparam('b_last_run_at'), lease_owner=None,
+                    lease_expires_at=bindparam('b_lease_expires_at')),
+            [{f'b_{name}': value for name, value in schedule.items()} for schedule in schedules]
+        )
+    return notifications
+
+
+def run_recurring_donations(batch_size=None, workers=None, limit=None, due_by=None, progress=None):
+    """
+    Charges every active recurring donation whose next_run_at is before ``due_by`` (default: now).
+
+    Returns a Counter report (claimed, succeeded, failed, past_due, retry_later, errors,
+    batches) plus 'elapsed_ms'. ``progress`` is called with the report after each batch.
+    """
+    config = current_app.config
+    batch_size = batch_size or config.get('RECURRING_BATCH_SIZE', 500)
+    workers = min(workers or config.get('RECURRING_WORKERS', 8), config.get('STRIPE_MAX_CONCURRENCY', 8))
+    lease_seconds = config.get('RECURRING_LEASE_SECONDS', 600)
+    due_by = due_by or datetime.utcnow()
+    # Unique per run: two runs on the same host never mistake each other's leases for their own
+    lease_owner = f'{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    gateway = get_stripe()
+    report = Counter()
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='recurring') as pool:
+        while limit is None or report['claimed'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - report['claimed'])
+            rows = claim_due(lease_owner, size, due_by, lease_seconds)
+            if not rows:
+                break
+
+            payment_ids = _ensure_payments(rows)
+            db.session.rollback()  # no transaction held open while Stripe is called
+
+            # An attempt whose payment is already final (a run that died before advancing the
+            # schedule) is only recorded, never charged again
+            pending = [row for row in rows if payment_ids[_attempt_key(row)][1] in PENDING_STATUSES]
+            charged = [(row, None, None) for row in rows if row not in pending]
+            charged += pool.map(
+                lambda row: _charge(gateway, row, payment_ids[_attempt_key(row)][0], _attempt_key(row)), pending
+            )
+
+            notifications = _apply_batch(lease_owner, charged, payment_ids, report)
+            db.session.commit()
+
+            for notify in notifications:
+                notify()
+
+            report['claimed'] += len(rows)
+            report['batches'] += 1
+            if progress:
+                progress(report)
+
+    report['elapsed_ms'] = int((time.perf_counter() - started) * 1000)
+    return report
@@ -0,0 +1,162 @@
+import hashlib
+from collections import Counter
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from .donation_totals import to_cents
+from .checkpoints import load_checkpoint, save_checkpoint, clear_checkpoint
+from ..models.donation_rollups import NGODailyDonations, CategoryDailyDonations, PlatformDailyDonations, \
+    RollupDonor
+from ..models.payments import Payment
+from ..models.verified_ngos import VerifiedNGO
+from backend import db
+
+# Donation rollups per NGO/day, category/day and platform/day: count, cents, unique donors.
+#
+# Successful payments are added in the same transaction that finalizes them, and flagged
+# payments.rolled_up in that same UPDATE, so the backfill (which only takes unflagged
+# SUCCESS rows) can never count a payment twice. Unique donors stay exact and incremental:
+# a donor bumps unique_donors only when their (scope, key, day) row in
+# donation_rollup_donors is new.
+
+CHECKPOINT_NAME = 'donations.rollup_backfill'
+
+# scope -> (rollup model, key column name or None)
+SCOPES = {
+    'ngo': (NGODailyDonations, 'ngo_id'),
+    'category': (CategoryDailyDonations, 'ngo_type'),
+    'platform': (PlatformDailyDonations, None),
+}
+
+
+def _insert(table):
+    dialect = db.session.get_bind().dialect.name
+    return (postgresql if dialect == 'postgresql' else sqlite).insert(table)
+
+
+def donor_hash(email):
+    return hashlib.sha256((email or '').strip().lower().encode()).hexdigest()[:32]
+
+
+def accumulate(aggregates, day, ngo_id, ngo_type, donor_email, cents):
+    """Adds one successful donation to an in-memory {(scope, day, key): [count, cents, donors]} batch."""
+    donor = donor_hash(donor_email)
+    for scope, key in (('ngo', ngo_id), ('category', ngo_type), ('platform', None)):
+        if scope != 'platform' and key is None:
+            continue
+        entry = aggregates.setdefault((scope, day, key), [0, 0, set()])
+        entry[0] += 1
+        entry[1] += cents
+        entry[2].add(donor)
+    return aggregates
+
+
+def apply_aggregates(aggregates):
+    """
+    Writes a batch into the rollup tables (caller commits): one insert for all the donors
+    and one upsert per scope, whatever the batch size. (SQLAlchemy can't cache compiled
+    ON CONFLICT statements, so fewer, bigger executemany calls are what keeps this cheap.)
+    """
+    if not aggregates:
+        return
+    donors = RollupDonor.__table__
+
+    # RETURNING gives back only donors that weren't there yet: those are the new unique donors
+    donor_rows = [
+        {'scope': scope, 'scope_key': '' if key is None else str(key), 'day': day, 'donor_hash': donor}
+        for (scope, day, key), (_, _, donor_hashes) in aggregates.items() for donor in donor_hashes
+    ]
+    new_donors = Counter(
+        (row.scope, row.scope_key, row.day) for row in db.session.execute(
+            _insert(donors).on_conflict_do_nothing().returning(donors.c.scope, donors.c.scope_key, donors.c.day),
+            donor_rows
+        )
+    )
+
+    params = {scope: [] for scope in SCOPES}
+    for (scope, day, key), (count, cents, _) in aggregates.items():
+        key_column = SCOPES[scope][1]
+        row = {'day': day, 'donation_count': count, 'amount_cents': cents,
+               'unique_donors': new_donors[(scope, '' if key is None else str(key), day)]}
+        if key_column:
+            row[key_column] = key
+        params[scope].append(row)
+
+    for scope, rows in params.items():
+        if not rows:
+            continue
+        model, key_column = SCOPES[scope]
+        table = model.__table__
+        stmt = _insert(table)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['day', key_column] if key_column else ['day'],
+            set_={
+                'donation_count': table.c.donation_count + stmt.excluded.donation_count,
+                'amount_cents': table.c.amount_cents + stmt.excluded.amount_cents,
+                'unique_donors': table.c.unique_donors + stmt.excluded.unique_donors,
+            }
+        ), rows)
+
+
+def record_donation(payment, ngo, cents):
+    """Adds one just-finalized payment to the rollups inside the finalize transaction."""
+    apply_aggregates(accumulate(
+        {}, payment.created_at.date(), ngo.id if ngo else None, ngo.ngo_type if ngo else None,
+        payment.donor_email, cents
+    ))
+
+
+def backfill_rollups(chunk_size=1000, rebuild=False, progress=None):
+    """
+    Rolls up successful payments that aren't in the rollups yet (history from before they
+    existed), in id-ordered chunks; each chunk and its checkpoint commit together.
+
+    ``rebuild`` empties the rollups and recounts everything. Returns payments rolled up.
+    """
+    payments = Payment.__table__
+    if rebuild:
+        for model in (NGODailyDonations, CategoryDailyDonations, PlatformDailyDonations, RollupDonor):
+            db.session.query(model).delete()
+        db.session.execute(update(payments).where(payments.c.rolled_up.is_(True)).values(rolled_up=False))
+        clear_checkpoint(CHECKPOINT_NAME)
+        db.session.commit()
+
+    after_id = int(load_checkpoint(CHECKPOINT_NAME, 0))
+    total = 0
+
+    while True:
+        rows = db.session.query(
+            Payment.id, Payment.created_at, Payment.ngo_id, Payment.donor_email, Payment.amount,
+            VerifiedNGO.ngo_type
+        ).outerjoin(VerifiedNGO, VerifiedNGO.id == Payment.ngo_id).filter(
+            Payment.transaction_status == 'SUCCESS',
+            Payment.rolled_up.is_(False),
+            Payment.id > after_id
+        ).order_by(Payment.id).limit(chunk_size).all()
+
+        if not rows:
+            clear_checkpoint(CHECKPOINT_NAME)
+            db.session.commit()
+            return total
+
+        # Flag first: only rows this run actually flipped are counted (safe against a parallel run)
+        claimed = set(db.session.execute(
+            update(payments)
+            .where(payments.c.id.in_([row.id for row in rows]), payments.c.rolled_up.is_(False))
+            .values(rolled_up=True)
+            .returning(payments.c.id)
+        ).scalars())
+
+        aggregates = {}
+        for row in rows:
+            if row.id in claimed:
+                accumulate(aggregates, row.created_at.date(), row.ngo_id, row.ngo_type, row.donor_email,
+                           to_cents(row.amount))
+        apply_aggregates(aggregates)
+
+        after_id = rows[-1].id
+        save_checkpoint(CHECKPOINT_NAME, after_id)
+        db.session.commit()
+
+        total += len(claimed)
+        if progress:
+            progress(total)
@@ -0,0 +1,19 @@
+from blinker import Namespace
+
+# Directory/payment events. Caches and search indexes subscribe to these so the
+# routes that change data don't need to know about every read-side structure.
+_signals = Namespace()
+
+# sender: app, kwargs: ngo (VerifiedNGO)
+ngo_approved = _signals.signal('ngo-approved')
+
+# sender: app, kwargs: ngo (VerifiedNGO)
+ngo_deactivated = _signals.signal('ngo-deactivated')
+ngo_reactivated = _signals.signal('ngo-reactivated')
+
+# sender: app, kwargs: ngo_id, amount, cents, total_cents (the NGO's new total, or None when
+# the credit went to a counter shard and only shows in the total after the next fold)
+donation_credited = _signals.signal('donation-credited')
+
+# sender: app, kwargs: folded ({ngo_id: cents moved from counter shards into the total})
+donation_totals_folded = _signals.signal('donation-totals-folded')
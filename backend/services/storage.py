@@ -0,0 +1,219 @@
+import os
+import threading
+from datetime import timezone
+from flask import current_app, url_for
+
+# boto3 is optional: only the S3 backend needs it, and the Vercel build has a tight lambda size limit
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+    from boto3.s3.transfer import TransferConfig
+except ImportError:  # pragma: no cover
+    boto3 = None
+
+# Where document files live (DOCUMENT_STORAGE). Keys are '/'-separated paths such as
+# 'ab/cd/<sha256>.pdf'; services/documents.py decides the key and keeps the references.
+#   * LocalStorage: files under UPLOAD_FOLDER (single node, writable disk), served as static files
+#   * S3Storage: objects in an S3-compatible bucket (AWS, MinIO, moto). One client per process
+#     with a bounded connection pool; files go up as multipart uploads and admins download
+#     them from a short-lived pre-signed URL, so no app worker proxies file bytes.
+#
+# Both write a finished temp file (already hashed, so its key is known) to its key with put().
+
+EXTENSION_KEY = 'document_storage'
+
+INCOMING = '.incoming'
+
+
+class LocalStorage:
+    def __init__(self, root, static_folder=None):
+        self.root = root
+        self.static_folder = static_folder
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def temp_dir(self):
+        """Temp files are written next to their final place so put() is an atomic rename."""
+        incoming = os.path.join(self.root, INCOMING)
+        os.makedirs(incoming, mode=0o755, exist_ok=True)
+        return incoming
+
+    def put(self, temp_path, key, content_type=None):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), mode=0o755, exist_ok=True)
+        os.replace(temp_path, path)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def delete(self, keys):
+        """Deletes the given keys; returns how many existed."""
+        deleted = 0
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def list(self, older_than):
+        """Yields keys of files last modified before ``older_than`` (a UTC datetime)."""
+        cutoff = older_than.replace(tzinfo=timezone.utc).timestamp()
+        for directory, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d != INCOMING]
+            for name in files:
+                path = os.path.join(directory, name)
+                if os.path.getmtime(path) < cutoff:
+                    yield os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def purge_incomplete(self, older_than):
+        """Removes temp files of uploads abandoned before ``older_than``; returns how many."""
+        incoming = os.path.join(self.root, INCOMING)
+        if not os.path.isdir(incoming):
+            return 0
+        cutoff = older_than.replace(tzinfo=timezone.utc).timestamp()
+        stale = [name for name in os.listdir(incoming) if os.path.getmtime(os.path.join(incoming, name)) < cutoff]
+        return self.delete(f'{INCOMING}/{name}' for name in stale)
+
+    def url(self, key):
+        """Static URL of the file, or None when UPLOAD_FOLDER is outside the static folder."""
+        if not self.static_folder:
+            return None
+        relative = os.path.relpath(self.path(key), self.static_folder)
+        if relative.startswith(os.pardir):
+            return None
+        return url_for('static', filename=relative.replace(os.sep, '/'))
+
+
+class S3Storage:
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, access_key_id=None,
+                 secret_access_key=None, addressing_style='auto', max_pool_connections=10,
+                 connect_timeout=3.0, read_timeout=30.0, multipart_threshold=8 * 1024 * 1024,
+                 multipart_chunksize=8 * 1024 * 1024, upload_concurrency=4, url_expires=300):
+        if boto3 is None:
+            raise RuntimeError('DOCUMENT_STORAGE=s3 needs boto3 (pip install boto3).')
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_expires = url_expires
+        # botocore clients are thread-safe: every request thread shares this one and its
+        # connection pool (sized for the upload threads of a few concurrent requests)
+        self.client = boto3.session.Session().client(
+            's3', endpoint_url=endpoint_url, region_name=region,
+            aws_access_key_id=access_key_id, aws_secret_access_key=secret_access_key,
+            config=BotoConfig(
+                signature_version='s3v4', max_pool_connections=max_pool_connections,
+                connect_timeout=connect_timeout, read_timeout=read_timeout,
+                retries={'mode': 'standard', 'max_attempts': 3},
+                s3={'addressing_style': addressing_style},
+            ),
+        )
+        # Files above the threshold are sent in parts, several at a time; a failed part is
+        # retried on its own and a failed upload is aborted
+        self.transfer = TransferConfig(
+            multipart_threshold=multipart_threshold, multipart_chunksize=multipart_chunksize,
+            max_concurrency=upload_concurrency, use_threads=upload_concurrency > 1,
+        )
+
+    def object_key(self, key):
+        return self.prefix + key
+
+    def temp_dir(self):
+        return None  # the system temp dir (/tmp is the only writable place on Vercel)
+
+    def put(self, temp_path, key, content_type=None):
+        extra = {'ContentType': content_type} if content_type else None
+        self.client.upload_file(temp_path, self.bucket, self.object_key(key), ExtraArgs=extra, Config=self.transfer)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def delete(self, keys):
+        """Deletes the given keys, 1000 per request; returns how many were deleted."""
+        keys = list(keys)
+        deleted = 0
+        for i in range(0, len(keys), 1000):
+            objects = [{'Key': self.object_key(key)} for key in keys[i:i + 1000]]
+            response = self.client.delete_objects(Bucket=self.bucket, Delete={'Objects': objects, 'Quiet': True})
+            errors = response.get('Errors', [])
+            for error in errors:
+                current_app.logger.warning(f"S3 delete of {error.get('Key')} failed: {error.get('Message')}")
+            deleted += len(objects) - len(errors)
+        return deleted
+
+    def list(self, older_than):
+        cutoff = older_than.replace(tzinfo=timezone.utc)
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get('Contents', []):
+                if item['LastModified'] < cutoff:
+                    yield item['Key'][len(self.prefix):]
+
+    def purge_incomplete(self, older_than):
+        """Aborts multipart uploads started before ``older_than`` (their parts are billed until then)."""
+        cutoff = older_than.replace(tzinfo=timezone.utc)
+        aborted = 0
+        paginator = self.client.get_paginator('list_multipart_uploads')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for upload in page.get('Uploads', []):
+                if upload['Initiated'] < cutoff:
+                    self.client.abort_multipart_upload(Bucket=self.bucket, Key=upload['Key'],
+                                                       UploadId=upload['UploadId'])
+                    aborted += 1
+        return aborted
+
+    def url(self, key):
+        """Pre-signed GET URL, valid for ``url_expires`` seconds."""
+        return self.client.generate_presigned_url('get_object', Params={'Bucket': self.bucket, 'Key': self.object_key(key)},
+                                                  ExpiresIn=self.url_expires)
+
+
+def create_storage(config, static_folder=None):
+    backend = (config.get('DOCUMENT_STORAGE') or 'local').lower()
+    if backend == 'local':
+        return LocalStorage(config['UPLOAD_FOLDER'], static_folder)
+    if backend == 's3':
+        if not config.get('S3_BUCKET'):
+            raise RuntimeError('DOCUMENT_STORAGE=s3 needs S3_BUCKET.')
+        return S3Storage(
+            config['S3_BUCKET'],
+            prefix=config.get('S3_PREFIX', ''),
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region=config.get('S3_REGION'),
+            access_key_id=config.get('S3_ACCESS_KEY_ID'),
+            secret_access_key=config.get('S3_SECRET_ACCESS_KEY'),
+            addressing_style=config.get('S3_ADDRESSING_STYLE', 'auto'),
+            max_pool_connections=config.get('S3_MAX_POOL_CONNECTIONS', 10),
+            connect_timeout=config.get('S3_CONNECT_TIMEOUT', 3.0),
+            read_timeout=config.get('S3_READ_TIMEOUT', 30.0),
+            multipart_threshold=config.get('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024),
+            multipart_chunksize=config.get('S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024),
+            upload_concurrency=config.get('S3_UPLOAD_CONCURRENCY', 4),
+            url_expires=config.get('DOCUMENT_URL_EXPIRES', 300),
+        )
+    raise RuntimeError(f"Unknown DOCUMENT_STORAGE '{backend}' (choose local or s3).")
+
+
+_build_lock = threading.Lock()
+
+
+def get_storage(app=None):
+    """The app's document storage (created from config on first use)."""
+    app = app or current_app._get_current_object()
+
+    storage = app.extensions.get(EXTENSION_KEY)
+    if storage is None:
+        with _build_lock:
+            storage = app.extensions.get(EXTENSION_KEY)
+            if storage is None:
+                storage = create_storage(app.config, app.static_folder)
+                app.extensions[EXTENSION_KEY] = storage
+    return storage
@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import deque
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+# One Stripe client per app (and worker process), built on first use from config:
+#   * the API key is set once, on the client, instead of on the global module per request
+#   * a shared keep-alive requests.Session whose pool matches the concurrency limit
+#   * explicit (connect, read) timeouts instead of the SDK's 80s default
+#   * a bulkhead: at most STRIPE_MAX_CONCURRENCY gateway calls in flight per process, so a
+#     slow gateway can't tie up every request thread
+#   * a circuit breaker: after STRIPE_BREAKER_THRESHOLD consecutive gateway failures, calls
+#     fail fast for STRIPE_BREAKER_COOLDOWN seconds, then one trial call is let through
+#   * per-operation latency metrics
+
+EXTENSION_KEY = 'stripe_gateway'
+
+# Errors that say the gateway (not our request) is unhealthy
+GATEWAY_FAILURES = (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+
+
+class StripeUnavailableError(stripe.StripeError):
+    """Raised without calling Stripe when the circuit is open or the bulkhead is full."""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                # Let a single trial call through; its result decides open vs closed
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class OperationStats:
+    """Call count, errors and a window of recent latencies for one Stripe operation."""
+
+    def __init__(self, window=1024):
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.latencies_ms = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def record_call(self, latency_ms, error=False):
+        with self._lock:
+            self.calls += 1
+            self.errors += error
+            self.latencies_ms.append(latency_ms)
+
+    def snapshot(self):
+        with self._lock:
+            calls, errors, rejected = self.calls, self.errors, self.rejected
+            ordered = sorted(self.latencies_ms)
+
+        def percentile(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 1) if ordered else None
+
+        return {
+            'calls': calls,
+            'errors': errors,
+            'rejected': rejected,
+            'p50_ms': percentile(50),
+            'p95_ms': percentile(95),
+            'p99_ms': percentile(99),
+            'max_ms': round(ordered[-1], 1) if ordered else None,
+        }
+
+
+class StripeGateway:
+    def __init__(self, api_key, api_base=None, connect_timeout=3.0, read_timeout=10.0, max_concurrency=8,
+                 bulkhead_timeout=0.5, max_network_retries=1, breaker_threshold=5, breaker_cooldown=30.0):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        self.client = stripe.StripeClient(
+            api_key,
+            base_addresses={'api': api_base} if api_base else None,
+            max_network_retries=max_network_retries,
+            http_client=stripe.RequestsClient(timeout=(connect_timeout, read_timeout), session=session),
+        )
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self._bulkhead = threading.BoundedSemaphore(max_concurrency)
+        self._bulkhead_timeout = bulkhead_timeout
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _stats_for(self, operation):
+        with self._stats_lock:
+            return self._stats.setdefault(operation, OperationStats())
+
+    def call(self, operation, fn, *args, **kwargs):
+        stats = self._stats_for(operation)
+
+        # The bulkhead slot is taken first, so a half-open trial admitted by the breaker
+        # always runs and reports back
+        if not self._bulkhead.acquire(timeout=self._bulkhead_timeout):
+            stats.record_rejected()
+            raise StripeUnavailableError(f'Too many concurrent Stripe calls; {operation} rejected.')
+
+        try:
+            if not self.breaker.allow():
+                stats.record_rejected()
+                raise StripeUnavailableError(f'Stripe circuit open; {operation} not attempted.')
+
+            started = time.perf_counter()
+            error = True
+            try:
+                result = fn(*args, **kwargs)
+            except GATEWAY_FAILURES:
+                self.breaker.record_failure()
+                raise
+            except stripe.StripeError:
+                # Our request was rejected (bad params, card declined...): the gateway itself is fine
+                self.breaker.record_success()
+                raise
+            except Exception:
+                # Anything else (a bug, an unexpected response) counts against the gateway
+                self.breaker.record_failure()
+                raise
+            else:
+                error = False
+                self.breaker.record_success()
+                return result
+            finally:
+                stats.record_call((time.perf_counter() - started) * 1000, error)
+        finally:
+            self._bulkhead.release()
+
+    def create_checkout_session(self, params, idempotency_key=None):
+        options = {'idempotency_key': idempotency_key} if idempotency_key else None
+        return self.call('checkout.sessions.create', self.client.v1.checkout.sessions.create, params, options)
+
+    def retrieve_checkout_session(self, session_id):
+        return self.call('checkout.sessions.retrieve', self.client.v1.checkout.sessions.retrieve, session_id)
+
+    def expire_checkout_session(self, session_id):
+        return self.call('checkout.sessions.expire', self.client.v1.checkout.sessions.expire, session_id)
+
+    def create_payment_intent(self, params, idempotency_key=None):
+        options = {'idempotency_key': idempotency_key} if idempotency_key else None
+        return self.call('payment_intents.create', self.client.v1.payment_intents.create, params, options)
+
+    def metrics(self):
+        with self._stats_lock:
+            operations = {name: stats.snapshot() for name, stats in self._stats.items()}
+        return {'circuit': self.breaker.state, 'operations': operations}
+
+
+_build_lock = threading.Lock()
+
+
+def get_stripe(app=None):
+    """The app's StripeGateway (created from config on first use)."""
+    app = app or current_app._get_current_object()
+
+    gateway = app.extensions.get(EXTENSION_KEY)
+    if gateway is None:
+        with _build_lock:
+            gateway = app.extensions.get(EXTENSION_KEY)
+            if gateway is None:
+                config = app.config
+                gateway = StripeGateway(
+                    config.get('STRIPE_SECRET_KEY') or '',
+                    api_base=config.get('STRIPE_API_BASE'),
+                    connect_timeout=config.get('STRIPE_CONNECT_TIMEOUT', 3.0),
+                    read_timeout=config.get('STRIPE_READ_TIMEOUT', 10.0),
+                    max_concurrency=config.get('STRIPE_MAX_CONCURRENCY', 8),
+                    bulkhead_timeout=config.get('STRIPE_BULKHEAD_TIMEOUT', 0.5),
+                    max_network_retries=config.get('STRIPE_MAX_NETWORK_RETRIES', 1),
+                    breaker_threshold=config.get('STRIPE_BREAKER_THRESHOLD', 5),
+                    breaker_cooldown=config.get('STRIPE_BREAKER_COOLDOWN', 30.0),
+                )
+                app.extensions[EXTENSION_KEY] = gateway
+    return gateway
@@ -0,0 +1,119 @@
+import threading
+from bisect import bisect_left, insort
+from flask import current_app
+from .cache import PeriodicRebuild
+from .signals import ngo_approved, ngo_deactivated, ngo_reactivated
+from ..models.verified_ngos import VerifiedNGO
+from backend import db
+
+# Typeahead for NGO names: a sorted array of lowercase keys searched by bisect.
+# Every word start in a name gets its own key, so "wat" finds "Clean Water Trust".
+# Like the in-memory search index, it follows admin changes through signals in the process
+# that made them and is rebuilt every SUGGEST_REFRESH_SECONDS to pick up the others'.
+
+EXTENSION_KEY = 'ngo_name_suggester'
+
+
+def _name_keys(name):
+    lowered = name.lower()
+    keys = [lowered]
+    for pos in range(1, len(lowered)):
+        if lowered[pos - 1] == ' ' and lowered[pos] != ' ':
+            keys.append(lowered[pos:])
+    return keys
+
+
+class NameSuggester:
+    def __init__(self):
+        self._entries = []  # sorted (key, name, ngo_id)
+        self._names = {}    # ngo_id -> name, to find entries on removal
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, ngo_id, name):
+        with self._lock:
+            self._remove(ngo_id)
+            self._names[ngo_id] = name
+            for key in _name_keys(name):
+                insort(self._entries, (key, name, ngo_id))
+
+    def remove(self, ngo_id):
+        with self._lock:
+            self._remove(ngo_id)
+
+    def _remove(self, ngo_id):
+        name = self._names.pop(ngo_id, None)
+        if name is None:
+            return
+        for key in _name_keys(name):
+            pos = bisect_left(self._entries, (key, name, ngo_id))
+            if pos < len(self._entries) and self._entries[pos] == (key, name, ngo_id):
+                del self._entries[pos]
+
+    def suggest(self, prefix, limit=8):
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        with self._lock:
+            pos = bisect_left(self._entries, (prefix,))
+            while pos < len(self._entries) and len(results) < limit:
+                key, name, ngo_id = self._entries[pos]
+                if not key.startswith(prefix):
+                    break
+                if ngo_id not in seen:
+                    seen.add(ngo_id)
+                    results.append({'id': ngo_id, 'name': name})
+                pos += 1
+        return results
+
+    @classmethod
+    def from_database(cls):
+        suggester = cls()
+        rows = db.session.query(VerifiedNGO.id, VerifiedNGO.name).filter(VerifiedNGO.is_active.is_(True))
+
+        entries = []
+        for ngo_id, name in rows:
+            suggester._names[ngo_id] = name
+            entries.extend((key, name, ngo_id) for key in _name_keys(name))
+        entries.sort()
+        suggester._entries = entries
+        return suggester
+
+
+_build_lock = threading.Lock()
+
+
+def get_name_suggester(app=None):
+    app = app or current_app._get_current_object()
+
+    holder = app.extensions.get(EXTENSION_KEY)
+    if holder is None:
+        with _build_lock:
+            holder = app.extensions.get(EXTENSION_KEY)
+            if holder is None:
+                holder = PeriodicRebuild(NameSuggester.from_database,
+                                         ttl=app.config.get('SUGGEST_REFRESH_SECONDS', 60))
+                app.extensions[EXTENSION_KEY] = holder
+    return holder.get()
+
+
+@ngo_approved.connect
+@ngo_reactivated.connect
+def _add_name(sender, ngo, **kwargs):
+    holder = sender.extensions.get(EXTENSION_KEY)
+    if holder is not None:
+        ngo_id, name = ngo.id, ngo.name
+        holder.apply(lambda suggester: suggester.add(ngo_id, name))
+
+
+@ngo_deactivated.connect
+def _remove_name(sender, ngo, **kwargs):
+    holder = sender.extensions.get(EXTENSION_KEY)
+    if holder is not None:
+        ngo_id = ngo.id
+        holder.apply(lambda suggester: suggester.remove(ngo_id))
@@ -0,0 +1,59 @@
+import atexit
+from concurrent.futures import ThreadPoolExecutor, Future
+from flask import current_app
+
+# Small background worker pool for work that must not hold a web worker (e.g. payment
+# finalization queued from the Checkout redirect). Each task runs inside its own app context.
+
+EXTENSION_KEY = 'background_tasks'
+
+
+def init_background_tasks(app):
+    app.extensions[EXTENSION_KEY] = None  # executor is created on first submit
+
+    def shutdown():
+        executor = app.extensions.get(EXTENSION_KEY)
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    atexit.register(shutdown)
+
+
+def _executor(app):
+    executor = app.extensions.get(EXTENSION_KEY)
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=app.config.get('BACKGROUND_WORKERS', 4),
+            thread_name_prefix='ngo-task'
+        )
+        app.extensions[EXTENSION_KEY] = executor
+    return executor
+
+
+def _run(app, fn, args, kwargs):
+    from backend import db
+
+    with app.app_context():
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            app.logger.exception(f"Background task {fn.__name__} failed: {e}")
+            raise
+        finally:
+            db.session.remove()
+
+
+def submit_task(fn, *args, **kwargs):
+    """Runs fn(*args, **kwargs) on the worker pool (inline when BACKGROUND_TASKS_EAGER is set)."""
+    app = current_app._get_current_object()
+
+    if app.config.get('BACKGROUND_TASKS_EAGER'):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            app.logger.exception(f"Background task {fn.__name__} failed: {e}")
+            future.set_exception(e)
+        return future
+
+    return _executor(app).submit(_run, app, fn, args, kwargs)
@@ -0,0 +1,183 @@
+import heapq
+import re
+import threading
+from array import array
+from collections import Counter
+from itertools import chain
+from flask import current_app
+from sqlalchemy import case, false, func, text
+from .cache import PeriodicRebuild
+from .signals import ngo_approved, ngo_deactivated, ngo_reactivated
+from ..models.verified_ngos import VerifiedNGO
+from backend import db
+
+# Typo-tolerant name search. PostgreSQL uses pg_trgm (GIN index on name); elsewhere a
+# compact in-process trigram index is built per app, like the other search structures:
+# admin changes update it at once in the process that made them (signals below), and every
+# process rebuilds it from the database every FUZZY_INDEX_REFRESH_SECONDS to pick up changes
+# made in the others. Trigrams and similarity follow pg_trgm so both backends rank alike.
+
+EXTENSION_KEY = 'ngo_trigram_index'
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_verified_ngos_name_trgm ON verified_ngos USING GIN (name gin_trgm_ops)",
+]
+
+_pg_trgm_available = {}
+
+
+def trigrams(value):
+    """pg_trgm-style trigram set: each word padded with two leading spaces and one trailing."""
+    grams = set()
+    for word in WORD_RE.findall((value or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Trigram → postings of NGO ids; scores candidates by Jaccard similarity of trigram sets."""
+
+    def __init__(self):
+        self._gram_ids = {}
+        self._postings = []   # gram id -> array('I') of NGO ids
+        self._sizes = {}      # NGO id -> number of distinct trigrams in its name
+        self._grams = {}      # NGO id -> array('I') of gram ids (for removal)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def add(self, ngo_id, name):
+        grams = trigrams(name)
+        with self._lock:
+            self._remove(ngo_id)
+            gram_ids = array('I')
+            for gram in grams:
+                gram_id = self._gram_ids.get(gram)
+                if gram_id is None:
+                    gram_id = len(self._postings)
+                    self._gram_ids[gram] = gram_id
+                    self._postings.append(array('I'))
+                self._postings[gram_id].append(ngo_id)
+                gram_ids.append(gram_id)
+            self._grams[ngo_id] = gram_ids
+            self._sizes[ngo_id] = len(grams)
+
+    def remove(self, ngo_id):
+        with self._lock:
+            self._remove(ngo_id)
+
+    def _remove(self, ngo_id):
+        gram_ids = self._grams.pop(ngo_id, None)
+        if gram_ids is None:
+            return
+        del self._sizes[ngo_id]
+        for gram_id in gram_ids:
+            self._postings[gram_id].remove(ngo_id)
+
+    def search(self, value, threshold=0.3, limit=50):
+        """Returns [(ngo_id, similarity)] with similarity >= threshold, most similar first."""
+        query_grams = trigrams(value)
+        if not query_grams:
+            return []
+
+        with self._lock:
+            postings = [self._postings[self._gram_ids[g]] for g in query_grams if g in self._gram_ids]
+            # Counter over the chained postings counts shared trigrams per NGO in C
+            shared = Counter(chain.from_iterable(postings))
+
+            query_size = len(query_grams)
+            # similarity >= threshold needs at least this many shared trigrams, whatever the name's size
+            min_common = threshold * query_size
+            scored = []
+            for ngo_id, common in shared.items():
+                if common < min_common:
+                    continue
+                similarity = common / (query_size + self._sizes[ngo_id] - common)
+                if similarity >= threshold:
+                    scored.append((ngo_id, similarity))
+
+        return heapq.nlargest(limit, scored, key=lambda item: item[1])
+
+    @classmethod
+    def from_database(cls):
+        index = cls()
+        rows = db.session.query(VerifiedNGO.id, VerifiedNGO.name).filter(VerifiedNGO.is_active.is_(True))
+        for ngo_id, name in rows:
+            index.add(ngo_id, name)
+        return index
+
+
+_build_lock = threading.Lock()
+
+
+def _holder(app):
+    holder = app.extensions.get(EXTENSION_KEY)
+    if holder is None:
+        with _build_lock:
+            holder = app.extensions.get(EXTENSION_KEY)
+            if holder is None:
+                holder = PeriodicRebuild(TrigramIndex.from_database,
+                                         ttl=app.config.get('FUZZY_INDEX_REFRESH_SECONDS', 60))
+                app.extensions[EXTENSION_KEY] = holder
+    return holder
+
+
+def get_trigram_index(app=None):
+    """Returns the app's index, building it from the database on first use."""
+    return _holder(app or current_app._get_current_object()).get()
+
+
+def pg_trgm_available(engine):
+    key = str(engine.url)
+    if key not in _pg_trgm_available:
+        with engine.connect() as conn:
+            _pg_trgm_available[key] = conn.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).first() is not None
+    return _pg_trgm_available[key]
+
+
+def apply_fuzzy_search(query, term):
+    """
+    Restricts a VerifiedNGO query to names similar to ``term`` (typo tolerant).
+
+    Returns (query, rank) like fulltext.apply_keyword_search, ranked by trigram similarity.
+    """
+    threshold = current_app.config.get('FUZZY_SEARCH_THRESHOLD', 0.3)
+    engine = db.engine
+
+    if engine.dialect.name == 'postgresql' and pg_trgm_available(engine):
+        similarity = func.similarity(VerifiedNGO.name, term)
+        # `%` uses the GIN trigram index; the threshold is applied on top of pg_trgm's own
+        return query.filter(VerifiedNGO.name.op('%')(term), similarity >= threshold), similarity.desc()
+
+    matches = get_trigram_index().search(
+        term, threshold=threshold, limit=current_app.config.get('FUZZY_SEARCH_LIMIT', 50)
+    )
+    if not matches:
+        return query.filter(false()), None
+
+    rank = case({ngo_id: position for position, (ngo_id, _) in enumerate(matches)}, value=VerifiedNGO.id)
+    return query.filter(VerifiedNGO.id.in_([ngo_id for ngo_id, _ in matches])), rank.asc()
+
+
+@ngo_approved.connect
+@ngo_reactivated.connect
+def _index_name(sender, ngo, **kwargs):
+    holder = sender.extensions.get(EXTENSION_KEY)
+    if holder is not None:
+        ngo_id, name = ngo.id, ngo.name
+        holder.apply(lambda index: index.add(ngo_id, name))
+
+
+@ngo_deactivated.connect
+def _unindex_name(sender, ngo, **kwargs):
+    holder = sender.extensions.get(EXTENSION_KEY)
+    if holder is not None:
+        ngo_id = ngo.id
+        holder.apply(lambda index: index.remove(ngo_id))
@@ -0,0 +1,144 @@
+"""
+Concurrent donations to a single NGO: many threads credit the same total at once.
+
+Compares the old read-modify-write in Python (load the row, add, commit) against the
+atomic `UPDATE ... SET total_donations_cents = total_donations_cents + :cents` and the
+sharded counters, and checks the final sum against what was credited.
+
+    python benchmarks/bench_counters.py [--threads 16] [--donations 200] [--shards 16]
+                                        [--database-url postgresql://...]
+
+Defaults to a temporary SQLite file (SQLite serializes writers, so contention shows up as
+lock waits there; point --database-url at PostgreSQL to see row-lock contention).
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--donations', type=int, default=200, help='Donations per thread')
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--database-url', default=None)
+    return parser.parse_args()
+
+
+args = parse_args()
+_tmpdir = None
+if not args.database_url:
+    _tmpdir = tempfile.mkdtemp(prefix='bench_counters_')
+    args.database_url = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+# DevelopmentConfig reads DATABASE_URL at import time
+os.environ['DATABASE_URL'] = args.database_url
+
+from sqlalchemy.exc import OperationalError
+from backend import create_app, db
+from backend.models.verified_ngos import VerifiedNGO
+from backend.models.donation_counters import DonationCounterShard
+from backend.services.donation_totals import credit_donation, fold_counter_shards, set_counter_shards, \
+    current_total_cents
+
+CENTS = 1250
+
+
+def read_modify_write(ngo_id, cents, shards):
+    ngo = db.session.get(VerifiedNGO, ngo_id)
+    ngo.total_donations_cents = ngo.total_donations_cents + cents
+
+
+def atomic(ngo_id, cents, shards):
+    credit_donation(ngo_id, cents)
+
+
+def sharded(ngo_id, cents, shards):
+    credit_donation(ngo_id, cents, shards)
+
+
+def hammer(app, ngo_id, credit, threads, donations, shards):
+    errors = []
+    retries = [0]
+    start_gate = threading.Barrier(threads)
+
+    def worker():
+        with app.app_context():
+            start_gate.wait()
+            for _ in range(donations):
+                while True:
+                    try:
+                        credit(ngo_id, CENTS, shards)
+                        db.session.commit()
+                        break
+                    except OperationalError:
+                        # "database is locked" / serialization failure: retry like a real worker would
+                        db.session.rollback()
+                        retries[0] += 1
+                    except Exception as e:
+                        db.session.rollback()
+                        errors.append(e)
+                        break
+            db.session.remove()
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - started, retries[0], errors
+
+
+def main():
+    app = create_app('development')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    expected = args.threads * args.donations * CENTS
+    print(f'{args.threads} threads x {args.donations} donations of ${CENTS / 100:.2f} to one NGO '
+          f'({args.database_url.split(":")[0]})')
+    print(f"{'mode':<20}{'seconds':>9}{'donations/s':>13}{'retries':>9}{'final total':>14}{'lost':>10}")
+
+    for name, credit in (('read-modify-write', read_modify_write), ('atomic', atomic), ('sharded', sharded)):
+        with app.app_context():
+            db.session.query(DonationCounterShard).delete()
+            db.session.query(VerifiedNGO).delete()
+            ngo = VerifiedNGO(name=f'Trending NGO {name}', contact_email=f'{name}@bench.org',
+                              ngo_type='Relief', mission='Benchmark target.')
+            db.session.add(ngo)
+            db.session.commit()
+            ngo_id = ngo.id
+            if credit is sharded:
+                set_counter_shards(ngo, args.shards)
+
+        elapsed, retries, errors = hammer(app, ngo_id, credit, args.threads, args.donations, args.shards)
+
+        with app.app_context():
+            if credit is sharded:
+                pending = current_total_cents(ngo_id)
+                fold_counter_shards()
+                assert db.session.get(VerifiedNGO, ngo_id).total_donations_cents == pending
+            total = db.session.get(VerifiedNGO, ngo_id).total_donations_cents
+            db.session.remove()
+
+        done = args.threads * args.donations
+        lost = expected - total
+        print(f'{name:<20}{elapsed:>9.2f}{done / elapsed:>13.0f}{retries:>9}{total / 100:>14.2f}'
+              f'{(lost / CENTS):>10.0f}' + (f'  ({len(errors)} errors: {errors[0]})' if errors else ''))
+
+    print(f'expected total: {expected / 100:.2f}')
+
+    if _tmpdir:
+        shutil.rmtree(_tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
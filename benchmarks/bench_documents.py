@@ -0,0 +1,127 @@
+"""
+Document uploads: random-name saves (the previous save_document) vs content-addressed storage.
+
+Stores `--uploads` files of `--size-kb` each, of which `--duplicates` share repeat earlier
+content (the same certificate uploaded by several applications), and reports throughput
+and the bytes left on disk.
+
+With --s3-endpoint the content-addressed run also goes to an S3-compatible store (MinIO, or
+`moto_server -p 9000` with pip install 'moto[server]' boto3) and reports the S3 requests made:
+a repeated upload costs one HEAD, new files above S3_MULTIPART_THRESHOLD go up in parts.
+
+    python benchmarks/bench_documents.py [--uploads 300] [--size-kb 2048] [--duplicates 0.5]
+                                         [--s3-endpoint http://127.0.0.1:9000 --s3-bucket bench-documents]
+"""
+import argparse
+import io
+import os
+import random
+import secrets
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from werkzeug.datastructures import FileStorage
+from backend import create_app, db
+from backend.services.documents import save_document
+from backend.services.storage import get_storage
+
+
+def disk_usage(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def payloads(count, size, duplicates):
+    rng = random.Random(7)
+    distinct = []
+    for _ in range(count):
+        if distinct and rng.random() < duplicates:
+            yield rng.choice(distinct)
+        else:
+            distinct.append(rng.randbytes(size))
+            yield distinct[-1]
+
+
+def random_names(folder, files):
+    for data in files:
+        FileStorage(io.BytesIO(data), 'certificate.pdf').save(os.path.join(folder, secrets.token_hex(8) + '.pdf'))
+
+
+def content_addressed(files):
+    for data in files:
+        assert save_document(FileStorage(io.BytesIO(data), 'certificate.pdf'))
+    db.session.commit()
+
+
+def s3_run(app, files, total, args):
+    app.config.update(DOCUMENT_STORAGE='s3', S3_BUCKET=args.s3_bucket, S3_ENDPOINT_URL=args.s3_endpoint,
+                      S3_ADDRESSING_STYLE='path', S3_REGION=os.environ.get('S3_REGION', 'us-east-1'),
+                      S3_ACCESS_KEY_ID=os.environ.get('S3_ACCESS_KEY_ID', 'minioadmin'),
+                      S3_SECRET_ACCESS_KEY=os.environ.get('S3_SECRET_ACCESS_KEY', 'minioadmin'))
+    app.extensions.pop('document_storage', None)
+    db.drop_all()
+    db.create_all()
+
+    client = get_storage().client
+    try:
+        client.create_bucket(Bucket=args.s3_bucket)
+    except client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    calls = Counter()
+    client.meta.events.register('before-call.s3', lambda model, **kwargs: calls.update([model.name]))
+
+    started = time.perf_counter()
+    content_addressed(files)
+    elapsed = time.perf_counter() - started
+    stored = sum(item['Size'] for page in client.get_paginator('list_objects_v2').paginate(
+        Bucket=args.s3_bucket, Prefix=app.config['S3_PREFIX']) for item in page.get('Contents', []))
+    print(f'content-addressed, S3 {total / elapsed / 1e6:7.1f} MB/s, {stored / 1e6:8.1f} MB stored; requests: '
+          + ', '.join(f'{name} {count}' for name, count in calls.most_common()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--uploads', type=int, default=300)
+    parser.add_argument('--size-kb', type=int, default=2048)
+    parser.add_argument('--duplicates', type=float, default=0.5, help='Share of uploads repeating earlier content')
+    parser.add_argument('--s3-endpoint', default=None, help='Also store into this S3-compatible endpoint')
+    parser.add_argument('--s3-bucket', default='bench-documents')
+    args = parser.parse_args()
+
+    files = list(payloads(args.uploads, args.size_kb * 1024, args.duplicates))
+    total = sum(len(data) for data in files)
+    scratch = tempfile.mkdtemp(prefix='bench_documents_')
+
+    app = create_app('testing')
+    try:
+        with app.app_context():
+            db.create_all()
+
+            started = time.perf_counter()
+            random_names(scratch, files)
+            elapsed = time.perf_counter() - started
+            print(f'random names       {total / elapsed / 1e6:7.1f} MB/s, {disk_usage(scratch) / 1e6:8.1f} MB on disk')
+
+            shutil.rmtree(scratch)
+            app.config['UPLOAD_FOLDER'] = scratch
+            started = time.perf_counter()
+            content_addressed(files)
+            elapsed = time.perf_counter() - started
+            print(f'content-addressed  {total / elapsed / 1e6:7.1f} MB/s, {disk_usage(scratch) / 1e6:8.1f} MB on disk '
+                  f'(hashed while writing)')
+
+            if args.s3_endpoint:
+                s3_run(app, files, total, args)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f'{args.uploads} uploads, {total / 1e6:.1f} MB uploaded, {len({id(data) for data in files})} distinct files')
+
+
+if __name__ == '__main__':
+    main()
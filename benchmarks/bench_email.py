@@ -0,0 +1,154 @@
+"""
+Outgoing mail: one thread and SMTP connection per message vs `flask email drain` (the
+outbox rows sent through the bounded mail queue).
+
+Sends a burst of registration emails to a local aiosmtpd server (pip install aiosmtpd)
+that takes `--connect-ms` to set up a connection (standing in for TLS and AUTH) and
+`--latency-ms` per message, optionally closing the connection with a 421 every
+`--drop-every` messages to exercise reconnects, and reports wall time, peak threads and
+SMTP connections opened.
+
+    python benchmarks/bench_email.py [--messages 500] [--workers 2] [--connect-ms 30] [--latency-ms 5]
+                                     [--drop-every 0]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aiosmtpd.controller import Controller
+
+
+class CountingHandler:
+    def __init__(self, connect_latency, latency, drop_every):
+        self.connect_latency = connect_latency
+        self.latency = latency
+        self.drop_every = drop_every
+        self.connections = 0
+        self.attempts = 0
+        self.recipients = set()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        await asyncio.sleep(self.connect_latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        self.attempts += 1
+        if self.drop_every and self.attempts % self.drop_every == 0:
+            return '421 Closing connection, try again'
+        self.recipients.update(envelope.rcpt_tos)
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+PORT = free_port()
+# Config reads DATABASE_URL and Flask-Mail its settings when the app is created
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='bench_email_'), 'email.db')
+os.environ.update(DATABASE_URL=f'sqlite:///{DB_PATH}', MAIL_SERVER='127.0.0.1', MAIL_PORT=str(PORT),
+                  MAIL_USE_TLS='False', MAIL_SUPPRESS_SEND='False')
+
+from flask import render_template
+from flask_mail import Message
+from backend import create_app, db, mail
+from backend.services.outbox import queue_email, drain_outbox
+
+
+def thread_per_message(app, count, workers):
+    """The previous send_email: a new thread and SMTP connection for every message."""
+    def send(msg):
+        with app.app_context():
+            mail.send(msg)
+
+    threads = []
+    with app.test_request_context():
+        for i in range(count):
+            msg = Message('Complete Your NGO Registration', sender='noreply@ngoplatform.com',
+                          recipients=[f'ngo{i}@example.org'])
+            msg.body = render_template('email/reg_link.txt', url=f'https://example.org/register/{i}')
+            msg.html = render_template('email/reg_link.html', url=f'https://example.org/register/{i}')
+            thread = threading.Thread(target=send, args=[msg])
+            thread.start()
+            threads.append(thread)
+    peak = threading.active_count()
+    for thread in threads:
+        thread.join()
+    return peak
+
+
+def outbox_drain(app, count, workers):
+    with app.test_request_context():
+        for i in range(count):
+            queue_email(f'ngo{i}@example.org', 'Complete Your NGO Registration', 'reg_link',
+                        url=f'https://example.org/register/{i}')
+        db.session.commit()
+
+    peak = 0
+
+    def progress(report):
+        nonlocal peak
+        peak = max(peak, threading.active_count())
+
+    with app.app_context():
+        report = drain_outbox(connections=workers, progress=progress)
+    print(f"mail queue metrics: {report['mail']}")
+    return peak
+
+
+def run(name, fn, app, handler, count, workers):
+    handler.connections = handler.attempts = 0
+    handler.recipients.clear()
+    started = time.perf_counter()
+    peak = fn(app, count, workers)
+    elapsed = time.perf_counter() - started
+    print(f'{name:<20} {count} messages in {elapsed:6.2f}s ({count / elapsed:6.0f}/s), '
+          f'peak threads {peak:>4}, SMTP connections {handler.connections:>4}, delivered {len(handler.recipients)}')
+    return len(handler.recipients)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=2, help='Drain SMTP connections (mail queue workers)')
+    parser.add_argument('--connect-ms', type=float, default=30, help='SMTP server time to accept a connection')
+    parser.add_argument('--latency-ms', type=float, default=5, help='SMTP server time per message')
+    parser.add_argument('--drop-every', type=int, default=0, help='Answer 421 to every Nth message (0: never)')
+    args = parser.parse_args()
+
+    handler = CountingHandler(args.connect_ms / 1000, args.latency_ms / 1000, args.drop_every)
+    controller = Controller(handler, hostname='127.0.0.1', port=PORT)
+    controller.start()
+    try:
+        app = create_app('development')
+        app.config.update(MAIL_DEBUG=False, EMAIL_OUTBOX_RETRY_BASE_SECONDS=0)
+        mail.init_app(app)  # without the SMTP protocol trace DEBUG turns on
+        with app.app_context():
+            db.create_all()
+        delivered = run('thread per message', thread_per_message, app, handler, args.messages, args.workers)
+        delivered_drain = run(f'outbox drain ({args.workers} conn)', outbox_drain, app, handler, args.messages,
+                              args.workers)
+    finally:
+        controller.stop()
+
+    assert delivered_drain == args.messages, f'outbox drain delivered {delivered_drain} of {args.messages}'
+    if delivered != args.messages:
+        print(f'note: thread per message delivered only {delivered} of {args.messages}')
+    print('ok: every queued message delivered')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Typo-tolerant name search: in-process trigram index vs the plain LIKE path.
+
+Misspelled queries are generated from real names in a synthetic directory; for each
+path we report latency and how often the intended NGO was found (LIKE almost never is).
+
+    python benchmarks/bench_fuzzy.py [--rows 100000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, or_
+from backend import create_app, db
+from backend.models.verified_ngos import VerifiedNGO
+from backend.services.trigram import get_trigram_index
+
+SYLLABLES = 'ka ri mo sa te lu na vi de po ha ze go ba fi ru me ta lo ni'.split()
+SUFFIXES = ['Foundation', 'Trust', 'Society', 'Mission', 'Initiative', 'Alliance', 'Relief Fund']
+
+
+def make_name(rng, i):
+    word = lambda: ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+    return f"{word()} {word()} {rng.choice(SUFFIXES)} {i}"
+
+
+def misspell(rng, name):
+    chars = list(name.rsplit(' ', 1)[0])
+    for _ in range(2):
+        pos = rng.randrange(1, len(chars))
+        op = rng.choice(('drop', 'swap', 'replace'))
+        if op == 'drop':
+            del chars[pos]
+        elif op == 'swap' and pos < len(chars) - 1:
+            chars[pos], chars[pos + 1] = chars[pos + 1], chars[pos]
+        else:
+            chars[pos] = rng.choice('aeiou')
+    return ''.join(chars)
+
+
+def like_search(term):
+    pattern = f'%{term}%'
+    rows = db.session.query(VerifiedNGO.id).filter(or_(
+        VerifiedNGO.name.ilike(pattern), VerifiedNGO.mission.ilike(pattern)
+    )).limit(50).all()
+    return [r[0] for r in rows]
+
+
+def trigram_search(term):
+    return [ngo_id for ngo_id, _ in get_trigram_index().search(term, threshold=0.3, limit=50)]
+
+
+def run(fn, queries):
+    hits = 0
+    samples = []
+    for term, expected_id in queries:
+        start = time.perf_counter()
+        found = fn(term)
+        samples.append(time.perf_counter() - start)
+        hits += expected_id in found
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99)] * 1000, hits / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        names = [make_name(rng, i) for i in range(args.rows)]
+        for start in range(0, args.rows, 10000):
+            db.session.execute(insert(VerifiedNGO), [
+                {'name': name, 'contact_email': f'ngo{start + j}@example.org', 'ngo_type': 'Other',
+                 'mission': 'Synthetic benchmark organization.', 'is_active': True, 'total_donations_cents': 0}
+                for j, name in enumerate(names[start:start + 10000])
+            ])
+        db.session.commit()
+
+        start = time.perf_counter()
+        index = get_trigram_index()
+        print(f"Built trigram index over {len(index)} names in {time.perf_counter() - start:.1f}s\n")
+
+        sample = rng.sample(range(args.rows), args.queries)
+        queries = [(misspell(rng, names[i]), i + 1) for i in sample]
+
+        print(f"{'path':<10}{'p50 ms':>10}{'p99 ms':>10}{'recall':>10}")
+        for label, fn in (('LIKE', like_search), ('trigram', trigram_search)):
+            p50, p99, recall = run(fn, queries)
+            print(f"{label:<10}{p50:>10.2f}{p99:>10.2f}{recall:>9.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Radius queries ("NGOs within R km of a city") over a synthetic directory.
+
+Compares a naive scan (load every coordinate, haversine in Python) against the indexed
+path used by search: grid-cell + bounding-box prefilter in SQL, exact distance in NumPy.
+
+    python benchmarks/bench_geo.py [--rows 100000] [--repeat 5]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from backend import create_app, db
+from backend.models.verified_ngos import VerifiedNGO
+from backend.services import geo
+
+QUERIES = [('Pune', 10), ('Pune', 50), ('London', 25), ('Nairobi', 100), ('Sao Paulo', 250)]
+
+
+def populate(rows, seed=7):
+    rng = random.Random(seed)
+    cities = list(geo.load_gazetteer().items())
+    batch = []
+    for i in range(rows):
+        city, (lat, lon) = rng.choice(cities)
+        # Scatter NGOs up to ~150 km around a gazetteer city
+        lat = max(-89.9, min(89.9, lat + rng.uniform(-1.4, 1.4)))
+        lon = (lon + rng.uniform(-1.4, 1.4) + 180) % 360 - 180
+        batch.append({
+            'name': f"NGO {i}",
+            'contact_email': f"ngo{i}@example.org",
+            'ngo_type': 'Other',
+            'mission': 'Synthetic benchmark organization.',
+            'location': city,
+            'latitude': lat,
+            'longitude': lon,
+            'geo_cell': geo.grid_cell(lat, lon),
+            'is_active': True,
+            'total_donations_cents': 0,
+        })
+        if len(batch) == 10000:
+            db.session.execute(insert(VerifiedNGO), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(VerifiedNGO), batch)
+    db.session.commit()
+
+
+def naive_radius(lat, lon, radius_km):
+    rows = db.session.query(VerifiedNGO.id, VerifiedNGO.latitude, VerifiedNGO.longitude).filter(
+        VerifiedNGO.is_active.is_(True)
+    ).all()
+    found = []
+    for ngo_id, lat2, lon2 in rows:
+        a = math.sin(math.radians(lat2 - lat) / 2) ** 2 + math.cos(math.radians(lat)) * \
+            math.cos(math.radians(lat2)) * math.sin(math.radians(lon2 - lon) / 2) ** 2
+        if 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(a)) <= radius_km:
+            found.append(ngo_id)
+    return len(found)
+
+
+def indexed_radius(lat, lon, radius_km):
+    query = db.session.query(VerifiedNGO.id, VerifiedNGO.latitude, VerifiedNGO.longitude).filter(
+        VerifiedNGO.is_active.is_(True)
+    )
+    rows = geo.apply_bounding_box(query, lat, lon, radius_km).all()
+    return len(geo.within_radius(lat, lon, radius_km, [r[1] for r in rows], [r[2] for r in rows]))
+
+
+def timed(fn, args, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2] * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        populate(args.rows)
+        print(f"{args.rows} NGOs, NumPy {'enabled' if geo.np is not None else 'NOT installed (pure Python)'}\n")
+
+        print(f"{'query':<22}{'matches':>9}{'naive ms':>12}{'indexed ms':>12}{'speedup':>10}")
+        for city, radius in QUERIES:
+            lat, lon = geo.resolve_location(city)
+            naive_ms, naive_count = timed(naive_radius, (lat, lon, radius), args.repeat)
+            indexed_ms, indexed_count = timed(indexed_radius, (lat, lon, radius), args.repeat)
+            assert naive_count == indexed_count, (city, radius, naive_count, indexed_count)
+            print(f"{city + f' <= {radius} km':<22}{indexed_count:>9}{naive_ms:>12.1f}{indexed_ms:>12.2f}"
+                  f"{naive_ms / indexed_ms:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
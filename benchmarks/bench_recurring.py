@@ -0,0 +1,113 @@
+"""
+Recurring-donation scheduler throughput, with several scheduler nodes running at once.
+
+Seeds due subscriptions (a share of them on Stripe's always-declined test card) in a
+file-backed SQLite database, then runs `--nodes` schedulers concurrently against the local
+Stripe stand-in and checks every subscription was charged exactly once.
+
+    python benchmarks/bench_recurring.py [--subscriptions 10000] [--nodes 3] [--workers 8]
+                                         [--batch-size 500] [--latency-ms 20] [--declined 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+# Config reads DATABASE_URL at import time
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='bench_recurring_'), 'recurring.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['MAIL_SUPPRESS_SEND'] = '1'
+
+from sqlalchemy import insert, func
+from backend import create_app, db
+from backend.models.verified_ngos import VerifiedNGO
+from backend.models.payments import Payment
+from backend.models.recurring_donations import RecurringDonation
+from backend.services.recurring import run_recurring_donations
+from fake_stripe import FakeStripeServer
+
+
+def seed(count, declined_share):
+    db.session.execute(insert(VerifiedNGO), [
+        {'name': f'NGO {i}', 'contact_email': f'ngo{i}@example.org', 'ngo_type': 'Relief',
+         'mission': 'Benchmark.', 'is_active': True} for i in range(1, 51)
+    ])
+    due = datetime.utcnow() - timedelta(hours=1)
+    every = round(1 / declined_share) if declined_share else 0
+    db.session.execute(insert(RecurringDonation), [{
+        'ngo_id': 1 + i % 50, 'donor_email': f'donor{i}@example.org', 'amount_cents': 500 + i % 5000,
+        'currency': 'USD', 'stripe_customer_id': f'cus_{i:08d}',
+        'stripe_payment_method_id': 'pm_card_chargeDeclined' if every and i % every == 0 else 'pm_card_visa',
+        'next_run_at': due - timedelta(seconds=i),
+    } for i in range(count)])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--subscriptions', type=int, default=10000)
+    parser.add_argument('--nodes', type=int, default=3, help='Schedulers running concurrently')
+    parser.add_argument('--workers', type=int, default=8, help='Stripe calls in flight per node')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=20, help='Fake Stripe latency per call')
+    parser.add_argument('--declined', type=float, default=0.05, help='Share of subscriptions whose card is declined')
+    args = parser.parse_args()
+
+    app = create_app('development')
+    # The nodes share this process's Stripe gateway, so its bulkhead must admit all of them
+    app.config.update(STRIPE_SECRET_KEY='sk_test_bench', STRIPE_MAX_CONCURRENCY=args.workers * args.nodes)
+
+    with FakeStripeServer(latency=args.latency_ms / 1000) as fake:
+        app.config['STRIPE_API_BASE'] = fake.url
+        with app.app_context():
+            db.create_all()
+            seed(args.subscriptions, args.declined)
+
+        reports = []
+
+        def node():
+            with app.app_context():
+                reports.append(run_recurring_donations(batch_size=args.batch_size, workers=args.workers))
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=node) for _ in range(args.nodes)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        for i, report in enumerate(reports, 1):
+            print(f"node {i}: claimed {report['claimed']:>6} in {report['batches']:>3} batches, "
+                  f"succeeded {report['succeeded']:>6}, declined {report['failed']:>5}, "
+                  f"retry later {report['retry_later']:>4}, errors {report['errors']:>3}")
+
+        total = sum(report['claimed'] for report in reports)
+        print(f'total: {total} subscriptions in {elapsed:.2f}s ({total / elapsed:.0f}/s), {args.nodes} nodes x '
+              f'{args.workers} workers, {args.latency_ms:g} ms Stripe latency')
+
+        with app.app_context():
+            statuses = dict(db.session.query(Payment.transaction_status, func.count()).group_by(
+                Payment.transaction_status))
+            per_subscription = db.session.query(func.count(Payment.id)).group_by(Payment.recurring_donation_id).all()
+            advanced = RecurringDonation.query.filter(RecurringDonation.failure_count == 0,
+                                                      RecurringDonation.next_run_at > datetime.utcnow()).count()
+            declined = RecurringDonation.query.filter(RecurringDonation.failure_count == 1).count()
+            leased = RecurringDonation.query.filter(RecurringDonation.lease_owner.isnot(None)).count()
+
+        print(f'payments: {statuses}; Stripe PaymentIntents created: {fake.app.extensions["fake_stripe"]["stats"]}')
+        assert total == args.subscriptions
+        assert len(per_subscription) == args.subscriptions and all(count == 1 for (count,) in per_subscription)
+        assert advanced + declined == args.subscriptions and leased == 0
+        print('ok: every subscription claimed by exactly one node and charged exactly once')
+
+
+if __name__ == '__main__':
+    main()
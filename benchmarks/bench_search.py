@@ -0,0 +1,102 @@
+"""
+Compares the legacy ilike keyword search against the full-text index.
+
+Builds a synthetic directory of verified NGOs in the in-memory SQLite testing database and times
+both paths for a handful of search terms.
+
+    python benchmarks/bench_search.py [--rows 200000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, or_
+from backend import create_app, db
+from backend.models.verified_ngos import VerifiedNGO
+from backend.services.fulltext import apply_keyword_search
+
+WORDS = (
+    'children education water health clean rural school girls women food shelter animal '
+    'rescue forest ocean climate art music culture library literacy nutrition medical clinic '
+    'vaccine refugee housing disaster relief community youth elderly mental wellness farming '
+    'energy solar recycling wildlife conservation heritage theatre dance poverty microfinance'
+).split()
+
+TYPES = ['Education', 'Health', 'Environment', 'Poverty', 'Arts', 'Animal Welfare', 'Other']
+
+TERMS = ['water', 'literacy', 'solar energy', 'refugee housing', 'xylophone']
+
+
+def populate(rows, seed=42):
+    rng = random.Random(seed)
+    # Filler vocabulary keeps the topic words reasonably selective, like real mission statements
+    filler = [''.join(rng.choice('bcdfghjklmnprstvwz') + rng.choice('aeiou') for _ in range(3)) for _ in range(5000)]
+    batch = []
+    for i in range(rows):
+        batch.append({
+            'name': f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} Foundation {i}",
+            'contact_email': f"ngo{i}@example.org",
+            'ngo_type': rng.choice(TYPES),
+            'mission': ' '.join(rng.choice(WORDS) if rng.random() < 0.05 else rng.choice(filler) for _ in range(40)),
+            'is_active': True,
+            'total_donations_cents': 0,
+        })
+        if len(batch) == 10000:
+            db.session.execute(insert(VerifiedNGO), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(VerifiedNGO), batch)
+    db.session.commit()
+
+
+def ilike_search(term):
+    pattern = f'%{term}%'
+    return VerifiedNGO.query.filter_by(is_active=True).filter(or_(
+        VerifiedNGO.name.ilike(pattern),
+        VerifiedNGO.mission.ilike(pattern)
+    )).order_by(VerifiedNGO.name).limit(50).all()
+
+
+def fulltext_search(term):
+    query, rank = apply_keyword_search(VerifiedNGO.query.filter_by(is_active=True), term)
+    return query.order_by(rank, VerifiedNGO.name).limit(50).all()
+
+
+def timed(fn, term, repeat):
+    samples = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn(term)
+        samples.append(time.perf_counter() - start)
+    return min(samples) * 1000, sorted(samples)[len(samples) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        populate(args.rows)
+        print(f"Inserted {args.rows} NGOs (indexed by triggers) in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'term':<18}{'ilike min/median ms':>24}{'fts min/median ms':>24}{'speedup':>10}")
+        for term in TERMS:
+            ilike_min, ilike_med = timed(ilike_search, term, args.repeat)
+            fts_min, fts_med = timed(fulltext_search, term, args.repeat)
+            print(f"{term:<18}{ilike_min:>11.1f} / {ilike_med:<10.1f}{fts_min:>11.1f} / {fts_med:<10.1f}"
+                  f"{ilike_med / fts_med:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
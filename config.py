@@ -14,6 +14,33 @@ class Config:
     # 🔥 FIX: Define a global UPLOAD_FOLDER configuration
     # Files will be saved in 'ngo_platform/static/ngo_documents'
     UPLOAD_FOLDER = os.path.join(basedir, 'static', 'ngo_documents')
+    # Largest request body accepted (uploads included); bigger ones get 413 before being read
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or 16 * 1024 * 1024)
+    # `flask documents gc` keeps unreferenced documents (and stray upload files) this long
+    DOCUMENT_GC_GRACE_HOURS = 24
+
+    # Where uploaded documents are kept (services/storage.py): 'local' (UPLOAD_FOLDER, one node
+    # only) or 's3' (an S3-compatible bucket; needs boto3)
+    DOCUMENT_STORAGE = os.environ.get('DOCUMENT_STORAGE') or 'local'
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_PREFIX = os.environ.get('S3_PREFIX', 'ngo_documents/')
+    # Set for MinIO or another S3-compatible store (with S3_ADDRESSING_STYLE=path for MinIO)
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+    S3_ADDRESSING_STYLE = os.environ.get('S3_ADDRESSING_STYLE', 'auto')
+    S3_REGION = os.environ.get('S3_REGION')
+    # Without keys boto3 falls back to AWS_* variables or the instance role
+    S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY')
+    # HTTP connections the process keeps open to S3 (shared by all request threads)
+    S3_MAX_POOL_CONNECTIONS = int(os.environ.get('S3_MAX_POOL_CONNECTIONS') or 10)
+    S3_CONNECT_TIMEOUT = 3
+    S3_READ_TIMEOUT = 30
+    # Uploads above the threshold go up in parts of S3_MULTIPART_CHUNKSIZE, this many at a time
+    S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+    S3_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+    S3_UPLOAD_CONCURRENCY = 4
+    # Lifetime of the pre-signed links admins download documents from
+    DOCUMENT_URL_EXPIRES = 300
 
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
@@ -21,15 +48,121 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
+    # Render but don't deliver mail (load tests, local runs without an SMTP server)
+    MAIL_SUPPRESS_SEND = os.environ.get('MAIL_SUPPRESS_SEND', 'False').lower() in ('true', '1', 't')
 
     STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
     STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY')
+    # Signing secret of the /stripe/webhook endpoint; without it the redirect pages finalize payments
+    STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
+    # Without it, how often a pending success page may ask Stripe for the session's status
+    STRIPE_REDIRECT_RETRIEVE_SECONDS = 15
+    # Point the Stripe client at a stand-in (tools/fake_stripe.py) for local runs and load tests
+    STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE')
+
+    # Stripe client (services/stripe_gateway.py): timeouts, per-process concurrency cap and circuit breaker
+    STRIPE_CONNECT_TIMEOUT = float(os.environ.get('STRIPE_CONNECT_TIMEOUT') or 3)
+    STRIPE_READ_TIMEOUT = float(os.environ.get('STRIPE_READ_TIMEOUT') or 10)
+    STRIPE_MAX_NETWORK_RETRIES = 1
+    STRIPE_MAX_CONCURRENCY = int(os.environ.get('STRIPE_MAX_CONCURRENCY') or 8)
+    STRIPE_BULKHEAD_TIMEOUT = 0.5
+    STRIPE_BREAKER_THRESHOLD = 5
+    STRIPE_BREAKER_COOLDOWN = 30
+
+    # Mail queue of `flask email drain` (services/email.py): EMAIL_OUTBOX_CONNECTIONS worker
+    # threads each holding one SMTP connection; claiming outbox rows waits while it is full
+    MAIL_QUEUE_SIZE = int(os.environ.get('MAIL_QUEUE_SIZE') or 1000)
+    MAIL_BATCH_SIZE = 50
+    # Close a worker's SMTP connection after this long without mail
+    MAIL_IDLE_SECONDS = 30
+    # Time a stopping drain allows to send what is still queued
+    MAIL_SHUTDOWN_TIMEOUT = 30
+
+    # Transactional email outbox (services/outbox.py), delivered by `flask email drain`
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE') or 100)
+    # SMTP connections the drain keeps open (one sending thread each)
+    EMAIL_OUTBOX_CONNECTIONS = int(os.environ.get('EMAIL_OUTBOX_CONNECTIONS') or 4)
+    # A drain that dies mid-batch loses its claim after this long (the batch is then resent)
+    EMAIL_OUTBOX_LEASE_SECONDS = 300
+    # Retries back off 1, 2, 4... minutes up to 6 hours; after 10 attempts the email is dropped
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS = 60
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS = 6 * 3600
+    EMAIL_OUTBOX_MAX_ATTEMPTS = 10
+    # `flask email drain --follow`: how often to look for new mail when the outbox is empty
+    EMAIL_OUTBOX_POLL_SECONDS = 5
+    # `flask email purge`: sent emails older than this are deleted
+    EMAIL_OUTBOX_KEEP_DAYS = 30
+
+    # Monthly donor digest (flask email digest)
+    DIGEST_READ_SIZE = 10000
+    DIGEST_BATCH_SIZE = int(os.environ.get('DIGEST_BATCH_SIZE') or 500)
+    DIGEST_CONNECTIONS = int(os.environ.get('DIGEST_CONNECTIONS') or 4)
+    # Messages per second across all connections; stay under the mail provider's sending quota
+    DIGEST_RATE_LIMIT = float(os.environ.get('DIGEST_RATE_LIMIT') or 20)
+
+    # Worker threads for background tasks (payment finalization)
+    BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS') or 4)
+
+    # `flask payments reconcile`: finalize payments left PENDING (donor never returned from Checkout)
+    RECONCILE_STALE_MINUTES = int(os.environ.get('RECONCILE_STALE_MINUTES') or 60)
+    RECONCILE_CHUNK_SIZE = 200
+    RECONCILE_WORKERS = 8
+    # Stay well under Stripe's API rate limit (100 req/s live, 25 req/s test mode)
+    RECONCILE_RATE_LIMIT = float(os.environ.get('RECONCILE_RATE_LIMIT') or 20)
+
+    # Recurring donations (flask donations run-recurring)
+    RECURRING_BATCH_SIZE = int(os.environ.get('RECURRING_BATCH_SIZE') or 500)
+    RECURRING_WORKERS = int(os.environ.get('RECURRING_WORKERS') or 8)
+    # A node that dies mid-batch loses its claim after this long
+    RECURRING_LEASE_SECONDS = 600
+    # After a declined charge
+    RECURRING_RETRY_HOURS = 24
+    # After Stripe was unreachable (same attempt, same idempotency key)
+    RECURRING_RETRY_BACKOFF_SECONDS = 300
+    RECURRING_MAX_FAILURES = 3
 
     LOG_FILE = 'logs/app.log'
 
+    # Adds X-Query-Count (SQL statements per request) to every response
+    QUERY_COUNT_HEADER = os.environ.get('QUERY_COUNT_HEADER', 'False').lower() in ('true', '1', 't')
+
+    LEADERBOARD_PAGE_SIZE = int(os.environ.get('LEADERBOARD_PAGE_SIZE') or 24)
+    LEADERBOARD_CACHE_TTL = int(os.environ.get('LEADERBOARD_CACHE_TTL') or 60)
+
+    # Process-tier TTL of the NGO lookup cache used on the donation path (services/ngo_cache.py)
+    NGO_CACHE_TTL = int(os.environ.get('NGO_CACHE_TTL') or 30)
+
+    DONATION_HISTORY_PAGE_SIZE = 50
+    DONATION_HISTORY_MAX_PAGE_SIZE = 200
+
+    # In-process BM25 search index (for deployments without database full-text search)
+    INMEMORY_SEARCH_ENABLED = os.environ.get('INMEMORY_SEARCH_ENABLED', 'False').lower() in ('true', '1', 't')
+    INMEMORY_SEARCH_LIMIT = int(os.environ.get('INMEMORY_SEARCH_LIMIT') or 200)
+    # Each worker rebuilds its index this often, to pick up admin changes made in other workers
+    INMEMORY_SEARCH_REFRESH_SECONDS = int(os.environ.get('INMEMORY_SEARCH_REFRESH_SECONDS') or 60)
+
+    SEARCH_PAGE_SIZE = 12
+    SEARCH_MAX_RESULTS = 1000
+    # Per worker process: other workers see an admin change once their entries are this old
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL') or 300)
+    SEARCH_CACHE_MAX_AGE = int(os.environ.get('SEARCH_CACHE_MAX_AGE') or 30)
+
+    # Typo-tolerant fallback when a keyword search finds nothing
+    FUZZY_SEARCH_ENABLED = True
+    FUZZY_SEARCH_THRESHOLD = 0.3
+    FUZZY_SEARCH_LIMIT = 50
+    # Each worker rebuilds its trigram index this often, to pick up admin changes made in other workers
+    FUZZY_INDEX_REFRESH_SECONDS = int(os.environ.get('FUZZY_INDEX_REFRESH_SECONDS') or 60)
+
+    SUGGEST_LIMIT = 8
+    # Each worker rebuilds its name list this often, to pick up admin changes made in other workers
+    SUGGEST_REFRESH_SECONDS = int(os.environ.get('SUGGEST_REFRESH_SECONDS') or 60)
+    SUGGEST_CACHE_MAX_AGE = int(os.environ.get('SUGGEST_CACHE_MAX_AGE') or 60)
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    QUERY_COUNT_HEADER = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
                               f'sqlite:///{os.path.join(os.path.abspath(os.path.dirname(__file__)), "dev.db")}'
 
@@ -45,6 +178,8 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     MAIL_SUPPRESS_SEND = True
+    QUERY_COUNT_HEADER = True
+    BACKGROUND_TASKS_EAGER = True
 
 
 config_by_name = {
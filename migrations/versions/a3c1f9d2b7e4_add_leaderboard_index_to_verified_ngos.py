@@ -0,0 +1,26 @@
+"""Add leaderboard keyset index to verified_ngos
+
+Revision ID: a3c1f9d2b7e4
+Revises: 347df4baa2a9
+Create Date: 2026-10-18 10:02:11.418203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c1f9d2b7e4'
+down_revision = '347df4baa2a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('verified_ngos', schema=None) as batch_op:
+        batch_op.create_index('ix_verified_ngos_leaderboard', ['is_active', 'total_donations', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('verified_ngos', schema=None) as batch_op:
+        batch_op.drop_index('ix_verified_ngos_leaderboard')
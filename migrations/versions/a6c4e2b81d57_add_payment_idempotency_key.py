@@ -0,0 +1,30 @@
+"""Add idempotency_key (unique) and checkout_url to payments
+
+Revision ID: a6c4e2b81d57
+Revises: d3f7a1c95e28
+Create Date: 2026-10-18 20:02:37.118904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c4e2b81d57'
+down_revision = 'd3f7a1c95e28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('checkout_url', sa.String(length=500), nullable=True))
+        batch_op.create_unique_constraint('uq_payments_idempotency_key', ['idempotency_key'])
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_payments_idempotency_key', type_='unique')
+        batch_op.drop_column('checkout_url')
+        batch_op.drop_column('idempotency_key')
@@ -0,0 +1,85 @@
+"""Store NGO donation totals as integer cents and add sharded donation counters
+
+Replaces the Float verified_ngos.total_donations with total_donations_cents (atomic
+integer increments) and rebuilds the leaderboard index on it.
+
+Revision ID: b8d2e6f04c19
+Revises: f1a9c4e67b30
+Create Date: 2026-10-18 19:20:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d2e6f04c19'
+down_revision = 'f1a9c4e67b30'
+branch_labels = None
+depends_on = None
+
+
+# The FTS sync triggers of c7e24b19f0a6, copied here so later changes to the app can't change
+# what this migration does. SQLite batch mode rebuilds verified_ngos, which drops them.
+FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS verified_ngos_fts_ai AFTER INSERT ON verified_ngos WHEN new.is_active BEGIN
+        INSERT INTO verified_ngos_fts(rowid, name, mission, ngo_type) VALUES (new.id, new.name, new.mission, new.ngo_type);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS verified_ngos_fts_ad AFTER DELETE ON verified_ngos BEGIN
+        DELETE FROM verified_ngos_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS verified_ngos_fts_au AFTER UPDATE OF name, mission, ngo_type, is_active ON verified_ngos BEGIN
+        DELETE FROM verified_ngos_fts WHERE rowid = old.id;
+        INSERT INTO verified_ngos_fts(rowid, name, mission, ngo_type)
+            SELECT new.id, new.name, new.mission, new.ngo_type WHERE new.is_active;
+    END""",
+]
+
+
+def upgrade():
+    with op.batch_alter_table('verified_ngos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_donations_cents', sa.BigInteger(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('counter_shards', sa.SmallInteger(), nullable=False, server_default='0'))
+
+    op.execute(
+        "UPDATE verified_ngos SET total_donations_cents = "
+        "CAST(ROUND(COALESCE(total_donations, 0) * 100) AS BIGINT)"
+    )
+
+    with op.batch_alter_table('verified_ngos', schema=None) as batch_op:
+        batch_op.drop_index('ix_verified_ngos_leaderboard')
+        batch_op.drop_column('total_donations')
+        batch_op.create_index('ix_verified_ngos_leaderboard', ['total_donations_cents', 'id'], unique=False)
+
+    _restore_fulltext_triggers()
+
+    op.create_table('donation_counter_shards',
+    sa.Column('ngo_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('cents', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.ForeignKeyConstraint(['ngo_id'], ['verified_ngos.id'], ),
+    sa.PrimaryKeyConstraint('ngo_id', 'shard')
+    )
+
+
+def downgrade():
+    op.drop_table('donation_counter_shards')
+
+    with op.batch_alter_table('verified_ngos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_donations', sa.Float(), nullable=True))
+
+    op.execute("UPDATE verified_ngos SET total_donations = total_donations_cents / 100.0")
+
+    with op.batch_alter_table('verified_ngos', schema=None) as batch_op:
+        batch_op.drop_index('ix_verified_ngos_leaderboard')
+        batch_op.drop_column('counter_shards')
+        batch_op.drop_column('total_donations_cents')
+        batch_op.create_index('ix_verified_ngos_leaderboard', ['total_donations', 'id'], unique=False)
+
+    _restore_fulltext_triggers()
+
+
+def _restore_fulltext_triggers():
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in FTS_TRIGGERS:
+            op.execute(statement)
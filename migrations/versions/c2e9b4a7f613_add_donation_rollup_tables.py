@@ -0,0 +1,66 @@
+"""Add donation rollup tables (per NGO/day, category/day, platform/day) and payments.rolled_up
+
+Existing successful payments start with rolled_up = false; run
+`flask donations backfill-rollups` after upgrading.
+
+Revision ID: c2e9b4a7f613
+Revises: a6c4e2b81d57
+Create Date: 2026-10-18 20:24:13.550872
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e9b4a7f613'
+down_revision = 'a6c4e2b81d57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('donation_rollup_ngo_daily',
+    sa.Column('ngo_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('donation_count', sa.Integer(), nullable=False),
+    sa.Column('amount_cents', sa.BigInteger(), nullable=False),
+    sa.Column('unique_donors', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ngo_id'], ['verified_ngos.id'], ),
+    sa.PrimaryKeyConstraint('ngo_id', 'day')
+    )
+    op.create_table('donation_rollup_category_daily',
+    sa.Column('ngo_type', sa.String(length=50), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('donation_count', sa.Integer(), nullable=False),
+    sa.Column('amount_cents', sa.BigInteger(), nullable=False),
+    sa.Column('unique_donors', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('ngo_type', 'day')
+    )
+    op.create_table('donation_rollup_platform_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('donation_count', sa.Integer(), nullable=False),
+    sa.Column('amount_cents', sa.BigInteger(), nullable=False),
+    sa.Column('unique_donors', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('donation_rollup_donors',
+    sa.Column('scope', sa.String(length=10), nullable=False),
+    sa.Column('scope_key', sa.String(length=50), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('donor_hash', sa.String(length=32), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'scope_key', 'day', 'donor_hash')
+    )
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rolled_up', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_column('rolled_up')
+
+    op.drop_table('donation_rollup_donors')
+    op.drop_table('donation_rollup_platform_daily')
+    op.drop_table('donation_rollup_category_daily')
+    op.drop_table('donation_rollup_ngo_daily')
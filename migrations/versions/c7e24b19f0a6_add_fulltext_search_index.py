@@ -0,0 +1,69 @@
+"""Add full-text search index for verified_ngos (FTS5 on SQLite, tsvector + GIN on PostgreSQL)
+
+Revision ID: c7e24b19f0a6
+Revises: a3c1f9d2b7e4
+Create Date: 2026-10-18 11:24:40.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e24b19f0a6'
+down_revision = 'a3c1f9d2b7e4'
+branch_labels = None
+depends_on = None
+
+
+# Copied from backend/services/fulltext.py as of this revision (the app's copy may change later)
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS verified_ngos_fts USING fts5(name, mission, ngo_type)",
+    """CREATE TRIGGER IF NOT EXISTS verified_ngos_fts_ai AFTER INSERT ON verified_ngos WHEN new.is_active BEGIN
+        INSERT INTO verified_ngos_fts(rowid, name, mission, ngo_type) VALUES (new.id, new.name, new.mission, new.ngo_type);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS verified_ngos_fts_ad AFTER DELETE ON verified_ngos BEGIN
+        DELETE FROM verified_ngos_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS verified_ngos_fts_au AFTER UPDATE OF name, mission, ngo_type, is_active ON verified_ngos BEGIN
+        DELETE FROM verified_ngos_fts WHERE rowid = old.id;
+        INSERT INTO verified_ngos_fts(rowid, name, mission, ngo_type)
+            SELECT new.id, new.name, new.mission, new.ngo_type WHERE new.is_active;
+    END""",
+]
+
+POSTGRES_DDL = [
+    """ALTER TABLE verified_ngos ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(ngo_type, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(mission, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_verified_ngos_search_vector ON verified_ngos USING GIN (search_vector)",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        op.execute(
+            "INSERT INTO verified_ngos_fts(rowid, name, mission, ngo_type) "
+            "SELECT id, name, mission, ngo_type FROM verified_ngos WHERE is_active"
+        )
+    elif dialect == 'postgresql':
+        for statement in POSTGRES_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS verified_ngos_fts_{suffix}")
+        op.execute("DROP TABLE IF EXISTS verified_ngos_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_verified_ngos_search_vector")
+        op.execute("ALTER TABLE verified_ngos DROP COLUMN IF EXISTS search_vector")
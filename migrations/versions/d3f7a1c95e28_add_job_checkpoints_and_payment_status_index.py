@@ -0,0 +1,35 @@
+"""Add job_checkpoints table and (transaction_status, id) index on payments
+
+Revision ID: d3f7a1c95e28
+Revises: b8d2e6f04c19
+Create Date: 2026-10-18 19:41:08.662410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f7a1c95e28'
+down_revision = 'b8d2e6f04c19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_checkpoints',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('position', sa.String(length=255), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('ix_payments_status_id', ['transaction_status', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_status_id')
+
+    op.drop_table('job_checkpoints')
@@ -0,0 +1,37 @@
+"""Add documents (content-addressed uploads)
+
+Revision ID: d9e6a3c85f17
+Revises: b7d2f8e41a96
+Create Date: 2026-10-19 14:06:52.927140
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9e6a3c85f17'
+down_revision = 'b7d2f8e41a96'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('documents',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('extension', sa.String(length=10), server_default='', nullable=False),
+    sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.create_index('ix_documents_unreferenced', ['ref_count', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index('ix_documents_unreferenced')
+
+    op.drop_table('documents')
@@ -0,0 +1,78 @@
+"""Add location to pending/rejected NGOs and coordinates + grid cell to verified_ngos
+
+Also rebuilds ix_verified_ngos_leaderboard without its leading is_active column, which
+made SQLite prefer it over the geo index.
+
+Revision ID: e5b83d0c1a72
+Revises: c7e24b19f0a6
+Create Date: 2026-10-18 13:05:52.117390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b83d0c1a72'
+down_revision = 'c7e24b19f0a6'
+branch_labels = None
+depends_on = None
+
+
+# The FTS sync triggers of c7e24b19f0a6, copied here so later changes to the app can't change
+# what this migration does. SQLite batch mode rebuilds verified_ngos, which drops them.
+FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS verified_ngos_fts_ai AFTER INSERT ON verified_ngos WHEN new.is_active BEGIN
+        INSERT INTO verified_ngos_fts(rowid, name, mission, ngo_type) VALUES (new.id, new.name, new.mission, new.ngo_type);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS verified_ngos_fts_ad AFTER DELETE ON verified_ngos BEGIN
+        DELETE FROM verified_ngos_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS verified_ngos_fts_au AFTER UPDATE OF name, mission, ngo_type, is_active ON verified_ngos BEGIN
+        DELETE FROM verified_ngos_fts WHERE rowid = old.id;
+        INSERT INTO verified_ngos_fts(rowid, name, mission, ngo_type)
+            SELECT new.id, new.name, new.mission, new.ngo_type WHERE new.is_active;
+    END""",
+]
+
+
+def upgrade():
+    with op.batch_alter_table('temp_ngos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('location', sa.String(length=100), nullable=True))
+
+    with op.batch_alter_table('rejected_ngos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('location', sa.String(length=100), nullable=True))
+
+    with op.batch_alter_table('verified_ngos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('geo_cell', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_verified_ngos_geo', ['geo_cell', 'latitude', 'longitude'], unique=False)
+        batch_op.drop_index('ix_verified_ngos_leaderboard')
+        batch_op.create_index('ix_verified_ngos_leaderboard', ['total_donations', 'id'], unique=False)
+
+    _restore_fulltext_triggers()
+
+
+def downgrade():
+    with op.batch_alter_table('verified_ngos', schema=None) as batch_op:
+        batch_op.drop_index('ix_verified_ngos_leaderboard')
+        batch_op.create_index('ix_verified_ngos_leaderboard', ['is_active', 'total_donations', 'id'], unique=False)
+        batch_op.drop_index('ix_verified_ngos_geo')
+        batch_op.drop_column('geo_cell')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
+
+    _restore_fulltext_triggers()
+
+    with op.batch_alter_table('rejected_ngos', schema=None) as batch_op:
+        batch_op.drop_column('location')
+
+    with op.batch_alter_table('temp_ngos', schema=None) as batch_op:
+        batch_op.drop_column('location')
+
+
+def _restore_fulltext_triggers():
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in FTS_TRIGGERS:
+            op.execute(statement)
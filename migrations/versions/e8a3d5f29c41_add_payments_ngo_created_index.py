@@ -0,0 +1,26 @@
+"""Add (ngo_id, created_at, id) index on payments for per-NGO donation history
+
+Revision ID: e8a3d5f29c41
+Revises: c2e9b4a7f613
+Create Date: 2026-10-18 21:02:47.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3d5f29c41'
+down_revision = 'c2e9b4a7f613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('ix_payments_ngo_created', ['ngo_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_ngo_created')
@@ -0,0 +1,28 @@
+"""Add pg_trgm trigram index on verified_ngos.name (PostgreSQL only)
+
+Revision ID: f1a9c4e67b30
+Revises: e5b83d0c1a72
+Create Date: 2026-10-18 14:12:09.551846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a9c4e67b30'
+down_revision = 'e5b83d0c1a72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite deployments use the in-process trigram index instead (services/trigram.py)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_verified_ngos_name_trgm ON verified_ngos USING GIN (name gin_trgm_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_verified_ngos_name_trgm")
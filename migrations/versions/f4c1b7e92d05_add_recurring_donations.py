@@ -0,0 +1,61 @@
+"""Add recurring_donations and payments.recurring_donation_id
+
+Revision ID: f4c1b7e92d05
+Revises: e8a3d5f29c41
+Create Date: 2026-10-18 22:14:05.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c1b7e92d05'
+down_revision = 'e8a3d5f29c41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recurring_donations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('ngo_id', sa.Integer(), nullable=False),
+    sa.Column('donor_id', sa.Integer(), nullable=True),
+    sa.Column('donor_name', sa.String(length=100), nullable=True),
+    sa.Column('donor_email', sa.String(length=120), nullable=False),
+    sa.Column('amount_cents', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('interval_months', sa.SmallInteger(), server_default='1', nullable=False),
+    sa.Column('stripe_customer_id', sa.String(length=255), nullable=False),
+    sa.Column('stripe_payment_method_id', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=20), server_default='active', nullable=False),
+    sa.Column('next_run_at', sa.DateTime(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.Column('failure_count', sa.SmallInteger(), server_default='0', nullable=False),
+    sa.Column('lease_owner', sa.String(length=64), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['donor_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['ngo_id'], ['verified_ngos.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('recurring_donations', schema=None) as batch_op:
+        batch_op.create_index('ix_recurring_donations_due', ['status', 'next_run_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_recurring_donations_ngo_id'), ['ngo_id'], unique=False)
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurring_donation_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_payments_recurring_donation_id', 'recurring_donations',
+                                    ['recurring_donation_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_payments_recurring_donation_id', type_='foreignkey')
+        batch_op.drop_column('recurring_donation_id')
+
+    with op.batch_alter_table('recurring_donations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_recurring_donations_ngo_id'))
+        batch_op.drop_index('ix_recurring_donations_due')
+
+    op.drop_table('recurring_donations')
@@ -0,0 +1,103 @@
+"""`flask email drain` and its mail queue against a local SMTP server (aiosmtpd)."""
+import asyncio
+import socket
+import time
+import pytest
+from flask_mail import Message
+from backend import create_app, db, mail
+from backend.models.email_outbox import EmailOutbox
+from backend.services.email import MailQueue, MailQueueFull
+from backend.services.outbox import queue_email, drain_outbox
+
+controller_module = pytest.importorskip('aiosmtpd.controller')
+
+
+class Handler:
+    def __init__(self):
+        self.latency = 0
+        self.connections = 0
+        self.recipients = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        self.recipients.extend(envelope.rcpt_tos)
+        return '250 OK'
+
+
+@pytest.fixture
+def smtp():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    handler = Handler()
+    controller = controller_module.Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+@pytest.fixture
+def app(smtp):
+    _, port = smtp
+    app = create_app('testing')
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=port, MAIL_USE_TLS=False, MAIL_SUPPRESS_SEND=False)
+    mail.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+
+def message(i):
+    return Message('Hello', sender='noreply@example.org', recipients=[f'ngo{i}@example.org'], body='Hi')
+
+
+def test_drain_sends_outbox_over_persistent_connections(app, smtp):
+    handler, _ = smtp
+    with app.test_request_context():
+        for i in range(30):
+            queue_email(f'ngo{i}@example.org', 'Complete Your NGO Registration', 'reg_link', url=f'https://x/{i}')
+        db.session.commit()
+
+    report = drain_outbox(batch_size=10, connections=2)
+
+    assert report['sent'] == 30 and report['batches'] == 3
+    assert sorted(handler.recipients) == sorted(f'ngo{i}@example.org' for i in range(30))
+    assert handler.connections <= 2
+    assert report['mail']['sent'] == 30 and report['mail']['send_p95_ms'] is not None
+    assert EmailOutbox.query.filter_by(status='sent').count() == 30
+
+
+def test_full_queue_applies_backpressure(app, smtp):
+    handler, _ = smtp
+    handler.latency = 0.5
+    mail_queue = MailQueue(app, workers=1, maxsize=1, put_timeout=0.05)
+
+    first = mail_queue.submit(message(0))
+    while mail_queue.metrics()['queue_depth']:  # the worker is now busy sending it
+        time.sleep(0.01)
+    second = mail_queue.submit(message(1))
+    with pytest.raises(MailQueueFull):
+        mail_queue.submit(message(2))
+
+    mail_queue.shutdown(timeout=5)
+    assert first.result(timeout=0) is None and second.result(timeout=0) is None
+    assert mail_queue.metrics()['rejected'] == 1
+
+
+def test_shutdown_sends_what_is_queued(app, smtp):
+    handler, _ = smtp
+    mail_queue = MailQueue(app, workers=2, maxsize=10)
+    futures = [mail_queue.submit(message(i)) for i in range(8)]
+
+    mail_queue.shutdown(timeout=5)
+
+    assert all(future.done() and future.exception() is None for future in futures)
+    assert len(handler.recipients) == 8
+    with pytest.raises(MailQueueFull):
+        mail_queue.submit(message(9))
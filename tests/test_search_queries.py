@@ -0,0 +1,55 @@
+"""SQL statements per /search/ request, counted by services/instrumentation.py (X-Query-Count)."""
+import pytest
+from backend import create_app, db
+from backend.models.verified_ngos import VerifiedNGO
+from backend.services.directory import search_cache
+
+
+@pytest.fixture
+def client():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            VerifiedNGO(name='Clean Water Trust', contact_email='water@example.org', ngo_type='Environmental',
+                        mission='Wells and clean water for villages.', is_active=True),
+            VerifiedNGO(name='Open Books', contact_email='books@example.org', ngo_type='Education',
+                        mission='School libraries.', is_active=True),
+        ])
+        db.session.commit()
+    search_cache.clear()
+
+    client = app.test_client()
+    # Once per process / directory version: full-text probe, directory-wide facets, trigram index
+    client.get('/search/?q=books')
+    client.get('/search/?q=bokz')
+    yield client
+
+    search_cache.clear()
+    with app.app_context():
+        db.drop_all()
+
+
+def query_count(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return int(response.headers['X-Query-Count'])
+
+
+def test_keyword_search_is_one_statement(client):
+    assert query_count(client, '/search/?q=water') == 1
+
+
+def test_repeated_search_is_served_from_cache(client):
+    query_count(client, '/search/?q=water')
+    assert query_count(client, '/search/?q=water') == 0
+    assert query_count(client, '/search/?q=water&page=2') == 0
+
+
+def test_search_without_keyword_matches_adds_one_fuzzy_pass(client):
+    assert query_count(client, '/search/?q=watre') == 2
+
+
+def test_default_listing_is_cached(client):
+    assert query_count(client, '/search/') == 1
+    assert query_count(client, '/search/') == 0
@@ -0,0 +1,324 @@
+"""
+Local stand-in for the parts of the Stripe API the donation flow uses.
+
+Serves Checkout Session create/retrieve/expire and off-session PaymentIntent creation in
+Stripe's wire format, a fake hosted payment page, and signed webhook delivery, so the full
+donate → checkout → webhook flow (and recurring charges) runs offline.
+
+    python tools/fake_stripe.py [--port 12111] [--webhook-url http://127.0.0.1:5000/stripe/webhook]
+                                [--webhook-secret whsec_fake] [--latency-ms 0] [--jitter-ms 0]
+                                [--error-rate 0] [--error-status 500] [--decline-rate 0]
+
+Then start the app with STRIPE_API_BASE=http://127.0.0.1:12111, STRIPE_SECRET_KEY=sk_test_fake
+and STRIPE_WEBHOOK_SECRET=whsec_fake. Checkout redirects to /pay/<id>, which completes the
+payment (or ?outcome=cancel to abandon it) and redirects back like the hosted page would.
+
+For load tests, API calls can be slowed down (--latency-ms ± --jitter-ms) and a fraction
+of them answered with an error (--error-rate, --error-status 500/429/503); --decline-rate
+sends that fraction of hosted-page payments back to cancel_url (and declines that fraction
+of PaymentIntents). GET /_fake/stats reports
+what was served.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+import requests
+from flask import Flask, request, jsonify, redirect, abort
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+_KEY_RE = re.compile(r'([^\[\]]+)')
+
+
+def _unflatten(form):
+    """Stripe form encoding (line_items[0][price_data][unit_amount]=500) → nested dicts/lists."""
+    root = {}
+    for key, value in form.items(multi=True):
+        parts = _KEY_RE.findall(key)
+        node = root
+        for part, nxt in zip(parts, parts[1:]):
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+
+    def listify(node):
+        if isinstance(node, dict):
+            if node and all(k.isdigit() for k in node):
+                return [listify(node[k]) for k in sorted(node, key=int)]
+            return {k: listify(v) for k, v in node.items()}
+        return node
+
+    return listify(root)
+
+
+def _error(message, status=400, error_type='invalid_request_error', code=None):
+    return jsonify(error={'type': error_type, 'message': message, 'code': code}), status
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Stripe-Signature header value for a webhook body."""
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+# Injected failures: HTTP status -> (Stripe error type, message)
+INJECTED_ERRORS = {
+    429: ('rate_limit_error', 'Too many requests made to the API too quickly.'),
+    500: ('api_error', 'An unknown error occurred.'),
+    503: ('api_error', 'The service is temporarily unavailable.'),
+}
+
+
+def create_fake_stripe(webhook_url=None, webhook_secret='whsec_fake', latency=0.0, jitter=0.0, error_rate=0.0,
+                       error_status=500, decline_rate=0.0):
+    """``latency``/``jitter`` are seconds added to every /v1/ call; the rates are fractions 0-1."""
+    if error_status not in INJECTED_ERRORS:
+        raise ValueError(f'error_status must be one of {sorted(INJECTED_ERRORS)}')
+
+    app = Flask('fake_stripe')
+    sessions = {}
+    idempotent = {}  # Idempotency-Key -> session id of the original request
+    intents = {}  # Idempotency-Key -> (body, status) of the original PaymentIntent response
+    lock = threading.Lock()
+    stats = {'api_calls': 0, 'errors_injected': 0, 'declined': 0}
+    app.extensions['fake_stripe'] = {'sessions': sessions, 'webhooks_sent': [], 'created': 0, 'stats': stats}
+
+    def deliver(event_type, checkout_session):
+        if not webhook_url:
+            return
+        payload = json.dumps({
+            'id': f'evt_{uuid.uuid4().hex[:24]}',
+            'object': 'event',
+            'type': event_type,
+            'created': int(time.time()),
+            'data': {'object': checkout_session},
+        })
+
+        def send():
+            try:
+                response = requests.post(webhook_url, data=payload, timeout=10, headers={
+                    'Content-Type': 'application/json',
+                    'Stripe-Signature': sign_payload(payload, webhook_secret),
+                })
+                app.extensions['fake_stripe']['webhooks_sent'].append((event_type, response.status_code))
+            except requests.RequestException as e:
+                app.logger.warning(f'Webhook delivery failed: {e}')
+
+        # Stripe delivers events asynchronously, after the customer has already been redirected
+        threading.Thread(target=send, daemon=True).start()
+
+    @app.before_request
+    def authenticate():
+        if request.path.startswith('/v1/'):
+            auth = request.headers.get('Authorization', '')
+            if not auth.startswith('Bearer sk_'):
+                return _error('Invalid API Key provided.', 401, 'authentication_error')
+
+            with lock:
+                stats['api_calls'] += 1
+            delay = latency + random.uniform(-jitter, jitter)
+            if delay > 0:
+                time.sleep(delay)
+            if error_rate and random.random() < error_rate:
+                with lock:
+                    stats['errors_injected'] += 1
+                error_type, message = INJECTED_ERRORS[error_status]
+                return _error(message, error_status, error_type)
+
+    @app.get('/_fake/stats')
+    def fake_stats():
+        with lock:
+            return jsonify(sessions=len(sessions), created=app.extensions['fake_stripe']['created'],
+                           webhooks_sent=len(app.extensions['fake_stripe']['webhooks_sent']), **stats)
+
+    @app.post('/v1/checkout/sessions')
+    def create_session():
+        key = request.headers.get('Idempotency-Key')
+        with lock:
+            if key and key in idempotent:
+                # Replay the original response, like Stripe does for 24 hours
+                return jsonify(sessions[idempotent[key]])
+
+        params = _unflatten(request.form)
+        items = params.get('line_items') or []
+        if not items or not params.get('success_url'):
+            return _error('Missing required param: line_items or success_url.')
+
+        session_id = f'cs_test_{uuid.uuid4().hex}'
+        amount = sum(int(item['price_data']['unit_amount']) * int(item.get('quantity', 1)) for item in items)
+        checkout_session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'amount_total': amount,
+            'currency': items[0]['price_data'].get('currency', 'usd'),
+            'mode': params.get('mode', 'payment'),
+            'status': 'open',
+            'payment_status': 'unpaid',
+            'payment_intent': None,
+            'metadata': params.get('metadata', {}),
+            'success_url': params['success_url'].replace('{CHECKOUT_SESSION_ID}', session_id),
+            'cancel_url': (params.get('cancel_url') or '').replace('{CHECKOUT_SESSION_ID}', session_id),
+            'url': f'{request.host_url}pay/{session_id}',
+            'created': int(time.time()),
+        }
+        with lock:
+            if key and key in idempotent:
+                return jsonify(sessions[idempotent[key]])
+            sessions[session_id] = checkout_session
+            if key:
+                idempotent[key] = session_id
+            app.extensions['fake_stripe']['created'] += 1
+        return jsonify(checkout_session)
+
+    @app.get('/v1/checkout/sessions/<session_id>')
+    def retrieve_session(session_id):
+        checkout_session = sessions.get(session_id)
+        if checkout_session is None:
+            return _error(f'No such checkout.session: {session_id}', 404, code='resource_missing')
+        return jsonify(checkout_session)
+
+    @app.post('/v1/payment_intents')
+    def create_payment_intent():
+        """Confirms immediately. Stripe's test method pm_card_chargeDeclined (and --decline-rate) is declined."""
+        key = request.headers.get('Idempotency-Key')
+        with lock:
+            if key and key in intents:
+                body, status = intents[key]
+                return jsonify(body), status
+
+        params = _unflatten(request.form)
+        if not params.get('amount') or not params.get('customer') or not params.get('payment_method'):
+            return _error('Missing required param: amount, customer or payment_method.')
+
+        intent = {
+            'id': f'pi_{uuid.uuid4().hex[:24]}',
+            'object': 'payment_intent',
+            'amount': int(params['amount']),
+            'currency': params.get('currency', 'usd'),
+            'customer': params['customer'],
+            'payment_method': params['payment_method'],
+            'metadata': params.get('metadata', {}),
+            'status': 'succeeded',
+            'latest_charge': f'ch_{uuid.uuid4().hex[:24]}',
+            'created': int(time.time()),
+        }
+        declined = params['payment_method'] == 'pm_card_chargeDeclined' or \
+            (decline_rate and random.random() < decline_rate)
+        if declined:
+            intent.update(status='requires_payment_method', latest_charge=None)
+            body, status = {'error': {
+                'type': 'card_error', 'code': 'card_declined', 'decline_code': 'generic_decline',
+                'message': 'Your card was declined.', 'payment_intent': intent,
+            }}, 402
+        else:
+            body, status = intent, 200
+
+        with lock:
+            if key and key in intents:
+                body, status = intents[key]
+            elif key:
+                intents[key] = (body, status)
+            if declined:
+                stats['declined'] += 1
+        return jsonify(body), status
+
+    @app.post('/v1/checkout/sessions/<session_id>/expire')
+    def expire_session(session_id):
+        with lock:
+            checkout_session = sessions.get(session_id)
+            if checkout_session is None:
+                return _error(f'No such checkout.session: {session_id}', 404, code='resource_missing')
+            if checkout_session['status'] != 'open':
+                return _error(f"Only open sessions can be expired (status: {checkout_session['status']}).")
+            checkout_session.update(status='expired', url=None)
+        deliver('checkout.session.expired', dict(checkout_session))
+        return jsonify(checkout_session)
+
+    @app.get('/pay/<session_id>')
+    def hosted_page(session_id):
+        """Fake hosted Checkout page: ?outcome=success (default) pays, ?outcome=cancel goes back."""
+        with lock:
+            checkout_session = sessions.get(session_id)
+            if checkout_session is None or checkout_session['status'] != 'open':
+                abort(404)
+            if request.args.get('outcome', 'success') == 'cancel':
+                return redirect(checkout_session['cancel_url'], code=303)
+            if decline_rate and random.random() < decline_rate:
+                # Card declined and the donor gave up: the session stays open, like on Stripe
+                stats['declined'] += 1
+                return redirect(checkout_session['cancel_url'], code=303)
+            checkout_session.update(
+                status='complete',
+                payment_status='paid',
+                payment_intent=f'pi_{uuid.uuid4().hex[:24]}',
+                url=None,
+            )
+        deliver('checkout.session.completed', dict(checkout_session))
+        return redirect(checkout_session['success_url'], code=303)
+
+    return app
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    # HTTP/1.1 so clients can reuse connections, like they would against api.stripe.com
+    protocol_version = 'HTTP/1.1'
+
+
+class FakeStripeServer:
+    """Runs the fake API on a background thread: ``with FakeStripeServer(...) as server: server.url``."""
+
+    def __init__(self, host='127.0.0.1', port=0, **kwargs):
+        self.app = create_fake_stripe(**kwargs)
+        self._server = make_server(host, port, self.app, threaded=True, request_handler=KeepAliveRequestHandler)
+        self.url = f'http://{host}:{self._server.server_port}'
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def sessions(self):
+        return self.app.extensions['fake_stripe']['sessions']
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=12111)
+    parser.add_argument('--webhook-url', default=None)
+    parser.add_argument('--webhook-secret', default='whsec_fake')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Added to every API call')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Uniform +/- spread around --latency-ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of API calls that fail (0-1)')
+    parser.add_argument('--error-status', type=int, default=500, choices=sorted(INJECTED_ERRORS))
+    parser.add_argument('--decline-rate', type=float, default=0, help='Fraction of payments declined (0-1)')
+    args = parser.parse_args()
+
+    app = create_fake_stripe(
+        webhook_url=args.webhook_url, webhook_secret=args.webhook_secret, latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000, error_rate=args.error_rate, error_status=args.error_status,
+        decline_rate=args.decline_rate
+    )
+    print(f'Fake Stripe listening on http://{args.host}:{args.port}')
+    app.run(host=args.host, port=args.port, threaded=True, request_handler=KeepAliveRequestHandler)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""
+Load test for the donation funnel: donate form → submit → create checkout → Stripe hosted
+page → payment_success, run by concurrent virtual donors against a running app.
+
+Reports per step: requests, errors, throughput, latency percentiles and the SQL
+statements the app ran (its X-Query-Count header, on with QUERY_COUNT_HEADER=1).
+
+Against an app that is already up (pointed at tools/fake_stripe.py via STRIPE_API_BASE):
+
+    python tools/load_funnel.py --app-url http://127.0.0.1:8000 --ngo-ids 1,2,3 [--users 16] [--duration 30]
+
+Or let it start everything: a fake Stripe (with --latency-ms/--error-rate/--decline-rate)
+and gunicorn on a fresh SQLite database (or --database-url), seeded with --ngos NGOs:
+
+    python tools/load_funnel.py --spawn [--gunicorn-workers 2 --gunicorn-threads 8] [--latency-ms 150]
+"""
+import argparse
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+from fake_stripe import FakeStripeServer
+
+STEPS = ['donate_form', 'donate_submit', 'checkout', 'stripe_pay', 'payment_success']
+
+_CSRF_RE = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+class FunnelStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)  # step -> seconds
+        self.errors = defaultdict(int)
+        self.queries = defaultdict(list)
+        self.completed = 0
+        self.declined = 0
+
+    def record(self, step, elapsed, ok, response=None):
+        with self.lock:
+            self.latencies[step].append(elapsed)
+            if not ok:
+                self.errors[step] += 1
+            count = response.headers.get('X-Query-Count') if response is not None else None
+            if count is not None:
+                self.queries[step].append(int(count))
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000 if ordered else 0.0
+
+
+def run_funnel(http, app_url, ngo_id, amount, stats):
+    """One donor through the whole funnel. Returns False at the first failed step."""
+
+    def step(name, method, url, ok, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = http.request(method, url, allow_redirects=False, timeout=30, **kwargs)
+        except requests.RequestException:
+            stats.record(name, time.perf_counter() - started, False)
+            return None
+        passed = ok(response)
+        stats.record(name, time.perf_counter() - started, passed, response)
+        return response if passed else None
+
+    donate_url = f'{app_url}/donate/{ngo_id}'
+    response = step('donate_form', 'GET', donate_url, lambda r: r.status_code == 200)
+    if response is None:
+        return False
+    token = _CSRF_RE.search(response.text)
+
+    form = {'donor_name': 'Load Test', 'donor_email': f'donor{threading.get_ident()}@example.org',
+            'amount': f'{amount:.2f}', 'ngo_id': str(ngo_id), 'csrf_token': token.group(1) if token else ''}
+    response = step('donate_submit', 'POST', donate_url,
+                    lambda r: r.status_code == 302 and 'create-checkout-session' in r.headers.get('Location', ''),
+                    data=form)
+    if response is None:
+        return False
+
+    # A gateway error redirects back to the donate page instead of out to Stripe
+    response = step('checkout', 'GET', urljoin(donate_url, response.headers['Location']),
+                    lambda r: r.status_code == 303 and '/pay/' in r.headers.get('Location', ''))
+    if response is None:
+        return False
+
+    response = step('stripe_pay', 'GET', response.headers['Location'], lambda r: r.status_code == 303)
+    if response is None:
+        return False
+
+    back = response.headers['Location']
+    if 'payment_failed' in back:
+        with stats.lock:
+            stats.declined += 1
+        return True
+
+    response = step('payment_success', 'GET', back, lambda r: r.status_code == 200)
+    if response is None:
+        return False
+    with stats.lock:
+        stats.completed += 1
+    return True
+
+
+def run_load(app_url, ngo_ids, users, duration, iterations, amount):
+    stats = FunnelStats()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def donor(index):
+        http = requests.Session()
+        done = 0
+        while (iterations is None or done < iterations) and (deadline is None or time.perf_counter() < deadline):
+            # A fresh cookie jar per funnel: every iteration is a new donor
+            http.cookies.clear()
+            run_funnel(http, app_url, ngo_ids[(index + done) % len(ngo_ids)], amount, stats)
+            done += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix='donor') as pool:
+        list(pool.map(donor, range(users)))
+    return stats, time.perf_counter() - started
+
+
+def print_report(stats, elapsed, users):
+    print(f"\n{users} concurrent donors for {elapsed:.1f}s: {stats.completed} donations completed "
+          f"({stats.completed / elapsed:.1f}/s), {stats.declined} declined\n")
+    print(f"{'step':<16}{'requests':>9}{'errors':>8}{'err %':>7}{'req/s':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for step in STEPS:
+        latencies = sorted(stats.latencies[step])
+        if not latencies:
+            continue
+        errors = stats.errors[step]
+        queries = stats.queries[step]
+        mean_queries = f'{sum(queries) / len(queries):.1f}' if queries else '-'
+        print(f"{step:<16}{len(latencies):>9}{errors:>8}{100 * errors / len(latencies):>7.1f}"
+              f"{len(latencies) / elapsed:>8.1f}{_percentile(latencies, 50):>9.1f}"
+              f"{_percentile(latencies, 95):>9.1f}{_percentile(latencies, 99):>9.1f}{mean_queries:>9}")
+
+
+def _prepare_database(database_url, ngos):
+    """Creates the schema and seeds NGOs (config reads DATABASE_URL at import time)."""
+    os.environ['DATABASE_URL'] = database_url
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import insert
+    from backend import create_app, db
+    from backend.models.verified_ngos import VerifiedNGO
+
+    app = create_app('development')
+    with app.app_context():
+        db.create_all()
+        if not VerifiedNGO.query.count():
+            db.session.execute(insert(VerifiedNGO), [
+                {'name': f'Load Test NGO {i}', 'contact_email': f'loadtest{i}@example.org', 'ngo_type': 'Relief',
+                 'mission': 'Load testing.', 'is_active': True} for i in range(1, ngos + 1)
+            ])
+            db.session.commit()
+        ngo_ids = [ngo_id for (ngo_id,) in db.session.query(VerifiedNGO.id).filter_by(is_active=True)]
+        db.engine.dispose()
+    return ngo_ids
+
+
+def _wait_until_up(url, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'gunicorn exited with code {process.returncode}')
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise SystemExit(f'{url} did not come up within {timeout}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--app-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--ngo-ids', default=None, help='Comma-separated NGOs to donate to (default: all, with --spawn)')
+    parser.add_argument('--users', type=int, default=16, help='Concurrent virtual donors')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run (0: use --iterations)')
+    parser.add_argument('--iterations', type=int, default=None, help='Funnels per donor')
+    parser.add_argument('--amount', type=float, default=10.0)
+
+    spawn = parser.add_argument_group('--spawn: start fake Stripe and gunicorn')
+    spawn.add_argument('--spawn', action='store_true')
+    spawn.add_argument('--database-url', default=None, help='Default: a fresh SQLite file')
+    spawn.add_argument('--ngos', type=int, default=20)
+    spawn.add_argument('--port', type=int, default=8765)
+    spawn.add_argument('--gunicorn-workers', type=int, default=2)
+    spawn.add_argument('--gunicorn-threads', type=int, default=8)
+    spawn.add_argument('--latency-ms', type=float, default=0)
+    spawn.add_argument('--jitter-ms', type=float, default=0)
+    spawn.add_argument('--error-rate', type=float, default=0)
+    spawn.add_argument('--error-status', type=int, default=500)
+    spawn.add_argument('--decline-rate', type=float, default=0)
+    args = parser.parse_args()
+
+    if not args.duration and not args.iterations:
+        parser.error('set --duration or --iterations')
+    duration = args.duration if not args.iterations else None
+
+    if not args.spawn:
+        if not args.ngo_ids:
+            parser.error('--ngo-ids is required without --spawn')
+        ngo_ids = [int(i) for i in args.ngo_ids.split(',')]
+        stats, elapsed = run_load(args.app_url.rstrip('/'), ngo_ids, args.users, duration, args.iterations,
+                                  args.amount)
+        print_report(stats, elapsed, args.users)
+        return
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # fake Stripe's per-request access log
+    workdir = tempfile.mkdtemp(prefix='load_funnel_')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'funnel.db')}"
+    ngo_ids = [int(i) for i in args.ngo_ids.split(',')] if args.ngo_ids else _prepare_database(database_url, args.ngos)
+    app_url = f'http://127.0.0.1:{args.port}'
+
+    with FakeStripeServer(
+        webhook_url=f'{app_url}/stripe/webhook', webhook_secret='whsec_loadtest',
+        latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, error_rate=args.error_rate,
+        error_status=args.error_status, decline_rate=args.decline_rate
+    ) as fake:
+        env = dict(
+            os.environ, DATABASE_URL=database_url, FLASK_CONFIG='development', QUERY_COUNT_HEADER='1', MAIL_SUPPRESS_SEND='1',
+            STRIPE_API_BASE=fake.url, STRIPE_SECRET_KEY='sk_test_loadtest', STRIPE_WEBHOOK_SECRET='whsec_loadtest',
+        )
+        process = subprocess.Popen(
+            ['gunicorn', 'wsgi:app', '--bind', f'127.0.0.1:{args.port}', '--workers', str(args.gunicorn_workers),
+             '--threads', str(args.gunicorn_threads), '--log-level', 'warning'],
+            cwd=ROOT, env=env
+        )
+        try:
+            _wait_until_up(app_url, process)
+            stats, elapsed = run_load(app_url, ngo_ids, args.users, duration, args.iterations, args.amount)
+            time.sleep(1)  # let the last webhooks land
+            print_report(stats, elapsed, args.users)
+            print(f'\nfake Stripe: {requests.get(f"{fake.url}/_fake/stats").json()}')
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()